@@ -0,0 +1,254 @@
+import random
+import zlib
+from datetime import datetime, timezone
+
+from praw.models import MoreComments
+
+from config import key_words_2
+
+FILLER = (
+    "my mother passed away last year and I still talk to her every night "
+    "sometimes I read our old messages and wonder what she would say today "
+    "friends tell me it gets easier but the silence in the house is heavy "
+    "we used to walk the dog together on sunday mornings before church"
+).split()
+# Hu & Liu lexicon entries, so sentiment scoring has something to count
+SENTIMENT_WORDS = "love happy grateful peaceful kind lost sad lonely hurt angry terrible awful".split()
+
+
+class FakeCommentForest(list):
+    """
+    List of comments and FakeMoreComments, with the methods of a praw CommentForest.
+    """
+
+    def replace_more(self, limit: int | None = 32) -> list:
+        """
+        Expands up to `limit` FakeMoreComments in place, breadth first, and removes
+        the others (limit=0 removes them all, like praw).
+        """
+        expanded = 0
+        queue = [self]
+        while queue:
+            forest = queue.pop(0)
+            for index in reversed(range(len(forest))):
+                item = forest[index]
+                if isinstance(item, FakeMoreComments):
+                    if limit is None or expanded < limit:
+                        forest[index : index + 1] = item.comments()
+                        expanded += 1
+                    else:
+                        del forest[index]
+            queue.extend(item.replies for item in forest)
+        return []
+
+    def list(self) -> list:
+        """
+        Flattens the forest, breadth first.
+        """
+        items, queue = [], list(self)
+        while queue:
+            item = queue.pop(0)
+            items.append(item)
+            queue.extend(getattr(item, "replies", ()))
+        return items
+
+
+class FakeComment:
+    """
+    Duck-typed praw Comment, with the attributes read by CommentRecord.from_reddit,
+    iter_comments and the store.
+    """
+
+    def __init__(
+        self,
+        id: str,
+        body: str,
+        created_utc: float,
+        depth: int,
+        parent_id: str,
+        link_id: str,
+        score: int,
+        author: str,
+    ):
+        self.id = id
+        self.fullname = f"t1_{id}"
+        self.body = body
+        self.created_utc = created_utc
+        self.depth = depth
+        self.parent_id = parent_id
+        self.link_id = link_id
+        self.score = score
+        self.author = author
+        self.permalink = f"/r/fake/comments/{link_id[3:]}/_/{id}/"
+        self.replies = FakeCommentForest()
+
+
+class FakeMoreComments(MoreComments):
+    """
+    praw MoreComments whose expansion returns generated comments instead of calling
+    the API. Like a "morechildren" request, the comments come back as a flat list.
+    """
+
+    def __init__(self, parent_id: str, comments: list[FakeComment]):
+        super().__init__(
+            None,
+            {"count": len(comments), "children": [c.id for c in comments], "parent_id": parent_id},
+        )
+        self._fake_comments = comments
+        self.replies = ()
+
+    def comments(self, update: bool = True) -> list[FakeComment]:
+        return list(self._fake_comments)
+
+
+class FakeSubmission:
+    """
+    Duck-typed praw Submission, with the attributes read by PostRecord.from_reddit,
+    analyze_post_interactions and the store.
+    """
+
+    def __init__(
+        self,
+        id: str,
+        title: str,
+        selftext: str,
+        created_utc: float,
+        score: int,
+        author: str,
+        comments: FakeCommentForest,
+        num_comments: int,
+    ):
+        self.id = id
+        self.fullname = f"t3_{id}"
+        self.title = title
+        self.selftext = selftext
+        self.created_utc = created_utc
+        self.score = score
+        self.author = author
+        self.permalink = f"/r/fake/comments/{id}/"
+        self.num_comments = num_comments
+        self.link_flair_text = None
+        self.treatment_tags = []
+        self.comments = comments
+
+
+class FakeSubreddit:
+    """
+    Duck-typed praw Subreddit serving generated submissions from its listings.
+    """
+
+    def __init__(self, display_name: str, submissions: list[FakeSubmission]):
+        self.display_name = display_name
+        self.submissions = submissions
+
+    def _listing(self, submissions: list[FakeSubmission], limit: int | None, params: dict | None):
+        # Like praw, the listing starts after the post named in params["after"]
+        after = (params or {}).get("after")
+        if after:
+            names = [submission.fullname for submission in submissions]
+            submissions = submissions[names.index(after) + 1 :] if after in names else []
+        return iter(submissions[:limit])
+
+    def top(self, limit: int | None = 100, params: dict | None = None, **kwargs):
+        return self._listing(sorted(self.submissions, key=lambda s: -s.score), limit, params)
+
+    def new(self, limit: int | None = 100, params: dict | None = None, **kwargs):
+        return self._listing(sorted(self.submissions, key=lambda s: -s.created_utc), limit, params)
+
+    def hot(self, limit: int | None = 100, params: dict | None = None, **kwargs):
+        return self._listing(self.submissions, limit, params)
+
+
+def make_text(rng: random.Random, length: int, keywords: list[str], keyword_density: float) -> str:
+    words = rng.choices(FILLER, k=length)
+    words[rng.randrange(length)] = rng.choice(SENTIMENT_WORDS)
+    if keywords and rng.random() < keyword_density:
+        words.insert(rng.randrange(length), rng.choice(keywords))
+    return " ".join(words)
+
+
+def make_subreddit(
+    name: str = "GriefSupport",
+    posts: int = 100,
+    comments_per_post: int = 20,
+    max_depth: int = 3,
+    more_share: float = 0.1,
+    start: datetime | None = None,
+    spread_days: float = 365,
+    keywords: list[str] = key_words_2,
+    keyword_density: float = 0.1,
+    words_per_post: int = 120,
+    words_per_comment: int = 40,
+    seed: int = 42,
+) -> FakeSubreddit:
+    """
+    Generates a subreddit of submissions with comment trees, without any network access.
+    Args:
+        name (str): Name of the subreddit.
+        posts (int): Number of submissions.
+        comments_per_post (int): Number of comments under each submission.
+        max_depth (int): Deepest reply level, 0 being top-level comments.
+        more_share (float): Share of the replies hidden behind "more comments".
+        start (datetime | None): Creation date of the oldest submission, 2022-01-01 (UTC)
+            by default.
+        spread_days (float): Days between the oldest and the newest submission.
+        keywords (list[str]): Keywords inserted in the texts.
+        keyword_density (float): Share of the texts containing a keyword.
+        words_per_post (int): Length of the submission bodies.
+        words_per_comment (int): Length of the comment bodies.
+        seed (int): Seed of the generator, the same arguments giving the same subreddit.
+    Returns:
+        FakeSubreddit: The subreddit.
+    """
+    rng = random.Random(seed)
+    start_ts = (start or datetime(2022, 1, 1, tzinfo=timezone.utc)).timestamp()
+    # Ids are unique across subreddits, like Reddit's
+    prefix = f"{zlib.crc32(name.encode('utf-8')):x}"
+    submissions = []
+    for post_index in range(posts):
+        post_id = f"{prefix}p{post_index:x}"
+        created = start_ts + rng.random() * spread_days * 86400
+        forest = FakeCommentForest()
+        # (comment, its depth) that can still receive replies
+        parents: list[tuple[FakeComment | None, int]] = [(None, -1)]
+        hidden: dict[str, list[FakeComment]] = {}
+
+        for comment_index in range(comments_per_post):
+            parent, parent_depth = rng.choice(parents)
+            # Replies are always newer than what they reply to
+            replied_at = parent.created_utc if parent else created
+            comment = FakeComment(
+                id=f"{post_id}c{comment_index:x}",
+                body=make_text(rng, words_per_comment, keywords, keyword_density),
+                created_utc=replied_at + rng.random() * 2 * 86400,
+                depth=parent_depth + 1,
+                parent_id=parent.fullname if parent else f"t3_{post_id}",
+                link_id=f"t3_{post_id}",
+                score=rng.randint(-5, 50),
+                author=f"user{rng.randrange(1000)}",
+            )
+            if parent is not None and rng.random() < more_share:
+                # Hidden replies stay leaves, as they come back flat from the expansion
+                hidden.setdefault(parent.fullname, []).append(comment)
+                continue
+            (parent.replies if parent else forest).append(comment)
+            if comment.depth < max_depth:
+                parents.append((comment, comment.depth))
+
+        comments_by_name = {c.fullname: c for c in forest.list()}
+        for parent_name, comments in hidden.items():
+            comments_by_name[parent_name].replies.append(FakeMoreComments(parent_name, comments))
+
+        submissions.append(
+            FakeSubmission(
+                id=post_id,
+                title=make_text(rng, 10, keywords, keyword_density),
+                selftext=make_text(rng, words_per_post, keywords, keyword_density),
+                created_utc=created,
+                score=rng.randint(0, 500),
+                author=f"user{rng.randrange(1000)}",
+                comments=forest,
+                num_comments=comments_per_post,
+            )
+        )
+    return FakeSubreddit(name, submissions)
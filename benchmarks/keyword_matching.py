@@ -0,0 +1,97 @@
+import random
+import re
+from timeit import timeit
+
+from config import key_words_1, key_words_2, key_words_3
+from utils import contains_keyword, get_keyword_matcher
+
+FILLER = (
+    "my mother passed away last year and I still talk to her every night "
+    "sometimes I read our old messages and wonder what she would say today "
+    "friends tell me it gets easier but the silence in the house is heavy"
+).split()
+
+
+def contains_keyword_loop(text: str, keywords: list[str]) -> bool:
+    """Previous implementation: one regex compiled and run per keyword."""
+    if not text or not keywords:
+        return False
+    for kw in keywords:
+        pattern = rf"\b{re.escape(kw)}\b"
+        if re.search(pattern, text, flags=re.IGNORECASE):
+            return True
+    return False
+
+
+def matching_keywords_loop(text: str, keywords: list[str]) -> list[str]:
+    """Previous way to list matched keywords: every keyword searched separately."""
+    return [
+        kw
+        for kw in dict.fromkeys(keywords)
+        if re.search(rf"\b{re.escape(kw)}\b", text, flags=re.IGNORECASE)
+    ]
+
+
+def make_texts(keywords: list[str], n: int, length: int, density: float) -> list[str]:
+    """
+    Builds synthetic comments, a share of them containing one keyword.
+    Args:
+        keywords (list[str]): Keywords that may be inserted.
+        n (int): Number of texts.
+        length (int): Number of words per text.
+        density (float): Share of texts containing a keyword.
+    Returns:
+        list[str]: The generated texts.
+    """
+    rng = random.Random(42)
+    texts = []
+    for _ in range(n):
+        words = rng.choices(FILLER, k=length)
+        if rng.random() < density:
+            words.insert(rng.randrange(length), rng.choice(keywords))
+        texts.append(" ".join(words))
+    return texts
+
+
+def run(n: int = 2000, length: int = 80, density: float = 0.1, repeat: int = 3) -> None:
+    for name, keywords in [
+        ("key_words_1", key_words_1),
+        ("key_words_2", key_words_2),
+        ("key_words_3", key_words_3),
+    ]:
+        texts = make_texts(keywords, n, length, density)
+        matcher = get_keyword_matcher(keywords)
+
+        # Same answers as the per-keyword loop
+        assert [contains_keyword_loop(t, keywords) for t in texts] == [
+            contains_keyword(t, keywords) for t in texts
+        ]
+        assert [matching_keywords_loop(t, keywords) for t in texts] == [
+            matcher.find_all(t) for t in texts
+        ]
+
+        timings = {
+            "any (loop)": timeit(
+                lambda: [contains_keyword_loop(t, keywords) for t in texts], number=repeat
+            ),
+            "any (matcher)": timeit(
+                lambda: [contains_keyword(t, keywords) for t in texts], number=repeat
+            ),
+            "which (loop)": timeit(
+                lambda: [matching_keywords_loop(t, keywords) for t in texts], number=repeat
+            ),
+            "which (matcher)": timeit(
+                lambda: [matcher.find_all(t) for t in texts], number=repeat
+            ),
+        }
+        print(f"=== {name} ({len(keywords)} keywords, {n} texts of {length} words) ===")
+        for label, seconds in timings.items():
+            print(f"{label:<16} {seconds / repeat * 1000:8.1f} ms")
+        print(
+            f"speed-up: any x{timings['any (loop)'] / timings['any (matcher)']:.1f}, "
+            f"which x{timings['which (loop)'] / timings['which (matcher)']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    run()
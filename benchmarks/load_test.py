@@ -0,0 +1,160 @@
+import argparse
+import io
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from prawcore.exceptions import TooManyRequests
+
+import instrumentation
+from benchmarks.fixtures import make_subreddit
+from benchmarks.reddit_server import FakeRedditServer, RedditData, fake_reddit
+from post_extraction_excel.main import save_subreddits_to_excel
+from scheduler import InstrumentedRequestor, RateLimiter
+from utils import extract_post_data
+
+
+def run_extract(
+    reddit,
+    names: list[str],
+    limit: int,
+    more_limit: int | None,
+    comment_workers: int,
+    requests_per_minute: float,
+) -> int:
+    """
+    Extracts the subreddits one after the other with extract_post_data.
+    Returns:
+        int: Number of items extracted.
+    """
+    limiter = RateLimiter(requests_per_minute)
+    items = 0
+    for name in names:
+        items += len(
+            extract_post_data(
+                reddit.subreddit(name),
+                limit=limit,
+                more_limit=more_limit,
+                comment_workers=comment_workers,
+                as_records=True,
+                limiter=limiter,
+            )
+        )
+    return items
+
+
+def run_excel(
+    reddit,
+    names: list[str],
+    limit: int,
+    workers: int,
+    comment_workers: int,
+    requests_per_minute: float,
+) -> int:
+    """
+    Runs save_subreddits_to_excel into a temporary file.
+    Returns:
+        int: Number of items written, counted by the run report.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        save_subreddits_to_excel(
+            reddit,
+            names,
+            output_path=str(Path(directory) / "load_test.xlsx"),
+            limit=limit,
+            workers=workers,
+            comment_workers=comment_workers,
+            requests_per_minute=requests_per_minute,
+        )
+    report = instrumentation.current()
+    return sum(report.counters[f"r/{name}"]["items_kept"] for name in names)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load-tests the extraction against a local fake Reddit API."
+    )
+    parser.add_argument("--scenario", choices=["extract", "excel"], default="extract")
+    parser.add_argument("--subreddits", type=int, default=2)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--comments-per-post", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100_000, help="items per subreddit")
+    parser.add_argument("--more-limit", type=int, default=0, help="-1 for no limit")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--comment-workers", type=int, default=1)
+    parser.add_argument("--requests-per-minute", type=float, default=6000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--comments-per-page", type=int, default=200)
+    parser.add_argument("--requests-per-window", type=int, default=1000)
+    parser.add_argument("--window", type=float, default=10)
+    parser.add_argument("--report", help="path to save the run report to")
+    args = parser.parse_args()
+
+    names = [f"LoadTest{index}" for index in range(args.subreddits)]
+    server = FakeRedditServer(
+        RedditData.from_subreddits(
+            make_subreddit(name, args.posts, args.comments_per_post, seed=seed)
+            for seed, name in enumerate(names)
+        ),
+        latency=args.latency,
+        jitter=args.jitter,
+        comments_per_page=args.comments_per_page,
+        requests_per_window=args.requests_per_window,
+        window=args.window,
+    )
+    server.start()
+    reddit = fake_reddit(server, requestor_class=InstrumentedRequestor)
+    more_limit = None if args.more_limit < 0 else args.more_limit
+
+    report = instrumentation.enable()
+    start = time.perf_counter()
+    error = None
+    items = 0
+    try:
+        with redirect_stdout(io.StringIO()):
+            if args.scenario == "extract":
+                items = run_extract(
+                    reddit,
+                    names,
+                    args.limit,
+                    more_limit,
+                    args.comment_workers,
+                    args.requests_per_minute,
+                )
+            else:
+                items = run_excel(
+                    reddit,
+                    names,
+                    args.limit,
+                    args.workers,
+                    args.comment_workers,
+                    args.requests_per_minute,
+                )
+    except TooManyRequests as exc:
+        error = exc
+    elapsed = time.perf_counter() - start
+    instrumentation.disable()
+    server.shutdown()
+
+    counters = {
+        name: sum(scope[name] for scope in report.counters.values())
+        for name in ("api_requests", "api_429", "more_comments_expansions", "rate_limit_exhausted")
+    }
+    waited = sum(
+        stages["rate_limit_wait"][0]
+        for stages in report.timings.values()
+        if "rate_limit_wait" in stages
+    )
+    print(f"Scenario {args.scenario}: {items} items in {elapsed:.1f}s ({items / elapsed:.0f} items/s)")
+    print(f"Server requests: {dict(server.stats)}")
+    print(f"Client counters: {counters}, rate-limit wait {waited:.1f}s")
+    if error is not None:
+        print(f"Run stopped by a rate-limit error: {error!r}")
+    if args.report:
+        report.save(args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable
+from urllib.parse import parse_qs, urlsplit
+
+from store import COMMENT_FIELDS, SUBMISSION_FIELDS, RedditStore
+
+# Most items Reddit returns per listing page
+MAX_PAGE = 100
+
+
+def _fields(reddit_obj, fields: tuple[str, ...]) -> dict:
+    data = {field: getattr(reddit_obj, field, None) for field in fields}
+    data["author"] = str(data["author"]) if data["author"] else None
+    return data
+
+
+class RedditData:
+    """
+    Submissions and comments served by a FakeRedditServer, as the JSON data of Reddit
+    things. Comments are stored flat and reassembled into trees on each request.
+    """
+
+    def __init__(self):
+        # Lowercased subreddit name -> submissions, in "hot" order
+        self.submissions: dict[str, list[dict]] = {}
+        self.by_fullname: dict[str, dict] = {}
+        # Submission fullname -> its comments
+        self.comments: dict[str, list[dict]] = defaultdict(list)
+        # Comment fullname -> replies
+        self.replies: dict[str, list[dict]] = defaultdict(list)
+        # Comments always returned behind a "more comments" stub
+        self.hidden: set[str] = set()
+
+    def add_submission(self, subreddit_name: str, raw_post, comments: Iterable = ()) -> None:
+        """
+        Adds a submission and its comment forest.
+        Args:
+            subreddit_name (str): Name of its subreddit.
+            raw_post: Object with the attributes of a praw Submission (a fixture, a
+                stored post...).
+            comments (Iterable): Its top-level comments, replies attached. MoreComments
+                stubs are expanded and their comments kept hidden behind a stub.
+        """
+        from praw.models import MoreComments
+
+        data = _fields(raw_post, SUBMISSION_FIELDS)
+        data.update(
+            name=f"t3_{data['id']}",
+            subreddit=subreddit_name,
+            permalink=data["permalink"] or f"/r/{subreddit_name}/comments/{data['id']}/",
+        )
+        self.submissions.setdefault(subreddit_name.lower(), []).append(data)
+        self.by_fullname[data["name"]] = data
+
+        def add_forest(items: Iterable, hidden: bool) -> None:
+            for item in items:
+                if isinstance(item, MoreComments):
+                    add_forest(item.comments(), hidden=True)
+                    continue
+                comment = _fields(item, COMMENT_FIELDS)
+                comment.update(
+                    name=f"t1_{comment['id']}",
+                    link_id=comment["link_id"] or data["name"],
+                    parent_id=comment["parent_id"] or data["name"],
+                    subreddit=subreddit_name,
+                )
+                self.comments[data["name"]].append(comment)
+                self.replies[comment["parent_id"]].append(comment)
+                if hidden:
+                    self.hidden.add(comment["name"])
+                add_forest(getattr(item, "replies", ()), hidden)
+
+        add_forest(comments, hidden=False)
+
+    @classmethod
+    def from_subreddits(cls, subreddits: Iterable) -> "RedditData":
+        """
+        Data of generated subreddits, see benchmarks.fixtures.make_subreddit.
+        """
+        data = cls()
+        for subreddit in subreddits:
+            for submission in subreddit.submissions:
+                data.add_submission(subreddit.display_name, submission, submission.comments)
+        return data
+
+    @classmethod
+    def from_store(cls, store: RedditStore, subreddit_names: list[str]) -> "RedditData":
+        """
+        Data recorded in a local store by earlier runs.
+        """
+        data = cls()
+        # The store yields newest first, served as the "hot" order
+        for name in subreddit_names:
+            for submission in store.submissions(name):
+                data.add_submission(name, submission, submission.comments)
+        return data
+
+    def subtree_size(self, fullname: str) -> int:
+        return 1 + sum(self.subtree_size(reply["name"]) for reply in self.replies[fullname])
+
+
+class FakeRedditServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Reddit API, serving the endpoints praw uses to read
+    subreddits: access token, listings (top, new, hot), submission comments,
+    morechildren and info.
+
+    Each response waits a configurable latency, comment trees are cut after
+    `comments_per_page` comments like Reddit does, and a request quota per window is
+    reported in the x-ratelimit-* headers, requests over it getting a 429.
+    Point praw at it with oauth_url=server.url and reddit_url=server.url.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        data: RedditData,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        jitter: float = 0.02,
+        comments_per_page: int = 200,
+        requests_per_window: int = 600,
+        window: float = 600,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            data (RedditData): The submissions and comments to serve.
+            host (str): Address to listen on.
+            port (int): Port to listen on, 0 for any free port.
+            latency (float): Seconds every response is delayed by.
+            jitter (float): Random extra delay, up to this many seconds.
+            comments_per_page (int): Comments returned with a submission, the others
+                behind "more comments" stubs.
+            requests_per_window (int): Requests allowed per window (Reddit allows
+                600 per 10 minutes for an OAuth client).
+            window (float): Length of the rate-limit window, in seconds.
+            seed (int): Seed of the jitter.
+        """
+        super().__init__((host, port), FakeRedditHandler)
+        self.data = data
+        self.latency = latency
+        self.jitter = jitter
+        self.comments_per_page = comments_per_page
+        self.requests_per_window = requests_per_window
+        self.window = window
+        self.stats: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._window_start = time.monotonic()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> threading.Thread:
+        """
+        Serves in a background thread, until shutdown() is called.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def take_quota(self) -> tuple[bool, dict[str, str]]:
+        """
+        Counts a request against the quota of the current window.
+        Returns:
+            tuple: Whether the request is allowed, and the rate-limit headers.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start, self._used = now, 0
+            allowed = self._used < self.requests_per_window
+            if allowed:
+                self._used += 1
+            reset = self._window_start + self.window - now
+            delay = self.latency + self._rng.random() * self.jitter
+        headers = {
+            "x-ratelimit-used": str(self._used),
+            "x-ratelimit-remaining": str(self.requests_per_window - self._used),
+            "x-ratelimit-reset": str(max(int(reset), 1)),
+        }
+        time.sleep(delay)
+        return allowed, headers
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    # Reddit JSON
+
+    def listing(self, subreddit_name: str, sort: str, params: dict) -> dict:
+        submissions = self.data.submissions.get(subreddit_name.lower(), [])
+        if sort == "top":
+            submissions = sorted(submissions, key=lambda s: -(s["score"] or 0))
+        elif sort == "new":
+            submissions = sorted(submissions, key=lambda s: -s["created_utc"])
+        start = 0
+        if params.get("after"):
+            names = [s["name"] for s in submissions]
+            start = names.index(params["after"]) + 1 if params["after"] in names else len(names)
+        limit = min(int(params.get("limit", 25)), MAX_PAGE)
+        page = submissions[start : start + limit]
+        after = page[-1]["name"] if page and start + limit < len(submissions) else None
+        return _listing([_thing("t3", post) for post in page], after)
+
+    def comment_page(self, link_id: str) -> list[dict]:
+        """
+        The comments of a submission as Reddit returns them: a tree cut after
+        comments_per_page comments, the others grouped in "more comments" stubs
+        under their parent.
+        """
+        budget = [self.comments_per_page]
+
+        def forest(parent_id: str) -> list[dict]:
+            items, more = [], []
+            for comment in self.data.replies[parent_id]:
+                if comment["name"] in self.data.hidden or budget[0] <= 0:
+                    more.append(comment)
+                    continue
+                budget[0] -= 1
+                items.append(_comment_thing(comment, forest(comment["name"])))
+            if more:
+                items.append(self.more_stub(parent_id, more))
+            return items
+
+        return forest(link_id)
+
+    def more_stub(self, parent_id: str, comments: list[dict]) -> dict:
+        return _thing(
+            "more",
+            {
+                "id": comments[0]["id"],
+                "name": f"t1_{comments[0]['id']}",
+                "parent_id": parent_id,
+                "depth": comments[0]["depth"],
+                "children": [comment["id"] for comment in comments],
+                "count": sum(self.data.subtree_size(comment["name"]) for comment in comments),
+            },
+        )
+
+    def more_children(self, link_id: str, children: list[str]) -> list[dict]:
+        """
+        The requested comments and their replies, flat, like Reddit's morechildren.
+        """
+        things = []
+        wanted = {f"t1_{child}" for child in children}
+        for comment in self.data.comments.get(link_id, []):
+            if comment["name"] in wanted:
+                things.append(_comment_thing(comment, []))
+                wanted.update(reply["name"] for reply in self.data.replies[comment["name"]])
+        return things
+
+
+def _thing(kind: str, data: dict) -> dict:
+    return {"kind": kind, "data": data}
+
+
+def _listing(children: list[dict], after: str | None = None) -> dict:
+    return {"kind": "Listing", "data": {"after": after, "before": None, "children": children}}
+
+
+def _comment_thing(comment: dict, replies: list[dict]) -> dict:
+    return _thing("t1", {**comment, "replies": _listing(replies) if replies else ""})
+
+
+class FakeRedditHandler(BaseHTTPRequestHandler):
+    server: FakeRedditServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.handle_api(parse_qs(urlsplit(self.path).query))
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        params = parse_qs(self.rfile.read(length).decode("utf-8"))
+        params.update(parse_qs(urlsplit(self.path).query))
+        self.handle_api(params)
+
+    def handle_api(self, query: dict[str, list[str]]) -> None:
+        server = self.server
+        params = {key: values[-1] for key, values in query.items()}
+        parts = [part for part in urlsplit(self.path).path.split("/") if part]
+
+        if parts == ["api", "v1", "access_token"]:
+            server.count("access_token")
+            self.send_json(
+                {"access_token": "fake", "token_type": "bearer", "expires_in": 86400, "scope": "*"}
+            )
+            return
+
+        allowed, headers = server.take_quota()
+        if not allowed:
+            server.count("429")
+            self.send_json({"message": "Too Many Requests", "error": 429}, 429, headers)
+            return
+
+        if len(parts) == 3 and parts[0] == "r" and parts[2] in ("top", "new", "hot"):
+            server.count("listing")
+            self.send_json(server.listing(parts[1], parts[2], params), headers=headers)
+        elif len(parts) >= 2 and parts[0] == "comments":
+            post = server.data.by_fullname.get(f"t3_{parts[1]}")
+            if post is None:
+                self.send_json({"message": "Not Found", "error": 404}, 404, headers)
+                return
+            server.count("comments")
+            self.send_json(
+                [_listing([_thing("t3", post)]), _listing(server.comment_page(post["name"]))],
+                headers=headers,
+            )
+        elif parts == ["api", "morechildren"]:
+            server.count("morechildren")
+            things = server.more_children(params["link_id"], params["children"].split(","))
+            self.send_json({"json": {"errors": [], "data": {"things": things}}}, headers=headers)
+        elif parts == ["api", "info"]:
+            server.count("info")
+            posts = [server.data.by_fullname.get(name) for name in params.get("id", "").split(",")]
+            self.send_json(_listing([_thing("t3", post) for post in posts if post]), headers=headers)
+        else:
+            self.send_json({"message": "Not Found", "error": 404}, 404, headers)
+
+    def send_json(self, payload, status: int = 200, headers: dict[str, str] | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def fake_reddit(server: FakeRedditServer, **kwargs):
+    """
+    Builds a praw Reddit instance reading from a FakeRedditServer.
+    Args:
+        server (FakeRedditServer): The running server.
+        **kwargs: Other arguments of praw.Reddit, e.g. requestor_class.
+    Returns:
+        Reddit: The Reddit instance.
+    """
+    import praw
+
+    # prawcore paces requests to spread the quota over its window
+    kwargs.setdefault("window_size", max(int(server.window), 1))
+    return praw.Reddit(
+        client_id="fake",
+        client_secret="fake",
+        user_agent="benchmarks/reddit_server",
+        oauth_url=server.url,
+        reddit_url=server.url,
+        check_for_updates=False,
+        **kwargs,
+    )
+
+
+if __name__ == "__main__":
+    from benchmarks.fixtures import make_subreddit
+
+    parser = argparse.ArgumentParser(description="Serves a fake Reddit API locally.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--store", help="serve the posts of this RedditStore instead of generated ones")
+    parser.add_argument("--subreddits", nargs="+", default=["GriefSupport"])
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--comments-per-post", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--requests-per-window", type=int, default=600)
+    parser.add_argument("--window", type=float, default=600)
+    args = parser.parse_args()
+
+    if args.store:
+        data = RedditData.from_store(RedditStore(args.store), args.subreddits)
+    else:
+        data = RedditData.from_subreddits(
+            make_subreddit(name, args.posts, args.comments_per_post, seed=seed)
+            for seed, name in enumerate(args.subreddits)
+        )
+    server = FakeRedditServer(
+        data,
+        port=args.port,
+        latency=args.latency,
+        requests_per_window=args.requests_per_window,
+        window=args.window,
+    )
+    print(f"Serving {', '.join(args.subreddits)} on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,222 @@
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tomllib
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.fixtures import make_subreddit
+from config import key_words_2
+from export import ExcelSink
+from sentiment import annotate_sentiment
+from utils import analyze_post_interactions, contains_keyword, extract_post_data
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Number of posts and comments per post of the generated subreddit
+SCALES = {
+    "small": {"posts": 50, "comments_per_post": 20},
+    "medium": {"posts": 200, "comments_per_post": 50},
+    "large": {"posts": 500, "comments_per_post": 100},
+}
+BENCHMARKS = [
+    "extract",
+    "extract_keywords",
+    "extract_window",
+    "contains_keyword",
+    "analyze_post_interactions",
+    "annotate_sentiment",
+    "excel_export",
+    "train_lda",
+]
+
+
+def measure(function: Callable, setup: Callable | None = None, repeat: int = 5) -> dict:
+    """
+    Times a function, keeping the best of several runs as the least noisy measure.
+    Printed output is discarded.
+    Args:
+        function (Callable): Function to time, called with the result of setup if given.
+        setup (Callable | None): Untimed function preparing fresh inputs for each run.
+        repeat (int): Number of runs.
+    Returns:
+        dict: Best and mean run time in seconds, and the length of the result if it has one.
+    """
+    runs = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = function(*args)
+            runs.append(time.perf_counter() - start)
+    timing = {"best": round(min(runs), 6), "mean": round(sum(runs) / len(runs), 6)}
+    if isinstance(result, list):
+        timing["items"] = len(result)
+    return timing
+
+
+def run_scale(scale: str, only: list[str], repeat: int) -> dict[str, dict]:
+    """
+    Runs the benchmarks on a subreddit generated at one scale.
+    Args:
+        scale (str): Key of SCALES.
+        only (list[str]): Benchmarks to run.
+        repeat (int): Number of runs per benchmark.
+    Returns:
+        dict[str, dict]: Timings of each benchmark.
+    """
+    params = SCALES[scale]
+    subreddit = make_subreddit(**params)
+    limit = params["posts"] * (params["comments_per_post"] + 1)
+
+    def extract(**kwargs) -> list:
+        with redirect_stdout(io.StringIO()):
+            return extract_post_data(subreddit, limit=limit, more_limit=None, **kwargs)
+
+    # Inputs shared by the benchmarks downstream of the extraction
+    models = extract()
+    records = extract(as_records=True)
+    texts = [text for record in records for text in (record.Thread_Title, record.Content) if text]
+
+    def export_excel() -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            sink = ExcelSink(str(Path(directory) / "benchmark.xlsx"))
+            sink.write_sheet(subreddit.display_name, records)
+            sink.save()
+
+    def lda() -> None:
+        from lda_analysis.main import train_lda
+
+        train_lda(models, num_topics=5, passes=2)
+
+    benchmarks = {
+        "extract": (lambda: extract(), None),
+        "extract_keywords": (lambda: extract(key_words=key_words_2), None),
+        "extract_window": (
+            lambda: extract(start_date=datetime(2022, 7, 1), end_date=datetime(2022, 10, 1)),
+            None,
+        ),
+        "contains_keyword": (lambda: [contains_keyword(t, key_words_2) for t in texts], None),
+        # It expands "more comments" in place, so each run gets a fresh subreddit
+        "analyze_post_interactions": (
+            lambda fresh: analyze_post_interactions(fresh, "top", params["posts"]),
+            lambda: make_subreddit(**params),
+        ),
+        "annotate_sentiment": (lambda: annotate_sentiment(records), None),
+        "excel_export": (export_excel, None),
+        "train_lda": (lda, None),
+    }
+
+    results = {}
+    for name in only:
+        function, setup = benchmarks[name]
+        results[name] = measure(function, setup, repeat)
+        print(f"{scale:<8} {name:<26} {results[name]['best'] * 1000:10.1f} ms")
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def project_version() -> str:
+    with open(ROOT / "pyproject.toml", "rb") as pyproject:
+        return tomllib.load(pyproject)["project"]["version"]
+
+
+def latest_result(directory: Path = RESULTS_DIR) -> Path | None:
+    """
+    Most recent result file, file names starting with their UTC timestamp.
+    """
+    paths = sorted(directory.glob("*.json"))
+    return paths[-1] if paths else None
+
+
+def compare(
+    current: dict, baseline: dict, tolerance: float = 0.2, min_seconds: float = 0.01
+) -> list[str]:
+    """
+    Prints the change of every benchmark run in both result sets.
+    Args:
+        current (dict): Results of this run.
+        baseline (dict): Results of an earlier run.
+        tolerance (float): Relative slow-down above which a benchmark has regressed.
+        min_seconds (float): Slow-downs smaller than this are timer noise, never flagged.
+    Returns:
+        list[str]: The benchmarks that regressed, as "scale/name".
+    """
+    regressions = []
+    print(f"\nCompared with {baseline['version']} ({baseline['commit']}, {baseline['date']}):")
+    for scale, benchmarks in current["results"].items():
+        for name, timing in benchmarks.items():
+            previous = baseline["results"].get(scale, {}).get(name)
+            if not previous or not previous["best"]:
+                continue
+            ratio = timing["best"] / previous["best"]
+            flag = ""
+            if ratio > 1 + tolerance and timing["best"] - previous["best"] > min_seconds:
+                flag = "  REGRESSION"
+                regressions.append(f"{scale}/{name}")
+            print(f"{scale:<8} {name:<26} x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the pipeline offline, on generated subreddits."
+    )
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=["small", "medium"])
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark")
+    parser.add_argument("--baseline", type=Path, help="result file to compare with (latest by default)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slow-down flagged as regression")
+    parser.add_argument("--no-save", action="store_true", help="do not write the result file")
+    parser.add_argument("--strict", action="store_true", help="exit with 1 on regression")
+    args = parser.parse_args(argv)
+
+    now = datetime.now(timezone.utc)
+    current = {
+        "version": project_version(),
+        "commit": git_commit(),
+        "date": now.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "results": {scale: run_scale(scale, args.only, args.repeat) for scale in args.scales},
+    }
+
+    baseline_path = args.baseline or latest_result()
+    regressions = []
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as baseline_file:
+            regressions = compare(current, json.load(baseline_file), args.tolerance)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"{now:%Y%m%dT%H%M%S}_{current['commit'] or 'nogit'}.json"
+        with open(path, "w", encoding="utf-8") as result_file:
+            json.dump(current, result_file, indent=2)
+        print(f"\nResults saved to {path}")
+
+    return 1 if regressions and args.strict else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -36,4 +36,22 @@ key_words_3 = [
     "prompt engineering",
 ]
 
+# Reference queries of the semantic relevance filter (relevance.py)
+relevance_queries = [
+    "talking to an AI chatbot that imitates a person who died",
+    "using artificial intelligence to bring back a deceased loved one",
+    "a griefbot trained on the messages of my late mother",
+    "recreating the voice of someone who passed away",
+    "can technology help with grief and mourning",
+]
+# Cheap prefilter: only items containing one of these words are encoded
+relevance_prefilter = [
+    "grief", "grieving", "griefbot", "mourning", "loss", "lost", "death", "dead", "died",
+    "dying", "passed", "deceased", "funeral", "memorial", "late", "miss", "widow",
+    "mom", "dad", "mother", "father", "husband", "wife", "son", "daughter", "grandma",
+    "grandpa", "friend", "AI", "A.I.", "chatbot", "chatbots", "bot", "bots", "GPT",
+    "ChatGPT", "Replika", "character.AI", "avatar", "voice", "simulate", "simulation",
+    "replica", "recreate", "messages", "texts", "talk", "talking", "conversation",
+]
+
 webapp = "https://www.reddit.com/prefs/apps"
\ No newline at end of file
@@ -0,0 +1,211 @@
+import re
+import zlib
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from model import Post
+
+# Mersenne prime of the universal hash family, as in datasketch's MinHash
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+")
+_POST_ID = re.compile(r"/comments/([a-z0-9]+)")
+
+
+def shingles(text: str, size: int = 3) -> set[str]:
+    """
+    Word n-grams of a text, lowercased.
+    Args:
+        text (str): The text.
+        size (int): Number of words per shingle.
+    Returns:
+        set[str]: The shingles, the whole text as one shingle if it is shorter.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+class DedupIndex:
+    """
+    Index of posts and comments finding duplicates: crossposts, matched on the post
+    they crosspost, and copy-pasted posts and comments, found by MinHash/LSH without
+    comparing every pair.
+
+    Each text gets a MinHash signature, cut into bands: texts sharing a band
+    are candidates, confirmed when their estimated Jaccard similarity of shingles
+    reaches the threshold. Items are added incrementally; the first item of a cluster
+    is its canonical item and later duplicates are recorded under it.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        num_perm: int = 128,
+        bands: int = 32,
+        min_words: int = 15,
+        seed: int = 1,
+    ):
+        """
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of duplicates.
+            num_perm (int): Length of the MinHash signatures.
+            bands (int): Number of LSH bands, dividing num_perm. Texts whose similarity
+                is above about (1/bands)**(bands/num_perm) are likely to be compared.
+            min_words (int): Shorter texts ("Thank you so much") are never deduplicated.
+            seed (int): Seed of the hash functions.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.min_words = min_words
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._buckets: list[dict[bytes, list[str]]] = [{} for _ in range(bands)]
+        self._signatures: dict[str, np.ndarray] = {}
+        # Canonical key -> keys of its duplicates
+        self.duplicates: dict[str, list[str]] = {}
+        # Fullname of an original post -> key of the first post seen for it
+        self._posts: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a text.
+        """
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text)), np.uint64
+        )
+        if not len(hashes):
+            return np.full(len(self._a), _MAX_HASH)
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashes, self._a) + self._b) % _PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def add(self, key: str, text: str | None) -> str | None:
+        """
+        Adds a text to the index, unless it is a near-duplicate of an indexed one.
+        Args:
+            key (str): Identifier of the item, unique across subreddits.
+            text (str | None): Its text.
+        Returns:
+            str | None: Key of the canonical item it duplicates, None if it is new.
+        """
+        if not text or len(_WORD.findall(text)) < self.min_words:
+            return None
+        if key in self._signatures:
+            return None
+
+        signature = self.signature(text)
+        band_keys = [
+            signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+        candidates = {
+            other
+            for band, band_key in enumerate(band_keys)
+            for other in self._buckets[band].get(band_key, ())
+        }
+        best, best_similarity = None, self.threshold
+        for other in candidates:
+            similarity = float(np.mean(self._signatures[other] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = other, similarity
+        if best is not None:
+            self.duplicates.setdefault(best, []).append(key)
+            return best
+
+        # Only canonical items are indexed, so buckets grow with distinct texts
+        self._signatures[key] = signature
+        for band, band_key in enumerate(band_keys):
+            self._buckets[band].setdefault(band_key, []).append(key)
+        return None
+
+    def add_post(self, key: str, origin: str | None) -> str | None:
+        """
+        Adds a post to the index, unless it shares its original post with an indexed one.
+        Args:
+            key (str): Identifier of the post, unique across subreddits.
+            origin (str | None): Fullname of the post it crossposts, or its own.
+        Returns:
+            str | None: Key of the canonical post it duplicates, None if it is new.
+        """
+        if origin is None:
+            return None
+        canonical = self._posts.setdefault(origin, key)
+        if canonical == key:
+            return None
+        self.duplicates.setdefault(canonical, []).append(key)
+        return canonical
+
+    def filter(self, items: Iterable[Post]) -> Iterator[Post]:
+        """
+        Yields the items that do not duplicate an item already indexed, from this call
+        or a previous one (e.g. an earlier subreddit), consuming items lazily.
+        Posts are matched on the post they crosspost (a crosspost and its original,
+        or two crossposts of one post), then on their title and content. A duplicate
+        post is dropped with all its comments. Comments of the posts kept are compared
+        on their content.
+        Args:
+            items (Iterable[Post]): Posts, each followed by its comments, models or records.
+        Yields:
+            Post: The items kept, in their original order.
+        """
+        kept = dropped = 0
+        dropping = False
+        for item in items:
+            if item.Category == "comment":
+                duplicate = dropping or self.add(item_key(item), item.Content) is not None
+            else:
+                key = item_key(item)
+                text = " ".join(filter(None, (item.Thread_Title, item.Content)))
+                dropping = duplicate = (
+                    self.add_post(key, post_origin(item)) is not None
+                    or self.add(key, text) is not None
+                )
+            if duplicate:
+                dropped += 1
+            else:
+                kept += 1
+                yield item
+        print(f"Deduplication: {dropped} duplicates dropped, {kept} items kept")
+
+    def deduplicate(self, items: Iterable[Post]) -> list[Post]:
+        """
+        Drops the items that duplicate an item already indexed, see filter.
+        Args:
+            items (Iterable[Post]): Posts and comments, models or records.
+        Returns:
+            list[Post]: The items kept, in their original order.
+        """
+        return list(self.filter(items))
+
+
+def item_key(item: Post) -> str:
+    """
+    Key of a post/comment in a DedupIndex, its Reddit URL (the "id" column restarts
+    for every subreddit).
+    """
+    return item.Reddit_URL or f"{item.Subreddit}/{item.id}"
+
+
+def post_origin(item: Post) -> str | None:
+    """
+    Fullname of the post a post crossposts, or of the post itself (read from its
+    Reddit URL for items without a fullname).
+    """
+    crosspost_parent = getattr(item, "crosspost_parent", None)
+    if crosspost_parent:
+        return crosspost_parent
+    fullname = getattr(item, "fullname", None)
+    if fullname:
+        return fullname
+    match = _POST_ID.search(item.Reddit_URL or "")
+    return f"t3_{match.group(1)}" if match else None
@@ -0,0 +1,423 @@
+import csv
+import json
+import os
+import re
+import shutil
+import zipfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterable, Iterator
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+
+from model import Comment, Post
+
+COLUMNS = [
+    "id",
+    "Reddit_URL",
+    "Thread_Title",
+    "Subreddit",
+    "Content",
+    "Category",
+    "Author",
+    "Date_Posted",
+    "Number_of_comments",
+    "Upvotes",
+    "Keywords",
+    "Sentiment",
+    "Tag",
+    "Date_added",
+    "Who_added",
+]
+
+EXCEL_MAX_ROWS = 1_048_576
+MAX_SHEET_TITLE = 31
+_SHEET_DATA = re.compile(rb"<(?:\w+:)?sheetData[\s/>]")
+
+
+INT_COLUMNS = {"Number_of_comments", "Upvotes"}
+LIST_COLUMNS = {"Keywords"}
+LIST_SEPARATOR = ", "
+
+
+def row_values(item: Post, columns: list[str] = COLUMNS, join_lists: bool = True) -> list:
+    """
+    Reads the exported values of a post or comment.
+    Args:
+        item (Post): The Post or Comment object.
+        columns (list[str]): The attributes to read.
+        join_lists (bool): Whether list values are joined into one string.
+    Returns:
+        list: One value per column.
+    """
+    values = []
+    for col_name in columns:
+        value = getattr(item, col_name, None)
+        if join_lists and isinstance(value, list):
+            value = LIST_SEPARATOR.join(value)
+        values.append(value)
+    return values
+
+
+class Sink(ABC):
+    """
+    Destination of extracted posts and comments, written one group (sheet) at a time.
+    Every sink uses the COLUMNS schema and is saved once all groups are written.
+    """
+
+    def __init__(self, output_path: str, columns: list[str] = COLUMNS):
+        self.output_path = output_path
+        self.columns = columns
+
+    def __enter__(self) -> "Sink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.save()
+
+    @abstractmethod
+    def write_sheet(self, name: str, items: Iterable[Post]) -> int:
+        """
+        Writes a group of posts and comments, usually one subreddit.
+        Args:
+            name (str): Name of the group.
+            items (Iterable[Post]): Post and Comment objects, consumed lazily.
+        Returns:
+            int: Number of rows written.
+        """
+
+    @abstractmethod
+    def save(self) -> None:
+        """
+        Flushes and closes the output.
+        """
+
+
+class ExcelSink(Sink):
+    """
+    Streams posts and comments to an .xlsx file with openpyxl's write-only mode.
+
+    Rows are written as they come, so memory stays flat whatever the number of rows.
+    Column widths are tracked while rows go by and written into the file on save,
+    and a subreddit going over Excel's row limit continues on a new sheet.
+    """
+
+    def __init__(
+        self,
+        output_path: str = "reddit_threads_1.xlsx",
+        columns: list[str] = COLUMNS,
+        max_width: int = 60,
+        max_rows: int = EXCEL_MAX_ROWS,
+    ):
+        super().__init__(output_path, columns)
+        self.max_width = max_width
+        self.max_rows = max_rows
+        self._wb = Workbook(write_only=True)
+        self._widths: list[list[int]] = []
+        self._titles: set[str] = set()
+
+    def _sheet_title(self, name: str, part: int) -> str:
+        suffix = f" ({part})" if part > 1 else ""
+        title = name[: MAX_SHEET_TITLE - len(suffix)] + suffix
+        while title in self._titles:
+            part += 1
+            suffix = f" ({part})"
+            title = name[: MAX_SHEET_TITLE - len(suffix)] + suffix
+        self._titles.add(title)
+        return title
+
+    def _new_sheet(self, name: str, part: int):
+        ws = self._wb.create_sheet(title=self._sheet_title(name, part))
+        header = []
+        for col_name in self.columns:
+            cell = WriteOnlyCell(ws, value=col_name)
+            cell.font = Font(bold=True)
+            cell.alignment = Alignment(horizontal="center")
+            header.append(cell)
+        ws.append(header)
+        self._widths.append([len(col_name) for col_name in self.columns])
+        return ws
+
+    def write_sheet(self, name: str, items: Iterable[Post]) -> int:
+        # A new sheet per group, continuing on extra sheets past the row limit
+        part = 1
+        ws = self._new_sheet(name, part)
+        widths = self._widths[-1]
+        rows_in_sheet = 1
+        written = 0
+
+        for item in items:
+            if rows_in_sheet >= self.max_rows:
+                part += 1
+                ws = self._new_sheet(name, part)
+                widths = self._widths[-1]
+                rows_in_sheet = 1
+            values = row_values(item, self.columns)
+            ws.append(values)
+            for col_idx, value in enumerate(values):
+                if value is not None:
+                    length = len(str(value))
+                    if length > widths[col_idx]:
+                        widths[col_idx] = length
+            rows_in_sheet += 1
+            written += 1
+        return written
+
+    def save(self) -> None:
+        # Column widths are only known now, they are written into the saved file
+        if not self._widths:
+            # An empty write-only workbook cannot be saved
+            self._wb.create_sheet(title="Sheet")
+        self._wb.save(self.output_path)
+        if self._widths:
+            self._write_column_widths()
+
+    def _cols_xml(self, widths: list[int]) -> bytes:
+        cols = "".join(
+            f'<col min="{idx}" max="{idx}" width="{min(width + 2, self.max_width)}" customWidth="1"/>'
+            for idx, width in enumerate(widths, start=1)
+        )
+        return f"<cols>{cols}</cols>".encode()
+
+    def _write_column_widths(self) -> None:
+        # Write-only sheets put their <cols> before the first row, when widths are still
+        # unknown. The file is copied member by member, inserting <cols> in each sheet.
+        tmp_path = f"{self.output_path}.tmp"
+        sheets = {
+            f"xl/worksheets/sheet{idx}.xml": widths
+            for idx, widths in enumerate(self._widths, start=1)
+        }
+        with zipfile.ZipFile(self.output_path) as src, zipfile.ZipFile(
+            tmp_path, "w", compression=zipfile.ZIP_DEFLATED
+        ) as dst:
+            for info in src.infolist():
+                with src.open(info) as reader, dst.open(info.filename, "w") as writer:
+                    if info.filename in sheets:
+                        _insert_before_sheet_data(reader, writer, self._cols_xml(sheets[info.filename]))
+                    shutil.copyfileobj(reader, writer)
+        os.replace(tmp_path, self.output_path)
+
+
+def _insert_before_sheet_data(reader, writer, payload: bytes, chunk_size: int = 64 * 1024) -> None:
+    # Copies the head of a sheet until <sheetData>, writes payload, leaves the rest to the caller
+    buffer = b""
+    while True:
+        chunk = reader.read(chunk_size)
+        buffer += chunk
+        match = _SHEET_DATA.search(buffer)
+        if match or not chunk:
+            break
+    if match is None:
+        writer.write(buffer)
+        return
+    writer.write(buffer[: match.start()])
+    writer.write(payload)
+    writer.write(buffer[match.start() :])
+
+
+class JsonlSink(Sink):
+    """
+    Streams posts and comments to a JSON Lines file, one object per row.
+    """
+
+    def __init__(self, output_path: str, columns: list[str] = COLUMNS):
+        super().__init__(output_path, columns)
+        self._file = open(output_path, "w", encoding="utf-8")
+
+    def write_sheet(self, name: str, items: Iterable[Post]) -> int:
+        written = 0
+        for item in items:
+            row = dict(zip(self.columns, row_values(item, self.columns, join_lists=False)))
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            written += 1
+        return written
+
+    def save(self) -> None:
+        self._file.close()
+
+
+class CsvSink(Sink):
+    """
+    Streams posts and comments to a CSV file with a header row.
+    """
+
+    def __init__(self, output_path: str, columns: list[str] = COLUMNS):
+        super().__init__(output_path, columns)
+        self._file = open(output_path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write_sheet(self, name: str, items: Iterable[Post]) -> int:
+        written = 0
+        for item in items:
+            self._writer.writerow(row_values(item, self.columns))
+            written += 1
+        return written
+
+    def save(self) -> None:
+        self._file.close()
+
+
+class ParquetSink(Sink):
+    """
+    Writes posts and comments to a Parquet file in batches, each group in its own
+    row groups. Requires pyarrow.
+    """
+
+    def __init__(self, output_path: str, columns: list[str] = COLUMNS, batch_size: int = 10_000):
+        super().__init__(output_path, columns)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from exc
+        self._pa = pa
+        self.batch_size = batch_size
+        self.schema = pa.schema(
+            [
+                (
+                    col_name,
+                    pa.list_(pa.string())
+                    if col_name in LIST_COLUMNS
+                    else pa.int64()
+                    if col_name in INT_COLUMNS
+                    else pa.string(),
+                )
+                for col_name in columns
+            ]
+        )
+        self._writer = pq.ParquetWriter(output_path, self.schema)
+
+    def _flush(self, batch: list[list]) -> None:
+        if batch:
+            arrays = list(zip(*batch))
+            self._writer.write_table(
+                self._pa.Table.from_arrays(
+                    [self._pa.array(column, type=field.type) for column, field in zip(arrays, self.schema)],
+                    schema=self.schema,
+                )
+            )
+
+    def write_sheet(self, name: str, items: Iterable[Post]) -> int:
+        batch = []
+        written = 0
+        for item in items:
+            batch.append(row_values(item, self.columns, join_lists=False))
+            written += 1
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        # Never mix two groups in the same row group
+        self._flush(batch)
+        return written
+
+    def save(self) -> None:
+        self._writer.close()
+
+
+SINKS = {
+    ".xlsx": ExcelSink,
+    ".jsonl": JsonlSink,
+    ".csv": CsvSink,
+    ".parquet": ParquetSink,
+}
+
+
+def open_sink(output_path: str, columns: list[str] = COLUMNS) -> Sink:
+    """
+    Opens the sink matching the extension of the output file.
+    Args:
+        output_path (str): Path of the file to write (.xlsx, .jsonl, .csv or .parquet).
+        columns (list[str]): The columns to export.
+    Returns:
+        Sink: The opened sink.
+    """
+    suffix = Path(output_path).suffix.lower()
+    if suffix not in SINKS:
+        raise ValueError(f"Unknown export format '{suffix}', expected one of {list(SINKS)}")
+    return SINKS[suffix](output_path, columns)
+
+
+def _read_rows(path: str) -> Iterator[dict]:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    elif suffix == ".csv":
+        with open(path, "r", encoding="utf-8", newline="") as file:
+            for row in csv.DictReader(file):
+                yield {key: value if value != "" else None for key, value in row.items()}
+    elif suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet loading requires pyarrow: pip install pyarrow") from exc
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    elif suffix == ".xlsx":
+        wb = load_workbook(path, read_only=True)
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            for values in rows:
+                yield dict(zip(header, values))
+        wb.close()
+    else:
+        raise ValueError(f"Unknown export format '{suffix}', expected one of {list(SINKS)}")
+
+
+def _normalize_row(row: dict) -> dict:
+    # Text formats keep numbers as strings and lists joined
+    for col_name in INT_COLUMNS:
+        if isinstance(row.get(col_name), str):
+            row[col_name] = int(row[col_name])
+    for col_name in LIST_COLUMNS:
+        if isinstance(row.get(col_name), str):
+            row[col_name] = row[col_name].split(LIST_SEPARATOR)
+    return row
+
+
+def _model_data(row: dict) -> dict:
+    # Some Post fields are only populated through their alias ("Date added"...)
+    return {
+        (field.alias or name): row[name]
+        for name, field in Post.model_fields.items()
+        if name in row and name != "Post"
+    }
+
+
+def load_items(path: str, records: bool = False) -> list:
+    """
+    Reads back an export, without touching Reddit.
+    Args:
+        path (str): Path of an export written by one of the sinks.
+        records (bool): Whether to return lightweight records instead of pydantic models.
+    Returns:
+        list: Post and Comment objects, comments linked to their post; or records
+            with one attribute per column.
+    """
+    items = []
+    posts: dict[tuple[str | None, str], Post] = {}
+    for row in _read_rows(path):
+        row = _normalize_row(row)
+        if records:
+            items.append(SimpleNamespace(**row))
+            continue
+        if row.get("Category") == "comment":
+            # Comment ids extend their post id: RD-01-03-02 belongs to RD-01-03
+            parent_id = row["id"].rsplit("-", 1)[0]
+            parent = posts.get((row.get("Subreddit"), parent_id))
+            if parent is None:
+                raise ValueError(f"Comment {row['id']} has no post {parent_id} before it in {path}")
+            items.append(Comment(**_model_data(row), Post=parent))
+        else:
+            post = Post(**_model_data(row))
+            posts[(post.Subreddit, post.id)] = post
+            items.append(post)
+    return items
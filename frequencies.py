@@ -0,0 +1,191 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+from scipy import sparse
+
+from model import Post
+
+
+@lru_cache(maxsize=None)
+def _month(date_posted: str | None) -> str:
+    # Date_Posted is formatted "dd/mm/YYYY"
+    if not date_posted:
+        return ""
+    return datetime.strptime(date_posted, "%d/%m/%Y").strftime("%Y-%m")
+
+
+def _top(scores: np.ndarray, terms: np.ndarray, n: int) -> list[tuple[str, float]]:
+    # Stable sort: ties keep the order words were first seen in, like Counter.most_common
+    order = np.argsort(-scores, kind="stable")[:n]
+    return [(str(terms[i]), scores[i].item()) for i in order if scores[i] > 0]
+
+
+class TermMatrix:
+    """
+    Sparse document-term count matrix of posts/comments, built once and queried with
+    column sums over any subset of its rows (a subreddit, a category, a month...).
+    """
+
+    def __init__(self, posts: Iterable[Post], stopwords: Iterable[str] | None = None):
+        """
+        Tokenizes the title and content of each item like frequent_words: lowercased
+        alphabetic words of more than 3 letters, stopwords removed.
+        Args:
+            posts (Iterable[Post]): Posts and comments.
+            stopwords (Iterable[str] | None): Words to ignore, get_words_list() by default.
+        """
+        if stopwords is None:
+            from utils import get_words_list
+
+            stopwords = get_words_list()
+        stopwords = frozenset(stopwords)
+
+        vocabulary: dict[str, int] = {}
+        indices: list[int] = []
+        indptr = [0]
+        subreddits, categories, months, keywords = [], [], [], []
+        for post in posts:
+            text = " ".join(filter(None, (post.Content, post.Thread_Title)))
+            for word in text.split():
+                if len(word) > 3 and word.isalpha():
+                    word = word.lower()
+                    if word not in stopwords:
+                        indices.append(vocabulary.setdefault(word, len(vocabulary)))
+            indptr.append(len(indices))
+            subreddits.append(post.Subreddit or "")
+            categories.append(post.Category)
+            months.append(_month(post.Date_Posted))
+            keywords.append(post.Keywords)
+
+        # Repeated (document, word) entries are summed into counts
+        self.counts = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), np.array(indices, dtype=np.int32), indptr),
+            shape=(len(indptr) - 1, len(vocabulary)),
+        )
+        self.counts.sum_duplicates()
+        self.terms = np.array(list(vocabulary), dtype=object)
+        self.groups = {
+            "subreddit": np.array(subreddits, dtype=object),
+            "category": np.array(categories, dtype=object),
+            "month": np.array(months, dtype=object),
+        }
+        self._keywords = keywords
+
+    def __len__(self) -> int:
+        return self.counts.shape[0]
+
+    def mask(self, field: str, value: str) -> np.ndarray:
+        """
+        Selects the items of one group.
+        Args:
+            field (str): "subreddit", "category" or "month".
+            value (str): The group, e.g. "r/GriefSupport", "comment" or "2024-05".
+        Returns:
+            np.ndarray: Boolean mask of the rows.
+        """
+        return self.groups[field] == value
+
+    def keyword_mask(self, keywords: Iterable[str]) -> np.ndarray:
+        """
+        Selects the items that matched one of the keywords during extraction.
+        Args:
+            keywords (Iterable[str]): Keywords, e.g. key_words_1.
+        Returns:
+            np.ndarray: Boolean mask of the rows.
+        """
+        wanted = {keyword.lower() for keyword in keywords}
+        return np.fromiter(
+            (any(keyword.lower() in wanted for keyword in found or ()) for found in self._keywords),
+            bool,
+            len(self),
+        )
+
+    def term_counts(self, mask: np.ndarray | None = None) -> np.ndarray:
+        """
+        Number of occurrences of every term, in all items or in a subset.
+        """
+        counts = self.counts if mask is None else self.counts[mask]
+        return np.asarray(counts.sum(axis=0)).ravel()
+
+    def top_terms(self, n: int = 20, mask: np.ndarray | None = None) -> list[tuple[str, int]]:
+        """
+        Most common terms.
+        Args:
+            n (int): Number of terms.
+            mask (np.ndarray | None): Rows to count, all by default.
+        Returns:
+            list[tuple[str, int]]: The terms and their number of occurrences.
+        """
+        return _top(self.term_counts(mask), self.terms, n)
+
+    def top_terms_by(self, field: str, n: int = 20) -> dict[str, list[tuple[str, int]]]:
+        """
+        Most common terms of every group of a field, from one sparse product.
+        Args:
+            field (str): "subreddit", "category" or "month".
+            n (int): Number of terms per group.
+        Returns:
+            dict[str, list[tuple[str, int]]]: The top terms of each group, groups sorted.
+        """
+        values, rows = np.unique(self.groups[field], return_inverse=True)
+        membership = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, np.arange(len(rows)))),
+            shape=(len(values), len(rows)),
+        )
+        group_counts = (membership @ self.counts).toarray()
+        return {
+            str(value): _top(group_counts[i], self.terms, n) for i, value in enumerate(values)
+        }
+
+    def idf(self) -> np.ndarray:
+        """
+        Smoothed inverse document frequency of every term, over all items.
+        """
+        document_frequency = np.bincount(self.counts.indices, minlength=len(self.terms))
+        return np.log((1 + len(self)) / (1 + document_frequency)) + 1
+
+    def tfidf_terms(self, n: int = 20, mask: np.ndarray | None = None) -> list[tuple[str, float]]:
+        """
+        Terms with the highest TF-IDF weight summed over a subset, favouring words
+        frequent there but rare in the whole corpus.
+        Args:
+            n (int): Number of terms.
+            mask (np.ndarray | None): Rows to weigh, all by default.
+        Returns:
+            list[tuple[str, float]]: The terms and their weight.
+        """
+        return _top(self.term_counts(mask) * self.idf(), self.terms, n)
+
+    def distinctive_terms(
+        self,
+        mask_a: np.ndarray,
+        mask_b: np.ndarray,
+        n: int = 20,
+        prior: float = 0.01,
+    ) -> tuple[list[tuple[str, float]], list[tuple[str, float]]]:
+        """
+        Words that distinguish two groups, by weighted log-odds ratio with an informative
+        Dirichlet prior (Monroe, Colaresi & Quinn, 2008): the prior is the frequency of
+        each word in the whole corpus, so rare words do not dominate.
+        Args:
+            mask_a (np.ndarray): Rows of the first group.
+            mask_b (np.ndarray): Rows of the second group.
+            n (int): Number of terms per group.
+            prior (float): Weight of the prior, as a share of the corpus counts.
+        Returns:
+            tuple: The most distinctive terms of each group, with their z-score.
+        """
+        alpha = self.term_counts() * prior + 1e-9
+        alpha_total = alpha.sum()
+        counts_a, counts_b = self.term_counts(mask_a), self.term_counts(mask_b)
+        total_a, total_b = counts_a.sum(), counts_b.sum()
+
+        log_odds_a = np.log(counts_a + alpha) - np.log(total_a + alpha_total - counts_a - alpha)
+        log_odds_b = np.log(counts_b + alpha) - np.log(total_b + alpha_total - counts_b - alpha)
+        z_scores = (log_odds_a - log_odds_b) / np.sqrt(1 / (counts_a + alpha) + 1 / (counts_b + alpha))
+
+        present = (counts_a + counts_b) > 0
+        z_a = np.where(present, z_scores, 0)
+        return _top(z_a, self.terms, n), _top(-z_a, self.terms, n)
@@ -0,0 +1,228 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator
+
+logger = logging.getLogger("reddit_pipeline")
+
+# Scope of the measures taken outside any subreddit
+RUN_SCOPE = "run"
+
+_NULL_CONTEXT = nullcontext()
+
+
+class RunReport:
+    """
+    Timers and counters of a run, grouped by scope (a subreddit, "lda"...) and stage.
+
+    The scope of a thread is set by the code it runs (extract_post_data sets its
+    subreddit), so API requests and rate-limit waits made by worker threads are
+    charged to the subreddit they work for.
+    """
+
+    enabled = True
+
+    def __init__(self, progress_interval: float | None = None):
+        """
+        Args:
+            progress_interval (float | None): Seconds between two progress lines logged
+                to the "reddit_pipeline" logger, None for no progress logging.
+        """
+        self.started = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        # scope -> stage -> [seconds, calls]
+        self.timings: dict[str, dict[str, list]] = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+        self.counters: dict[str, Counter] = defaultdict(Counter)
+        self.progress_interval = progress_interval
+        self._last_progress = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def current_scope(self) -> str:
+        return getattr(self._local, "scope", RUN_SCOPE)
+
+    @contextmanager
+    def set_scope(self, scope: str) -> Iterator[None]:
+        """
+        Charges the measures of the calling thread to a scope within the enclosed
+        block, the previous scope being restored after it (threads of a pool run
+        other work afterwards).
+        """
+        previous = self.current_scope()
+        self._local.scope = scope
+        try:
+            yield
+        finally:
+            self._local.scope = previous
+
+    def bind(self, function: Callable) -> Callable:
+        """
+        Wraps a function so that it runs in the caller's scope, for thread pools.
+        """
+        scope = self.current_scope()
+
+        def bound(*args, **kwargs):
+            with self.set_scope(scope):
+                return function(*args, **kwargs)
+
+        return bound
+
+    def add_time(self, stage: str, seconds: float, scope: str | None = None) -> None:
+        scope = scope or self.current_scope()
+        with self._lock:
+            timing = self.timings[scope][stage]
+            timing[0] += seconds
+            timing[1] += 1
+        self._log_progress()
+
+    def count(self, name: str, n: int = 1, scope: str | None = None) -> None:
+        scope = scope or self.current_scope()
+        with self._lock:
+            self.counters[scope][name] += n
+        self._log_progress()
+
+    def timer(self, stage: str, scope: str | None = None) -> "_Timer":
+        """
+        Times the enclosed block. The timer can be entered again, so a loop can
+        create it once and time each of its iterations.
+        """
+        return _Timer(self, stage, scope)
+
+    def timed(self, iterable: Iterable, stage: str, scope: str | None = None) -> Iterator:
+        """
+        Yields the items of an iterable, timing how long each one takes to produce
+        (e.g. a listing fetching a page every 100 posts).
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - start, scope)
+                return
+            self.add_time(stage, time.perf_counter() - start, scope)
+            yield item
+
+    def _log_progress(self) -> None:
+        if self.progress_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        with self._lock:
+            summary = {scope: dict(counters) for scope, counters in self.counters.items()}
+        logger.info("%.0fs elapsed: %s", time.perf_counter() - self._start, summary)
+
+    def to_dict(self) -> dict:
+        """
+        The report as JSON-serializable data.
+        """
+        with self._lock:
+            scopes = sorted(set(self.timings) | set(self.counters))
+            return {
+                "started": self.started.isoformat(timespec="seconds"),
+                "duration_seconds": round(time.perf_counter() - self._start, 3),
+                "scopes": {
+                    scope: {
+                        "stages": {
+                            stage: {"seconds": round(seconds, 4), "calls": calls}
+                            for stage, (seconds, calls) in self.timings[scope].items()
+                        },
+                        "counters": dict(self.counters[scope]),
+                    }
+                    for scope in scopes
+                },
+            }
+
+    def save(self, path: str = "run_report.json") -> None:
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(self.to_dict(), report_file, indent=2)
+        print(f"Run report saved to {path}")
+
+
+class _Timer:
+    """
+    Context manager adding the time spent in its block to a stage of a report.
+    """
+
+    __slots__ = ("report", "stage", "scope", "_start")
+
+    def __init__(self, report: RunReport, stage: str, scope: str | None):
+        self.report = report
+        self.stage = stage
+        self.scope = scope
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.report.add_time(self.stage, time.perf_counter() - self._start, self.scope)
+
+
+class NullReport:
+    """
+    Report used while instrumentation is off: every call does nothing.
+    """
+
+    enabled = False
+
+    def current_scope(self) -> str:
+        return RUN_SCOPE
+
+    def set_scope(self, scope: str) -> nullcontext:
+        return _NULL_CONTEXT
+
+    def bind(self, function: Callable) -> Callable:
+        return function
+
+    def add_time(self, stage: str, seconds: float, scope: str | None = None) -> None:
+        pass
+
+    def count(self, name: str, n: int = 1, scope: str | None = None) -> None:
+        pass
+
+    def timer(self, stage: str, scope: str | None = None) -> nullcontext:
+        return _NULL_CONTEXT
+
+    def timed(self, iterable: Iterable, stage: str, scope: str | None = None) -> Iterable:
+        return iterable
+
+
+_report: RunReport | NullReport = NullReport()
+
+
+def current() -> RunReport | NullReport:
+    """
+    The report of the running pipeline, a NullReport when instrumentation is off.
+    """
+    return _report
+
+
+def enable(progress_interval: float | None = None) -> RunReport:
+    """
+    Starts recording a new run report.
+    Args:
+        progress_interval (float | None): Seconds between two progress lines, None for none.
+    Returns:
+        RunReport: The report, to be saved at the end of the run.
+    """
+    global _report
+    if progress_interval is not None and logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+    _report = RunReport(progress_interval)
+    return _report
+
+
+def disable() -> RunReport | NullReport:
+    """
+    Stops recording and returns the report recorded so far.
+    """
+    global _report
+    report, _report = _report, NullReport()
+    return report
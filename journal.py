@@ -0,0 +1,161 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Callable, Iterator
+
+import instrumentation
+from export import COLUMNS, row_values
+from model import Post
+from utils import ListingCursor, iter_post_data
+
+if TYPE_CHECKING:
+    from praw.models import Subreddit
+
+
+def _drop_torn_line(path: Path, chunk_size: int = 4096) -> None:
+    # A crash while appending can leave half a line, cut off before appending again
+    with open(path, "rb+") as file:
+        end = position = file.seek(0, os.SEEK_END)
+        while position > 0:
+            step = min(chunk_size, position)
+            file.seek(position - step)
+            newline = file.read(step).rfind(b"\n")
+            if newline != -1:
+                position += newline + 1 - step
+                break
+            position -= step
+        if position < end:
+            file.truncate(position)
+
+
+def run_directory(
+    run_id: str,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    root: str = "extraction_journal",
+) -> str:
+    """
+    Journal directory of one run, named after its date window and id, so that a new
+    run never reads the journal of an older one.
+    Args:
+        run_id (str): Identifier of the run, e.g. the day it was started. Pass the same
+            id to resume a crashed run, a new one to extract again.
+        start_date (datetime | None): Start date of the run.
+        end_date (datetime | None): End date of the run.
+        root (str): Directory holding the journals of all runs.
+    Returns:
+        str: The directory, to pass as journal to save_subreddits_to_excel.
+    """
+    window = "_".join(
+        date.strftime("%Y-%m-%d") if date else "open" for date in (start_date, end_date)
+    )
+    return str(Path(root) / f"{window}_{run_id}")
+
+
+class ExtractionJournal:
+    """
+    Append-only record of an extraction run, one JSON Lines file per subreddit.
+
+    Each line holds a post read from the listing, its kept comments and the listing
+    cursor after it, flushed as soon as the post is done. A restarted run reads the
+    cursor of the last complete line and carries on from there, without fetching or
+    renumbering the posts already journaled. Items are kept as exported rows, so the
+    output is written from the journal without holding the whole run in memory.
+    Use a new directory for a run with different settings.
+    """
+
+    def __init__(self, directory: str = "extraction_journal", columns: list[str] = COLUMNS):
+        """
+        Args:
+            directory (str): Directory of the journal files, created if missing.
+            columns (list[str]): Fields of the items to keep.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.columns = columns
+
+    def path(self, subreddit_name: str) -> Path:
+        return self.directory / f"{subreddit_name}.jsonl"
+
+    def _entries(self, subreddit_name: str) -> Iterator[dict]:
+        path = self.path(subreddit_name)
+        if not path.exists():
+            return
+        with open(path, "r", encoding="utf-8") as journal_file:
+            for line in journal_file:
+                # A torn last line is the post that was being written, not done yet
+                if not line.endswith("\n"):
+                    return
+                yield json.loads(line)
+
+    def cursor(self, subreddit_name: str) -> ListingCursor:
+        """
+        Where the extraction of a subreddit stopped, an empty cursor if it never started.
+        """
+        cursor = ListingCursor()
+        for entry in self._entries(subreddit_name):
+            cursor = ListingCursor(**entry["cursor"])
+        return cursor
+
+    def items(self, subreddit_name: str) -> Iterator[SimpleNamespace]:
+        """
+        Reads back the journaled posts and comments of a subreddit, in extraction order.
+        Yields:
+            SimpleNamespace: The items, with one attribute per column.
+        """
+        for entry in self._entries(subreddit_name):
+            for row in entry["items"]:
+                yield SimpleNamespace(**row)
+
+    def _row(self, item: Post) -> dict:
+        row = dict(zip(self.columns, row_values(item, self.columns, join_lists=False)))
+        # Not exported, kept for DedupIndex to match crossposts
+        crosspost_parent = getattr(item, "crosspost_parent", None)
+        if crosspost_parent:
+            row["crosspost_parent"] = crosspost_parent
+        return row
+
+    def extract(
+        self,
+        subreddit: "Subreddit",
+        limit: int,
+        process: Callable[[list[Post]], list[Post]] | None = None,
+        **kwargs,
+    ) -> ListingCursor:
+        """
+        Extracts a subreddit with iter_post_data from where the journal stopped,
+        appending every post as it is done.
+        Args:
+            subreddit (Subreddit): The subreddit to extract data from.
+            limit (int): Maximum number of posts and comments to extract, over all runs.
+            process (Callable | None): Function applied to the items of each post before
+                they are journaled, e.g. annotate_sentiment.
+            **kwargs: Other arguments of iter_post_data (start_date, key_words...).
+        Returns:
+            ListingCursor: The cursor at the end of the extraction.
+        """
+        report = instrumentation.current()
+        name = subreddit.display_name
+        path = self.path(name)
+        if path.exists():
+            _drop_torn_line(path)
+        cursor = self.cursor(name)
+        if cursor.done:
+            print(f"r/{name} already extracted ({cursor.items} items), skipping")
+            return cursor
+        if cursor.after:
+            print(f"Resuming r/{name} after {cursor.posts} posts ({cursor.items} items)")
+
+        with open(path, "a", encoding="utf-8") as journal_file:
+            for items, cursor in iter_post_data(subreddit, limit, cursor=cursor, **kwargs):
+                if process and items:
+                    items = process(items)
+                entry = {"cursor": cursor._asdict(), "items": [self._row(item) for item in items]}
+                with report.timer("journal"):
+                    journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    # Flushed per post so a crashed process loses at most the current one
+                    journal_file.flush()
+            os.fsync(journal_file.fileno())
+        return cursor
@@ -0,0 +1,335 @@
+import json
+import re
+import sqlite3
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from model import CommentRecord, Post, PostRecord, date_added_today, to_models
+from utils import get_keyword_matcher, iter_post_data, to_timestamp
+
+if TYPE_CHECKING:
+    from praw.models import Subreddit
+
+    from scheduler import RateLimiter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    rowid INTEGER PRIMARY KEY,
+    subreddit TEXT NOT NULL,
+    fullname TEXT NOT NULL,
+    post_rowid INTEGER,
+    position INTEGER NOT NULL,
+    created_utc REAL,
+    depth INTEGER,
+    path_score INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_by_subreddit ON items (subreddit, post_rowid, position);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, content, content='', tokenize='unicode61'
+);
+"""
+
+POST_FIELDS = (
+    "fullname", "Reddit_URL", "Thread_Title", "Subreddit", "Content", "Author",
+    "created_utc", "Number_of_comments", "Upvotes", "Tag", "crosspost_parent",
+)
+COMMENT_FIELDS = (
+    "fullname", "parent_id", "Reddit_URL", "Subreddit", "Content", "Author",
+    "created_utc", "Upvotes",
+)
+_TOKEN = re.compile(r"[^\W_]", flags=re.UNICODE)
+
+
+def fts_query(keywords: list[str]) -> str | None:
+    """
+    FTS5 query matching every text where one of the keywords could be found, each
+    keyword being searched as a phrase of its words.
+    Args:
+        keywords (list[str]): The keywords.
+    Returns:
+        str | None: The query, None if a keyword has no word to search for.
+    """
+    phrases = []
+    for keyword in dict.fromkeys(kw.lower() for kw in keywords if kw):
+        if not _TOKEN.search(keyword):
+            return None
+        phrases.append('"' + keyword.replace('"', '""') + '"')
+    return " OR ".join(phrases)
+
+
+class KeywordIndex:
+    """
+    SQLite full-text index of subreddits crawled once without keyword filter, to
+    re-slice them with any keyword list, date window or subreddit set offline.
+
+    The FTS5 index finds the candidate items, which are then checked with the
+    KeywordMatcher of extract_post_data, so results follow the same whole-word,
+    case-insensitive rules and the same grouping: a post is kept if it matches or
+    one of its comments does, a comment matching on its content or its post title.
+    """
+
+    def __init__(self, path: str = "keyword_index.sqlite"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def subreddits(self) -> list[str]:
+        return [row[0] for row in self._conn.execute("SELECT DISTINCT subreddit FROM items")]
+
+    def crawl(
+        self,
+        subreddit: "Subreddit",
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        listing: str | None = None,
+        more_limit: int | None = 0,
+        comment_workers: int = 1,
+        limiter: "RateLimiter | None" = None,
+    ) -> int:
+        """
+        Extracts a whole subreddit without keyword filter and indexes it, replacing
+        what was indexed for it before.
+        Queries reproduce live runs made with the same listing and more_limit.
+        Args:
+            subreddit (Subreddit): The subreddit to crawl.
+            start_date (datetime | None): Oldest posts/comments to index.
+            end_date (datetime | None): Newest posts/comments to index.
+            listing (str | None): Listing to scan, see extract_post_data.
+            more_limit (int | None): Maximum number of "more comments" expansions per post.
+            comment_workers (int): Number of threads loading comment trees ahead.
+            limiter (RateLimiter | None): Request budget shared by the comment workers.
+        Returns:
+            int: Number of items indexed.
+        """
+        name = subreddit.display_name
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO items_fts (items_fts, rowid, title, content) "
+                "SELECT 'delete', rowid, json_extract(data, '$.Thread_Title'), "
+                "json_extract(data, '$.Content') FROM items WHERE subreddit = ?",
+                (name,),
+            )
+            self._conn.execute("DELETE FROM items WHERE subreddit = ?", (name,))
+
+        indexed = 0
+        threads = iter_post_data(
+            subreddit,
+            limit=sys.maxsize,
+            start_date=start_date,
+            end_date=end_date,
+            listing=listing,
+            more_limit=more_limit,
+            comment_workers=comment_workers,
+            limiter=limiter,
+        )
+        with self._conn:
+            for position, (items, _) in enumerate(threads):
+                if items:
+                    self._add_thread(name, position, items[0], items[1:])
+                    indexed += len(items)
+        print(f"Indexed r/{name}: {indexed} items")
+        return indexed
+
+    def _add_thread(
+        self, name: str, position: int, post: PostRecord, comments: list[CommentRecord]
+    ) -> None:
+        post_data = {field: getattr(post, field) for field in POST_FIELDS}
+        post_rowid = self._conn.execute(
+            "INSERT INTO items (subreddit, fullname, post_rowid, position, created_utc, data) "
+            "VALUES (?, ?, NULL, ?, ?, ?)",
+            (name, post.fullname, position, post.created_utc, json.dumps(post_data)),
+        ).lastrowid
+        self._conn.execute(
+            "INSERT INTO items_fts (rowid, title, content) VALUES (?, ?, ?)",
+            (post_rowid, post.Thread_Title, post.Content),
+        )
+
+        # Depth and lowest score on the path from the top, for max_depth and min_score.
+        # Comments come breadth first, so a parent is always seen before its replies.
+        paths: dict[str, tuple[int, int]] = {}
+        for comment_position, comment in enumerate(comments):
+            parent_depth, parent_score = paths.get(comment.parent_id, (-1, comment.Upvotes))
+            depth, path_score = parent_depth + 1, min(parent_score, comment.Upvotes)
+            paths[comment.fullname] = (depth, path_score)
+            comment_data = {field: getattr(comment, field) for field in COMMENT_FIELDS}
+            rowid = self._conn.execute(
+                "INSERT INTO items (subreddit, fullname, post_rowid, position, created_utc, "
+                "depth, path_score, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    comment.fullname,
+                    post_rowid,
+                    comment_position,
+                    comment.created_utc,
+                    depth,
+                    path_score,
+                    json.dumps(comment_data),
+                ),
+            ).lastrowid
+            self._conn.execute(
+                "INSERT INTO items_fts (rowid, content) VALUES (?, ?)", (rowid, comment.Content)
+            )
+
+    def query(
+        self,
+        subreddit_name: str,
+        limit: int,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        key_words: list[str] | None = None,
+        max_depth: int | None = None,
+        min_score: int | None = None,
+        as_records: bool = False,
+    ) -> list[Post]:
+        """
+        Selects indexed posts and comments like extract_post_data would select them
+        live, without any API call. Posts keep the order of the crawled listing, so
+        compare with live runs made with the listing of the crawl.
+        Args:
+            subreddit_name (str): Name of the indexed subreddit.
+            limit (int): Maximum number of posts, and of comments per post.
+            start_date (datetime | None): Start date for filtering posts/comments.
+            end_date (datetime | None): End date for filtering posts/comments.
+            key_words (list[str] | None): List of keywords to filter posts/comments.
+            max_depth (int | None): Deepest comment level, 0 being top-level comments.
+            min_score (int | None): Comments scored below are skipped with their replies.
+            as_records (bool): Whether to return PostRecord/CommentRecord objects
+                instead of pydantic models.
+        Returns:
+            list[Post]: Post and Comment objects, numbered like a live run's.
+        """
+        start_ts = to_timestamp(start_date)
+        end_ts = to_timestamp(end_date)
+        window = " AND created_utc >= ? AND created_utc <= ?"
+        bounds = (
+            start_ts if start_ts is not None else float("-inf"),
+            end_ts if end_ts is not None else float("inf"),
+        )
+        comment_filter = window
+        comment_params: tuple = bounds
+        if max_depth is not None:
+            comment_filter += " AND depth <= ?"
+            comment_params += (max_depth,)
+        if min_score is not None:
+            comment_filter += " AND path_score >= ?"
+            comment_params += (min_score,)
+
+        posts: dict[int, tuple[int, dict]] = {}
+        # Post rowid -> [(position, rowid, data)] of the comments kept
+        comments: dict[int, list[tuple[int, int, dict]]] = defaultdict(list)
+        matcher = get_keyword_matcher(key_words) if key_words else None
+
+        if matcher is None:
+            for rowid, position, data in self._conn.execute(
+                "SELECT rowid, position, data FROM items WHERE subreddit = ? "
+                "AND post_rowid IS NULL" + window,
+                (subreddit_name, *bounds),
+            ):
+                posts[rowid] = (position, json.loads(data))
+            for rowid, post_rowid, position, data in self._conn.execute(
+                "SELECT rowid, post_rowid, position, data FROM items WHERE subreddit = ? "
+                "AND post_rowid IS NOT NULL" + comment_filter,
+                (subreddit_name, *comment_params),
+            ):
+                comments[post_rowid].append((position, rowid, json.loads(data)))
+        else:
+            query = fts_query(key_words)
+            if query is None:
+                # Nothing to search the index for, every item is a candidate
+                candidates = "SELECT rowid FROM items WHERE subreddit = ?"
+                params: tuple = (subreddit_name,)
+            else:
+                candidates = "SELECT rowid FROM items_fts WHERE items_fts MATCH ?"
+                params = (query,)
+            for rowid, position, data in self._conn.execute(
+                f"SELECT rowid, position, data FROM items WHERE rowid IN ({candidates}) "
+                "AND subreddit = ? AND post_rowid IS NULL" + window,
+                (*params, subreddit_name, *bounds),
+            ):
+                data = json.loads(data)
+                data["Keywords"] = matcher.find_all(data["Content"], data["Thread_Title"]) or None
+                if data["Keywords"]:
+                    posts[rowid] = (position, data)
+
+            comment_rows = list(
+                self._conn.execute(
+                    f"SELECT rowid, post_rowid, position, data FROM items WHERE rowid IN ({candidates}) "
+                    "AND subreddit = ? AND post_rowid IS NOT NULL" + comment_filter,
+                    (*params, subreddit_name, *comment_params),
+                )
+            )
+            # A post title matching makes every comment of the post match
+            titled = [rowid for rowid, (_, data) in posts.items() if matcher.search(data["Thread_Title"])]
+            for offset in range(0, len(titled), 500):
+                batch = titled[offset : offset + 500]
+                comment_rows += self._conn.execute(
+                    "SELECT rowid, post_rowid, position, data FROM items "
+                    f"WHERE post_rowid IN ({','.join('?' * len(batch))})" + comment_filter,
+                    (*batch, *comment_params),
+                )
+
+            # Posts only kept for their comments, None when outside the date window
+            parents: dict[int, tuple[int, dict] | None] = {}
+            seen = set()
+            for rowid, post_rowid, position, data in comment_rows:
+                if rowid in seen:
+                    continue
+                seen.add(rowid)
+                parent = posts.get(post_rowid)
+                if parent is None:
+                    if post_rowid not in parents:
+                        parents[post_rowid] = self._post(post_rowid, window, bounds)
+                    parent = parents[post_rowid]
+                    if parent is None:
+                        continue
+                data = json.loads(data)
+                data["Keywords"] = matcher.find_all(data["Content"], parent[1]["Thread_Title"]) or None
+                if data["Keywords"]:
+                    comments[post_rowid].append((position, rowid, data))
+            for post_rowid in comments.keys() - posts.keys():
+                posts[post_rowid] = parents[post_rowid]
+
+        return self._build(subreddit_name, limit, posts, comments, as_records)
+
+    def _post(self, rowid: int, window: str, bounds: tuple) -> tuple[int, dict] | None:
+        row = self._conn.execute(
+            "SELECT position, data FROM items WHERE rowid = ?" + window, (rowid, *bounds)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _build(
+        self,
+        subreddit_name: str,
+        limit: int,
+        posts: dict[int, tuple[int, dict]],
+        comments: dict[int, list[tuple[int, int, dict]]],
+        as_records: bool,
+    ) -> list[Post]:
+        # Posts and comments in crawl order, numbered like extract_post_data numbers them
+        date_added = date_added_today()
+        all_data = []
+        ordered = sorted(posts.items(), key=lambda entry: entry[1][0])
+        for post_number, (post_rowid, (_, data)) in enumerate(ordered[:limit], start=1):
+            keywords = data.pop("Keywords", None)
+            post = PostRecord(id=f"RD-01-{post_number:02d}", Date_added=date_added, Keywords=keywords, **data)
+            all_data.append(post)
+            kept = sorted(comments.get(post_rowid, ()), key=lambda entry: entry[0])[:limit]
+            for comment_number, (_, _, comment_data) in enumerate(kept, start=1):
+                keywords = comment_data.pop("Keywords", None)
+                all_data.append(
+                    CommentRecord(
+                        id=f"{post.id}-{comment_number:02d}",
+                        post=post,
+                        Date_added=date_added,
+                        Keywords=keywords,
+                        **comment_data,
+                    )
+                )
+        print(f"r/{subreddit_name}: {len(all_data)} items selected from the index")
+        return all_data if as_records else to_models(all_data)
@@ -0,0 +1,187 @@
+import copy
+import hashlib
+import json
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from gensim import corpora
+from gensim.utils import simple_preprocess
+
+from model import Post
+from resources import english_stopwords, get_lemmatizer
+
+# Bump when clean_text changes, so cached corpora are rebuilt
+CLEANING_VERSION = 1
+BATCH_SIZE = 10_000
+
+
+@lru_cache(maxsize=None)
+def lda_stop_words() -> frozenset[str]:
+    """
+    Stopwords removed before topic modelling, built once.
+    """
+    return english_stopwords() | {"even","thing","want","still","would", "every","get","got","make","much","know"}
+
+
+def clean_text(text: str):
+
+    if not text or not isinstance(text, str):
+        return []
+    stop_words = lda_stop_words()
+    lemmatizer = get_lemmatizer()
+
+    # Deleting urls, special characters & mentions
+    text = re.sub(r"http\S+|www\S+|@\w+", " ", text)
+    text = re.sub(r"[^a-zA-Z\s]", " ", text)
+    tokens = simple_preprocess(text, deacc=True, min_len=3)
+
+    tokens = [lemmatizer.lemmatize(tok) for tok in tokens if tok not in stop_words]
+    return tokens
+
+
+def clean_documents(texts: list[str], processes: int = 1) -> list[list[str]]:
+    """
+    Clean documents, spread over a process pool when processes > 1.
+    Args:
+        texts (list[str]): Raw texts of the posts/comments.
+        processes (int): Number of worker processes.
+    Returns:
+        list[list[str]]: Tokens of each document, in the same order.
+    """
+    if processes <= 1 or len(texts) < 2 * processes:
+        return [clean_text(text) for text in texts]
+    # A few chunks per process keeps them busy without paying pickling per document
+    chunksize = max(1, len(texts) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(clean_text, texts, chunksize=chunksize))
+
+
+def filter_thresholds(num_docs: int, no_below: int = 5, no_above: float = 0.5) -> dict:
+    """
+    Arguments of Dictionary.filter_extremes, no_below being lowered for tiny corpora
+    where it would otherwise leave no word at all.
+    """
+    return {"no_below": min(no_below, max(1, num_docs // 10)), "no_above": no_above}
+
+
+class PreparedCorpus:
+    """
+    Tokenized documents, dictionaries and bag-of-words corpus stored in a cache directory.
+
+    The bag-of-words corpus is a Matrix Market file read from disk on every pass, so
+    it never needs to fit in memory.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.dictionary = corpora.Dictionary.load(str(self.directory / "dictionary"))
+        self.corpus = corpora.MmCorpus(str(self.directory / "corpus.mm"))
+
+    @property
+    def full_dictionary(self) -> corpora.Dictionary:
+        """
+        Dictionary before filter_extremes, with the frequency of every token.
+        """
+        return corpora.Dictionary.load(str(self.directory / "dictionary.full"))
+
+    def texts(self) -> Iterator[list[str]]:
+        """
+        Streams the tokens of each document.
+        """
+        with open(self.directory / "tokens.jsonl", "r", encoding="utf-8") as file:
+            for line in file:
+                yield json.loads(line)
+
+
+def corpus_key(texts: Iterable[str | None], no_below: int, no_above: float) -> str:
+    """
+    Hashes the input texts with the cleaning settings.
+    Args:
+        texts (Iterable[str | None]): Raw texts of the documents.
+        no_below (int): Minimum document frequency of kept words.
+        no_above (float): Maximum document share of kept words.
+    Returns:
+        str: Hex key of the prepared corpus.
+    """
+    digest = hashlib.sha256(
+        json.dumps([CLEANING_VERSION, sorted(lda_stop_words()), no_below, no_above]).encode()
+    )
+    for text in texts:
+        digest.update((text or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:24]
+
+
+def prepare_corpus(
+    posts: Iterable[Post],
+    cache_dir: str = "lda_cache",
+    no_below: int = 5,
+    no_above: float = 0.5,
+    processes: int = 1,
+) -> PreparedCorpus:
+    """
+    Clean the content of posts/comments once and store the result on disk, keyed by a
+    hash of the texts and settings. A later call with the same posts reuses it.
+    Args:
+        posts (Iterable[Post]): Posts and comments. Read twice (hash, then cleaning),
+            so a generator must be wrapped in a re-iterable object.
+        cache_dir (str): Directory holding the prepared corpora.
+        no_below (int): Minimum number of documents a word must appear in.
+        no_above (float): Maximum share of documents a word may appear in.
+        processes (int): Processes used to clean the documents.
+    Returns:
+        PreparedCorpus: The prepared corpus.
+    """
+    directory = Path(cache_dir) / corpus_key((post.Content for post in posts), no_below, no_above)
+    if (directory / "corpus.mm").exists():
+        return PreparedCorpus(directory)
+
+    # Built aside then renamed, an interrupted run leaves no half-written corpus
+    tmp_dir = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    full_dictionary = corpora.Dictionary()
+    num_docs = 0
+    contents = (post.Content for post in posts)
+    with open(tmp_dir / "tokens.jsonl", "w", encoding="utf-8") as file:
+        while batch := list(islice(contents, BATCH_SIZE)):
+            documents = clean_documents(batch, processes=processes)
+            full_dictionary.add_documents(documents)
+            for doc in documents:
+                file.write(json.dumps(doc) + "\n")
+            num_docs += len(documents)
+    full_dictionary.save(str(tmp_dir / "dictionary.full"))
+
+    dictionary = copy.deepcopy(full_dictionary)
+    dictionary.filter_extremes(**filter_thresholds(num_docs, no_below, no_above))
+    dictionary.save(str(tmp_dir / "dictionary"))
+
+    with open(tmp_dir / "tokens.jsonl", "r", encoding="utf-8") as file:
+        corpora.MmCorpus.serialize(
+            str(tmp_dir / "corpus.mm"),
+            (dictionary.doc2bow(json.loads(line)) for line in file),
+        )
+
+    shutil.rmtree(directory, ignore_errors=True)
+    tmp_dir.rename(directory)
+    return PreparedCorpus(directory)
+
+
+def frequent_terms(prepared: PreparedCorpus, toppest: int) -> list[tuple[str, int]]:
+    """
+    Get the most common cleaned tokens of a prepared corpus, without reading the documents.
+    Args:
+        prepared (PreparedCorpus): The prepared corpus.
+        toppest (int): Number of top common tokens to return.
+    Returns:
+        list[tuple[str, int]]: The most common tokens and their number of occurrences.
+    """
+    dictionary = prepared.full_dictionary
+    top = sorted(dictionary.cfs.items(), key=lambda item: item[1], reverse=True)[:toppest]
+    return [(dictionary[token_id], count) for token_id, count in top]
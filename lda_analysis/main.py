@@ -1,84 +1,83 @@
-from collections import Counter
+import logging
+import os
 from datetime import datetime
 import praw
-import re
-from gensim.utils import simple_preprocess
-from gensim import corpora
-from gensim.models.ldamodel import LdaModel
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-nltk.download('wordnet')
-stop_words = set(stopwords.words("english") + ["even","thing","want","still","would", "every","get","got","make","much","know"])
-lemmatizer = WordNetLemmatizer()
 
+import instrumentation
 from model import Post
-from utils import CLIENT_ID, CLIENT_SECRET, extract_post_data, get_words_list
+from scheduler import InstrumentedRequestor
+from utils import CLIENT_ID, CLIENT_SECRET, extract_post_data
 from config import key_words_1, key_words_2
 
 def frequent_words(list_posts: list[Post], toppest: int) -> list[tuple[str, int]]:
     """
     Get the most common words from a list of posts/comments.
+    For several queries on the same posts (per subreddit, per month...), build a
+    frequencies.TermMatrix once and query it instead.
     Args:
         list_posts (list[Post]): List of Post objects containing content.
         toppest (int): Number of top common words to return.
     Returns:
         list[tuple[str, int]]: List of tuples with the most common words and their counts.
     """
+    from frequencies import TermMatrix
 
-    # Getting common English stopwords
-    common_stopwords = get_words_list()
+    return TermMatrix(list_posts).top_terms(toppest)
 
-    # Extract words from posts/comments
-    words = [
-        w.lower()
-        for post in list_posts
-        for w in ((post.Content+post.Thread_Title) or "").split()
-        if len(w) > 3 and w.isalpha() and w.lower() not in common_stopwords
-    ]
-
-    # Get the most common words
-    common_words = Counter(words).most_common(toppest)
-
-    return common_words
-
-
-def clean_text(text: str):
-
-    if not text or not isinstance(text, str):
-        return []
-
-    # Deleting urls, special characters & mentions
-    text = re.sub(r"http\S+|www\S+|@\w+", " ", text)
-    text = re.sub(r"[^a-zA-Z\s]", " ", text)
-    tokens = simple_preprocess(text, deacc=True, min_len=3)
-
-    tokens = [lemmatizer.lemmatize(tok) for tok in tokens if tok not in stop_words]
-    return tokens
-
-def train_lda(posts: list[Post], num_topics=10):
-
-    # Clean text
-    documents = [clean_text(post.Content) for post in posts]
-
-    # Words dictionnary
-    dictionary = corpora.Dictionary(documents) # indexing words
-    dictionary.filter_extremes(no_below=5, no_above=0.5) # only keeps words present in >=5 doc and <50% docs
-
-    # Making bags of words, each word (identified by its index) is associated with a number of occurence
-    corpus = [dictionary.doc2bow(doc) for doc in documents]
-
-    lda = LdaModel(
-        corpus=corpus,
-        id2word=dictionary,
-        num_topics=num_topics,
-        random_state=42,
-        chunksize=len(corpus)//10, # Chunksize = 10% of the corpus
-        passes=15, # Number of iteration
-        alpha="auto",
-        eta="auto"
-    )
 
+def train_lda(
+    posts: list[Post],
+    num_topics=10,
+    workers: int = 1,
+    processes: int = 1,
+    passes: int = 15,
+    random_state: int = 42,
+    cache_dir: str | None = None,
+):
+    """
+    Train an LDA topic model on the content of posts/comments.
+    Args:
+        posts (list[Post]): Posts and comments to model.
+        num_topics (int): Number of topics.
+        workers (int): Training workers, see lda_analysis.models.fit_lda.
+        processes (int): Processes used to clean the documents.
+        passes (int): Number of passes over the corpus.
+        random_state (int): Seed of the model.
+        cache_dir (str | None): Directory of prepared corpora. When given, cleaning is
+            done once per set of posts and the corpus is streamed from disk.
+    Returns:
+        tuple: The model, the bag-of-words corpus and the dictionary.
+    """
+    # gensim and NLTK take seconds to import, they are loaded once there is work for them
+    from gensim import corpora
+
+    from lda_analysis.corpus import clean_documents, filter_thresholds, prepare_corpus
+    from lda_analysis.models import fit_lda
+
+    report = instrumentation.current()
+    if cache_dir:
+        with report.timer("prepare_corpus", "lda"):
+            prepared = prepare_corpus(posts, cache_dir=cache_dir, processes=processes)
+        corpus, dictionary = prepared.corpus, prepared.dictionary
+    else:
+        # Clean text
+        with report.timer("clean", "lda"):
+            documents = clean_documents([post.Content for post in posts], processes=processes)
+
+        with report.timer("dictionary", "lda"):
+            # Words dictionnary
+            dictionary = corpora.Dictionary(documents) # indexing words
+            # only keeps words present in >=5 docs (fewer for tiny corpora) and <50% docs
+            dictionary.filter_extremes(**filter_thresholds(len(documents)))
+
+            # Making bags of words, each word (identified by its index) is associated with a number of occurence
+            corpus = [dictionary.doc2bow(doc) for doc in documents]
+
+    report.count("documents", len(corpus), "lda")
+    report.count("terms", len(dictionary), "lda")
+    report.count("passes", passes, "lda")
+    with report.timer("fit", "lda"):
+        lda = fit_lda(corpus, dictionary, num_topics, workers, passes, random_state)
     return lda, corpus, dictionary
 
 # ----------------------------------------------------
@@ -91,10 +90,13 @@ def display_topics(lda_model, num_words=10):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s %(message)s")
+    report = instrumentation.enable(progress_interval=30)
     reddit = praw.Reddit(
         client_id=CLIENT_ID,
         client_secret=CLIENT_SECRET,
         user_agent="u/sk00bew",
+        requestor_class=InstrumentedRequestor,
     )
     list_subs_1 = ["GriefSupport","Futurology"]
     list_subs_2 = ["Chatbots", "artificial", "ArtificialInteligence"]
@@ -135,7 +137,9 @@ if __name__ == "__main__":
 
     # common_words = frequent_words(list_posts=all_data, toppest=20)
 
-    lda, corpus, dictionary = train_lda(all_data, num_topics=5)
+    cores = os.cpu_count() or 1
+    lda, corpus, dictionary = train_lda(
+        all_data, num_topics=5, workers=cores - 1, processes=cores, cache_dir="lda_cache"
+    )
     display_topics(lda)
-
-
+    report.save("run_report.json")
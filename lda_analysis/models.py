@@ -0,0 +1,95 @@
+import math
+
+import numpy as np
+from gensim import corpora
+from gensim.models.ldamodel import LdaModel
+from gensim.models.ldamulticore import LdaMulticore
+
+
+class SeededLdaMulticore(LdaMulticore):
+    """
+    LdaMulticore whose E-step does not depend on which worker gets which chunk: the
+    random initialisation of each chunk is seeded from the model seed and the chunk.
+    """
+
+    def __init__(self, *args, random_state: int = 42, **kwargs):
+        self.seed = random_state
+        super().__init__(*args, random_state=random_state, **kwargs)
+
+    def inference(self, chunk, collect_sstats=False):
+        # Bag-of-words tuples only hold numbers, so their hash is stable across processes
+        chunk_hash = hash(tuple(tuple(doc) for doc in chunk))
+        self.random_state = np.random.RandomState((self.seed ^ chunk_hash) & 0xFFFFFFFF)
+        return super().inference(chunk, collect_sstats=collect_sstats)
+
+
+def fit_lda(
+    corpus,
+    dictionary: corpora.Dictionary,
+    num_topics: int = 10,
+    workers: int = 1,
+    passes: int = 15,
+    random_state: int = 42,
+):
+    """
+    Train an LDA topic model on a bag-of-words corpus, in memory or streamed from disk.
+    Args:
+        corpus: Bag-of-words documents (a list, or a MmCorpus read from disk).
+        dictionary (corpora.Dictionary): Dictionary of the corpus.
+        num_topics (int): Number of topics.
+        workers (int): Training workers. Above 1, gensim's LdaMulticore is used with
+            batch updates, so a given seed gives the same topics whatever the order
+            workers finish in (up to floating-point rounding). It learns a symmetric
+            alpha, as LdaMulticore cannot tune alpha automatically.
+        passes (int): Number of passes over the corpus.
+        random_state (int): Seed of the model.
+    Returns:
+        The trained LDA model.
+    """
+    # Chunksize = 10% of the corpus, at least one document
+    chunksize = max(1, math.ceil(len(corpus) / 10))
+
+    if workers > 1:
+        return SeededLdaMulticore(
+            corpus=corpus,
+            id2word=dictionary,
+            num_topics=num_topics,
+            workers=workers,
+            random_state=random_state,
+            chunksize=chunksize,
+            passes=passes,
+            batch=True,
+            alpha="symmetric",
+            eta="auto",
+        )
+    return LdaModel(
+        corpus=corpus,
+        id2word=dictionary,
+        num_topics=num_topics,
+        random_state=random_state,
+        chunksize=chunksize,
+        passes=passes, # Number of iteration
+        alpha="auto",
+        eta="auto"
+    )
+
+
+def dominant_topics(lda, documents: list[list[str]]) -> list[int | None]:
+    """
+    Most probable topic of each document, e.g. to roll topic shares up per month.
+    Args:
+        lda: The trained LDA model.
+        documents (list[list[str]]): Tokens of each document, as cleaned for training.
+    Returns:
+        list[int | None]: The dominant topic of each document, None for a document
+            without any word of the model vocabulary.
+    """
+    topics = []
+    for document in documents:
+        bow = lda.id2word.doc2bow(document)
+        if not bow:
+            topics.append(None)
+            continue
+        distribution = lda.get_document_topics(bow, minimum_probability=0)
+        topics.append(max(distribution, key=lambda entry: entry[1])[0])
+    return topics
@@ -0,0 +1,276 @@
+import copy
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from gensim import corpora
+from gensim.models.ldamodel import LdaModel
+
+from lda_analysis.corpus import clean_documents, filter_thresholds
+from model import Post
+
+# Words kept in the full dictionary waiting to become part of the model vocabulary
+MAX_CANDIDATES = 200_000
+
+
+def document_key(post: Post) -> str:
+    """
+    Stable key of a post/comment across runs (the "id" column is numbered per run).
+    Args:
+        post (Post): The post or comment.
+    Returns:
+        str: Its Reddit URL, or a hash of its text when it has none.
+    """
+    if post.Reddit_URL:
+        return post.Reddit_URL
+    text = f"{post.Thread_Title or ''}\0{post.Content or ''}"
+    return "sha1:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def topic_drift(
+    old_topics: np.ndarray,
+    lda: LdaModel,
+    num_words: int = 10,
+) -> list[dict]:
+    """
+    Compares the topics of a model with their previous version.
+    Args:
+        old_topics (np.ndarray): Topic-word distributions before the update, its
+            columns being the first terms of the current vocabulary.
+        lda (LdaModel): The updated model.
+        num_words (int): Number of top words compared per topic.
+    Returns:
+        list[dict]: Per topic, the Hellinger distance between both versions (0 for
+            identical topics, 1 for disjoint ones) and the top words that came in and out.
+    """
+    new_topics = lda.get_topics()
+    old_topics = np.pad(old_topics, ((0, 0), (0, new_topics.shape[1] - old_topics.shape[1])))
+    distances = np.sqrt(0.5 * ((np.sqrt(new_topics) - np.sqrt(old_topics)) ** 2).sum(axis=1))
+
+    drift = []
+    for topic_id, distance in enumerate(distances):
+        old_top = [lda.id2word[i] for i in np.argsort(-old_topics[topic_id])[:num_words]]
+        new_top = [lda.id2word[i] for i in np.argsort(-new_topics[topic_id])[:num_words]]
+        drift.append(
+            {
+                "topic": topic_id,
+                "hellinger": round(float(distance), 4),
+                "words_in": [word for word in new_top if word not in old_top],
+                "words_out": [word for word in old_top if word not in new_top],
+            }
+        )
+    return drift
+
+
+def grow_vocabulary(
+    lda: LdaModel,
+    dictionary: corpora.Dictionary,
+    full_dictionary: corpora.Dictionary,
+    documents: list[list[str]],
+    no_below: int = 5,
+    no_above: float = 0.5,
+    max_new_terms: int = 500,
+) -> list[str]:
+    """
+    Counts new documents in the vocabulary of the model and adds to the model their
+    words that became frequent enough since it was trained. New words start with no
+    weight in any topic (only the prior), later updates give them one.
+    Args:
+        lda (LdaModel): The model, extended in place.
+        dictionary (corpora.Dictionary): Vocabulary of the model, extended in place.
+        full_dictionary (corpora.Dictionary): Document frequency of every word seen,
+            the new documents included.
+        documents (list[list[str]]): The new documents, cleaned.
+        no_below (int): Minimum number of documents a new word must appear in.
+        no_above (float): Maximum share of documents a new word may appear in.
+        max_new_terms (int): Maximum number of words added by one update.
+    Returns:
+        list[str]: The words added.
+    """
+    num_terms = len(dictionary)
+    # gensim keeps the counts of the dictionary and gives the words of the documents
+    # it did not know ids after the current ones
+    dictionary.add_documents(documents)
+    max_docs = no_above * full_dictionary.num_docs
+    candidates = [
+        (full_dictionary.dfs[full_dictionary.token2id[token]], token)
+        for token, token_id in dictionary.token2id.items()
+        if token_id >= num_terms
+        and token in full_dictionary.token2id
+        and no_below <= full_dictionary.dfs[full_dictionary.token2id[token]] <= max_docs
+    ]
+    new_terms = {token for _, token in sorted(candidates, reverse=True)[:max_new_terms]}
+    # The other words are dropped again; the remaining ids keep their order, so
+    # existing columns of the model are untouched
+    dictionary.filter_tokens(
+        bad_ids=[
+            token_id
+            for token, token_id in dictionary.token2id.items()
+            if token_id >= num_terms and token not in new_terms
+        ]
+    )
+    if not new_terms:
+        return []
+
+    state = lda.state
+    added = len(new_terms)
+    eta = np.concatenate([state.eta, np.full(added, state.eta.mean(), dtype=state.eta.dtype)])
+    state.eta = eta
+    lda.eta = eta.astype(lda.eta.dtype)
+    state.sstats = np.hstack([state.sstats, np.zeros((lda.num_topics, added), dtype=state.dtype)])
+    lda.num_terms = len(dictionary)
+    lda.id2word = dictionary
+    lda.sync_state()
+    return [dictionary[token_id] for token_id in range(num_terms, len(dictionary))]
+
+
+def update_topic_model(
+    posts: Iterable[Post],
+    model_dir: str = "lda_model",
+    num_topics: int = 10,
+    passes: int = 15,
+    update_passes: int = 1,
+    no_below: int = 5,
+    no_above: float = 0.5,
+    max_new_terms: int = 500,
+    processes: int = 1,
+    random_state: int = 42,
+) -> tuple[LdaModel, corpora.Dictionary, dict]:
+    """
+    Keeps a topic model up to date on disk. The first call trains it on all the posts,
+    later calls only clean the posts never seen before and fold them in with gensim's
+    online update, so a refresh costs time proportional to the new posts.
+    Args:
+        posts (Iterable[Post]): Posts and comments, old ones may be included again.
+        model_dir (str): Directory of the model versions (one directory each, named
+            by manifest.json) and of the drift reports.
+        num_topics (int): Number of topics of the model, which must match the saved
+            one once created.
+        passes (int): Number of passes when the model is created.
+        update_passes (int): Number of passes over the new posts in an update.
+        no_below (int): Minimum number of documents a word must appear in.
+        no_above (float): Maximum share of documents a word may appear in.
+        max_new_terms (int): Maximum number of words added to the vocabulary per update.
+        processes (int): Processes used to clean the documents.
+        random_state (int): Seed of the model.
+    Returns:
+        tuple: The model, its dictionary and the report of this version (also
+            appended to drift.jsonl in model_dir). Without new posts, nothing is
+            written and the saved version is returned.
+    """
+    directory = Path(model_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = directory / "manifest.json"
+    manifest = (
+        json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else None
+    )
+    # Each version lives in its own directory, the manifest naming the current one
+    current = directory / f"v{manifest['version']}" if manifest else None
+    seen_path = current / "seen.txt" if current else None
+    seen = set(seen_path.read_text(encoding="utf-8").splitlines()) if seen_path else set()
+
+    new_posts = {}
+    for post in posts:
+        key = document_key(post)
+        if key not in seen:
+            new_posts.setdefault(key, post)
+    documents = clean_documents([post.Content for post in new_posts.values()], processes=processes)
+
+    report = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "new_documents": len(documents)}
+    if manifest:
+        lda = LdaModel.load(str(current / "lda"))
+        dictionary = lda.id2word
+        if num_topics != lda.num_topics:
+            raise ValueError(
+                f"The model in {model_dir} has {lda.num_topics} topics, not {num_topics}; "
+                "pass its number of topics or use another model_dir"
+            )
+        if not documents:
+            # Nothing new: the saved version stays as it is
+            report.update(new_terms=[], version=manifest["version"], num_terms=len(dictionary))
+            return lda, dictionary, report
+
+        full_dictionary = corpora.Dictionary.load(str(current / "dictionary.full"))
+        version = manifest["version"] + 1
+        full_dictionary.add_documents(documents)
+        old_topics = lda.get_topics()
+        new_terms = grow_vocabulary(
+            lda, dictionary, full_dictionary, documents, no_below, no_above, max_new_terms
+        )
+        corpus = [dictionary.doc2bow(doc) for doc in documents]
+        if any(corpus):
+            lda.update(corpus, passes=update_passes)
+        report.update(new_terms=new_terms, drift=topic_drift(old_topics, lda))
+    else:
+        if not documents:
+            raise ValueError("No document to train the topic model on")
+        full_dictionary = corpora.Dictionary(documents)
+        dictionary = copy.deepcopy(full_dictionary)
+        dictionary.filter_extremes(**filter_thresholds(len(documents), no_below, no_above))
+        corpus = [dictionary.doc2bow(doc) for doc in documents]
+        # Online training (update_every=1), as a batch model forgets the documents
+        # it is not updated with
+        lda = LdaModel(
+            corpus=corpus,
+            id2word=dictionary,
+            num_topics=num_topics,
+            random_state=random_state,
+            chunksize=max(1, math.ceil(len(corpus) / 10)),
+            passes=passes,
+            alpha="auto",
+            eta="auto",
+        )
+        version = 1
+        report["new_terms"] = list(dictionary.token2id)
+
+    full_dictionary.filter_extremes(no_below=1, no_above=1.0, keep_n=MAX_CANDIDATES)
+    report["version"] = version
+    report["num_terms"] = len(dictionary)
+
+    # The new version is written aside with its complete seen list, then made current
+    # by replacing the manifest: an interrupted update leaves the previous version
+    # current, and its documents are folded in again by the next run
+    staging = directory / f"v{version}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    lda.save(str(staging / "lda"))
+    full_dictionary.save(str(staging / "dictionary.full"))
+    if seen_path:
+        shutil.copyfile(seen_path, staging / "seen.txt")
+    with open(staging / "seen.txt", "a", encoding="utf-8") as file:
+        file.writelines(key + "\n" for key in new_posts)
+    target = directory / f"v{version}"
+    shutil.rmtree(target, ignore_errors=True)
+    staging.rename(target)
+    manifest_tmp = directory / "manifest.json.tmp"
+    manifest_tmp.write_text(
+        json.dumps({"version": version, "num_topics": lda.num_topics, "num_terms": len(dictionary)}),
+        encoding="utf-8",
+    )
+    os.replace(manifest_tmp, manifest_path)
+    if current:
+        shutil.rmtree(current, ignore_errors=True)
+    with open(directory / "drift.jsonl", "a", encoding="utf-8") as file:
+        file.write(json.dumps(report) + "\n")
+    return lda, dictionary, report
+
+
+def print_drift(report: dict) -> None:
+    """
+    Prints the topic drift of an update report.
+    """
+    print(
+        f"Version {report['version']}: {report['new_documents']} new documents, "
+        f"{len(report['new_terms'])} new terms, {report['num_terms']} terms"
+    )
+    for topic in report.get("drift", []):
+        print(
+            f"Topic {topic['topic']}: drift {topic['hellinger']:.3f}"
+            f" +{topic['words_in']} -{topic['words_out']}"
+        )
@@ -0,0 +1,113 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Iterable
+
+from gensim.models import CoherenceModel
+from gensim.models.ldamodel import LdaModel
+
+from lda_analysis.corpus import PreparedCorpus, prepare_corpus
+from lda_analysis.models import fit_lda
+from model import Post
+
+METRICS = ("c_v", "u_mass", "perplexity")
+
+
+def evaluate_lda(directory: str, num_topics: int, random_state: int, passes: int) -> dict:
+    """
+    Trains one model of a sweep on a prepared corpus and scores it. Runs in a worker
+    process: the corpus is read from disk there and the model saved next to it, so
+    only paths and numbers go through the pool.
+    Args:
+        directory (str): Directory of the prepared corpus.
+        num_topics (int): Number of topics.
+        random_state (int): Seed of the model.
+        passes (int): Number of passes over the corpus.
+    Returns:
+        dict: The settings, the c_v and u_mass coherences, the perplexity and the
+            path of the saved model.
+    """
+    prepared = PreparedCorpus(directory)
+    lda = fit_lda(prepared.corpus, prepared.dictionary, num_topics, 1, passes, random_state)
+
+    texts = list(prepared.texts())
+    c_v = CoherenceModel(
+        model=lda, texts=texts, dictionary=prepared.dictionary, coherence="c_v", processes=1
+    ).get_coherence()
+    u_mass = CoherenceModel(
+        model=lda, corpus=prepared.corpus, dictionary=prepared.dictionary, coherence="u_mass"
+    ).get_coherence()
+    # log_perplexity returns a per-word likelihood bound, in base 2
+    perplexity = 2 ** -lda.log_perplexity(prepared.corpus)
+
+    path = Path(directory) / "sweep" / f"lda_k{num_topics}_seed{random_state}"
+    path.parent.mkdir(exist_ok=True)
+    lda.save(str(path))
+    return {
+        "num_topics": num_topics,
+        "random_state": random_state,
+        "c_v": c_v,
+        "u_mass": u_mass,
+        "perplexity": perplexity,
+        "path": str(path),
+    }
+
+
+def sweep_lda(
+    posts: list[Post],
+    topic_counts: Iterable[int] = range(2, 11),
+    seeds: Iterable[int] = (42,),
+    metric: str = "c_v",
+    passes: int = 15,
+    processes: int | None = None,
+    cache_dir: str = "lda_cache",
+) -> tuple[list[dict], LdaModel]:
+    """
+    Trains a model for every topic count and seed in a process pool, all sharing one
+    prepared dictionary and corpus, and ranks them.
+    Args:
+        posts (list[Post]): Posts and comments to model.
+        topic_counts (Iterable[int]): Numbers of topics to try.
+        seeds (Iterable[int]): Seeds to try for each number of topics.
+        metric (str): Ranking metric, "c_v" or "u_mass" (higher is better) or
+            "perplexity" (lower is better, measured on the training corpus).
+        passes (int): Number of passes of each model.
+        processes (int | None): Worker processes, all the cores by default.
+        cache_dir (str): Directory of prepared corpora.
+    Returns:
+        tuple: The ranked table (one dict per model, best first) and the best model.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+    processes = processes or os.cpu_count() or 1
+
+    prepared = prepare_corpus(posts, cache_dir=cache_dir, processes=processes)
+    runs = list(product(topic_counts, seeds))
+    directory = str(prepared.directory)
+
+    if processes > 1 and len(runs) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(runs))) as pool:
+            table = list(
+                pool.map(
+                    evaluate_lda,
+                    [directory] * len(runs),
+                    [num_topics for num_topics, _ in runs],
+                    [seed for _, seed in runs],
+                    [passes] * len(runs),
+                )
+            )
+    else:
+        table = [evaluate_lda(directory, num_topics, seed, passes) for num_topics, seed in runs]
+
+    table.sort(key=lambda row: row[metric], reverse=metric != "perplexity")
+    return table, LdaModel.load(table[0]["path"])
+
+
+def display_sweep(table: list[dict]) -> None:
+    for row in table:
+        print(
+            f"{row['num_topics']:>3} topics, seed {row['random_state']}: "
+            f"c_v {row['c_v']:.4f}  u_mass {row['u_mass']:.4f}  "
+            f"perplexity {row['perplexity']:.1f}"
+        )
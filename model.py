@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -22,6 +22,8 @@ class Post(BaseModel):
         alias="Date added",
     )
     Who_added: str = Field(default="automated_script", alias="Who added")
+    # Fullname of the original post of a crosspost, not exported
+    crosspost_parent: Optional[str] = None
 
     @classmethod
     def from_reddit(
@@ -30,6 +32,7 @@ class Post(BaseModel):
         subreddit,
         id_number: int,
         parent_post: Optional["Post"] = None,  # param commun, ignoré pour Post
+        trusted: bool = False,
     ) -> "Post":
         """
         Create a Post instance from a Reddit object.
@@ -38,34 +41,11 @@ class Post(BaseModel):
             subreddit: The subreddit object.
             id_number (int): The ID number for the post.
             parent_post (Optional[Post]): Ignored for Post, used for Comment.
+            trusted (bool): Skip validation, for data built by this project.
         Returns:
             Post: An instance of the Post class.
         """
-        post_datetime = datetime.utcfromtimestamp(getattr(reddit_obj, "created_utc", 0))
-        clean_content = (getattr(reddit_obj, "selftext", "") or "").replace("\n", " ").strip()
-        title = getattr(reddit_obj, "title", "")
-
-        return cls(
-            id=f"RD-01-{id_number:02d}",
-            **{
-                "Reddit_URL": (
-                    f"https://www.reddit.com{getattr(reddit_obj, 'permalink', '')}"
-                    if hasattr(reddit_obj, "permalink")
-                    else None
-                ),
-                "Thread_Title": title,
-                "Subreddit": f"r/{getattr(subreddit, "display_name", "")}",
-                "Content": clean_content or None,
-                "Category": "post",
-                "Author": f"u/{getattr(reddit_obj, 'author', None)}"
-                if getattr(reddit_obj, "author", None)
-                else None,
-                "Number_of_comments": getattr(reddit_obj, "num_comments"),
-                "Date_Posted": post_datetime.strftime("%d/%m/%Y"),
-                "Upvotes": getattr(reddit_obj, "score", 0),
-                "Tag": getattr(reddit_obj, "link_flair_text", None),
-            },
-        )
+        return PostRecord.from_reddit(reddit_obj, subreddit, id_number).to_model(trusted)
 
 class Comment(Post):
     Category: str = "comment"
@@ -79,34 +59,302 @@ class Comment(Post):
         subreddit,
         id_number: int,
         parent_post: Optional[Post] = None,
+        trusted: bool = False,
     ) -> "Comment":
+        """
+        Create a Comment instance from a Reddit object.
+        Args:
+            reddit_obj: The Reddit comment object.
+            subreddit: The subreddit object.
+            id_number (int): The ID number of the comment within its post.
+            parent_post (Optional[Post]): The post the comment belongs to.
+            trusted (bool): Skip validation, for data built by this project.
+        Returns:
+            Comment: An instance of the Comment class.
+        """
+        record = CommentRecord.from_reddit(reddit_obj, subreddit, id_number, parent_post)
+        return record.to_model(parent_post, trusted)
+
+
+def date_added_today() -> str:
+    """
+    Date stamped in the "Date added" column, computed once per run by the extraction.
+    """
+    return datetime.utcnow().strftime("%d/%m/%Y")
+
+
+def _author(reddit_obj) -> Optional[str]:
+    author = getattr(reddit_obj, "author", None)
+    return f"u/{author}" if author else None
+
+
+def _reddit_url(reddit_obj) -> Optional[str]:
+    if not hasattr(reddit_obj, "permalink"):
+        return None
+    return f"https://www.reddit.com{getattr(reddit_obj, 'permalink', '')}"
+
+
+class PostRecord:
+    """
+    Compact internal representation of a post, turned into a Post model at the API boundary.
+    Holds the raw creation timestamp and formats Date_Posted only when it is read.
+    """
+
+    __slots__ = (
+        "id", "fullname", "Reddit_URL", "Thread_Title", "Subreddit", "Content", "Author",
+        "created_utc", "Number_of_comments", "Upvotes", "Keywords", "Sentiment", "Tag",
+        "Date_added", "crosspost_parent",
+    )
+    Category = "post"
+    Who_added = "automated_script"
+
+    def __init__(
+        self,
+        id: str,
+        fullname: Optional[str],
+        Reddit_URL: Optional[str],
+        Thread_Title: Optional[str],
+        Subreddit: Optional[str],
+        Content: Optional[str],
+        Author: Optional[str],
+        created_utc: float,
+        Number_of_comments: Optional[int],
+        Upvotes: int,
+        Tag: Optional[str],
+        Date_added: str,
+        Keywords: Optional[List[str]] = None,
+        Sentiment: Optional[str] = None,
+        crosspost_parent: Optional[str] = None,
+    ):
+        self.id = id
+        self.fullname = fullname
+        self.Reddit_URL = Reddit_URL
+        self.Thread_Title = Thread_Title
+        self.Subreddit = Subreddit
+        self.Content = Content
+        self.Author = Author
+        self.created_utc = created_utc
+        self.Number_of_comments = Number_of_comments
+        self.Upvotes = Upvotes
+        self.Tag = Tag
+        self.Date_added = Date_added
+        self.Keywords = Keywords
+        self.Sentiment = Sentiment
+        # Fullname of the original post of a crosspost
+        self.crosspost_parent = crosspost_parent
+
+    @property
+    def Date_Posted(self) -> str:
+        return datetime.utcfromtimestamp(self.created_utc).strftime("%d/%m/%Y")
+
+    @classmethod
+    def from_reddit(
+        cls,
+        reddit_obj,
+        subreddit,
+        id_number: int,
+        date_added: Optional[str] = None,
+    ) -> "PostRecord":
+        """
+        Create a PostRecord from a Reddit object.
+        Args:
+            reddit_obj: The Reddit post object.
+            subreddit: The subreddit object.
+            id_number (int): The ID number for the post.
+            date_added (Optional[str]): Date of the run, computed once by the caller.
+        Returns:
+            PostRecord: The record.
+        """
+        return cls(
+            id=f"RD-01-{id_number:02d}",
+            fullname=getattr(reddit_obj, "fullname", None),
+            Reddit_URL=_reddit_url(reddit_obj),
+            Thread_Title=getattr(reddit_obj, "title", ""),
+            Subreddit=f"r/{getattr(subreddit, 'display_name', '')}",
+            Content=(getattr(reddit_obj, "selftext", "") or "").replace("\n", " ").strip() or None,
+            Author=_author(reddit_obj),
+            created_utc=getattr(reddit_obj, "created_utc", 0),
+            Number_of_comments=reddit_obj.num_comments,
+            Upvotes=getattr(reddit_obj, "score", 0),
+            Tag=getattr(reddit_obj, "link_flair_text", None),
+            Date_added=date_added or date_added_today(),
+            crosspost_parent=getattr(reddit_obj, "crosspost_parent", None),
+        )
+
+    def to_model(self, trusted: bool = True) -> Post:
+        """
+        Build the Post model of this record.
+        Args:
+            trusted (bool): Skip validation, the record being built by this project.
+        Returns:
+            Post: The Post model.
+        """
+        data = {
+            "id": self.id,
+            "Reddit_URL": self.Reddit_URL,
+            "Thread_Title": self.Thread_Title,
+            "Subreddit": self.Subreddit,
+            "Content": self.Content,
+            "Category": self.Category,
+            "Author": self.Author,
+            "Date_Posted": self.Date_Posted,
+            "Number_of_comments": self.Number_of_comments,
+            "Upvotes": self.Upvotes,
+            "Keywords": self.Keywords,
+            "Sentiment": self.Sentiment,
+            "Tag": self.Tag,
+            "Date added": self.Date_added,
+            "Who added": self.Who_added,
+            "crosspost_parent": self.crosspost_parent,
+        }
+        return Post.model_construct(**data) if trusted else Post(**data)
 
-        comment_datetime = datetime.utcfromtimestamp(getattr(reddit_obj, "created_utc", 0))
-        clean_text = (getattr(reddit_obj, "body", "") or "").replace("\n", " ").strip()
 
-        # Get parent post details if available
-        thread_title = getattr(parent_post, "Thread_Title", None) if parent_post else None
-        parent_tag = getattr(parent_post, "Tag", None) if parent_post else None
-        parent_subreddit = f"r/{getattr(subreddit, 'display_name', None)}"
+class CommentRecord:
+    """
+    Compact internal representation of a comment. Instead of a copy of its post, it
+    keeps a reference to the post record and reads the thread fields from it.
+    """
 
+    __slots__ = (
+        "id", "fullname", "parent_id", "post", "Reddit_URL", "Subreddit", "Content",
+        "Author", "created_utc", "Upvotes", "Keywords", "Sentiment", "Date_added",
+    )
+    Category = "comment"
+    Number_of_comments = None
+    Who_added = "automated_script"
+
+    def __init__(
+        self,
+        id: str,
+        fullname: Optional[str],
+        parent_id: Optional[str],
+        post,
+        Reddit_URL: Optional[str],
+        Subreddit: Optional[str],
+        Content: Optional[str],
+        Author: Optional[str],
+        created_utc: Optional[float],
+        Upvotes: int,
+        Date_added: str,
+        Keywords: Optional[List[str]] = None,
+        Sentiment: Optional[str] = None,
+    ):
+        self.id = id
+        self.fullname = fullname
+        self.parent_id = parent_id
+        self.post = post
+        self.Reddit_URL = Reddit_URL
+        self.Subreddit = Subreddit
+        self.Content = Content
+        self.Author = Author
+        self.created_utc = created_utc
+        self.Upvotes = Upvotes
+        self.Date_added = Date_added
+        self.Keywords = Keywords
+        self.Sentiment = Sentiment
+
+    @property
+    def Thread_Title(self) -> Optional[str]:
+        return self.post.Thread_Title if self.post else None
+
+    @property
+    def Tag(self) -> Optional[str]:
+        return self.post.Tag if self.post else None
+
+    @property
+    def Date_Posted(self) -> Optional[str]:
+        if not self.created_utc:
+            return None
+        return datetime.utcfromtimestamp(self.created_utc).strftime("%d/%m/%Y")
+
+    @classmethod
+    def from_reddit(
+        cls,
+        reddit_obj,
+        subreddit,
+        id_number: int,
+        parent_post=None,
+        date_added: Optional[str] = None,
+    ) -> "CommentRecord":
+        """
+        Create a CommentRecord from a Reddit object.
+        Args:
+            reddit_obj: The Reddit comment object.
+            subreddit: The subreddit object.
+            id_number (int): The ID number of the comment within its post.
+            parent_post: The PostRecord (or Post) the comment belongs to.
+            date_added (Optional[str]): Date of the run, computed once by the caller.
+        Returns:
+            CommentRecord: The record.
+        """
         return cls(
             id=f"{parent_post.id}-{id_number:02d}" if parent_post else f"RD-{id_number:02d}",
-            **{
-                "Reddit_URL": (
-                    f"https://www.reddit.com{getattr(reddit_obj, 'permalink', '')}"
-                    if hasattr(reddit_obj, "permalink")
-                    else None
-                ),
-                "Thread_Title": thread_title,
-                "Subreddit": parent_subreddit,
-                "Content": clean_text or None,
-                "Category": "comment",
-                "Author": f"u/{getattr(reddit_obj, 'author', None)}" if getattr(reddit_obj, "author", None) else "",
-                "Date_Posted": comment_datetime.strftime("%d/%m/%Y") if getattr(reddit_obj, "created_utc", None) else None,
-                "Upvotes": getattr(reddit_obj, "score", 0),
-                "Tag": parent_tag,
-                "Keywords": None,
-                "Sentiment": None,
-            },
-            Post=parent_post,
-        )
\ No newline at end of file
+            fullname=getattr(reddit_obj, "fullname", None),
+            parent_id=getattr(reddit_obj, "parent_id", None),
+            post=parent_post,
+            Reddit_URL=_reddit_url(reddit_obj),
+            # The post's string is shared rather than formatted again for each comment
+            Subreddit=(
+                parent_post.Subreddit
+                if parent_post
+                else f"r/{getattr(subreddit, 'display_name', None)}"
+            ),
+            Content=(getattr(reddit_obj, "body", "") or "").replace("\n", " ").strip() or None,
+            Author=_author(reddit_obj) or "",
+            created_utc=getattr(reddit_obj, "created_utc", None),
+            Upvotes=getattr(reddit_obj, "score", 0),
+            Date_added=date_added or date_added_today(),
+        )
+
+    def to_model(self, post: Optional[Post] = None, trusted: bool = True) -> "Comment":
+        """
+        Build the Comment model of this record.
+        Args:
+            post (Optional[Post]): The Post model of the parent, built from self.post if missing.
+            trusted (bool): Skip validation, the record being built by this project.
+        Returns:
+            Comment: The Comment model.
+        """
+        if post is None and self.post is not None:
+            post = self.post if isinstance(self.post, Post) else self.post.to_model(trusted)
+        data = {
+            "id": self.id,
+            "Reddit_URL": self.Reddit_URL,
+            "Thread_Title": self.Thread_Title,
+            "Subreddit": self.Subreddit,
+            "Content": self.Content,
+            "Category": self.Category,
+            "Author": self.Author,
+            "Date_Posted": self.Date_Posted,
+            "Number_of_comments": self.Number_of_comments,
+            "Upvotes": self.Upvotes,
+            "Keywords": self.Keywords,
+            "Sentiment": self.Sentiment,
+            "Tag": self.Tag,
+            "Date added": self.Date_added,
+            "Who added": self.Who_added,
+            "Post": post,
+        }
+        return Comment.model_construct(**data) if trusted else Comment(**data)
+
+
+def to_models(records: list) -> list[Post]:
+    """
+    Turn records into Post/Comment models, each post model being shared by its comments.
+    Args:
+        records (list): PostRecord and CommentRecord objects, posts before their comments.
+    Returns:
+        list[Post]: The Post and Comment models, in the same order.
+    """
+    models = []
+    posts: dict[int, Post] = {}
+    for record in records:
+        if isinstance(record, CommentRecord):
+            post = posts.get(id(record.post))
+            models.append(record.to_model(post))
+        else:
+            post = record.to_model()
+            posts[id(record)] = post
+            models.append(post)
+    return models
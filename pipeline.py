@@ -0,0 +1,303 @@
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterator
+
+import instrumentation
+from export import open_sink
+from model import CommentRecord, PostRecord
+from scheduler import RateLimiter, clone_reddit
+from sentiment import annotate_sentiment
+from utils import KeywordMatcher, iter_post_data
+
+if TYPE_CHECKING:
+    from praw import Reddit
+
+# Marks the end of a subreddit in its queue
+_DONE = object()
+
+# Settings of the analysis worker, set once per process by _init_analysis
+_matcher: KeywordMatcher | None = None
+_tokenize = False
+
+
+def _init_analysis(key_words: list[str] | None, tokenize: bool) -> None:
+    global _matcher, _tokenize
+    _matcher = KeywordMatcher(key_words) if key_words else None
+    _tokenize = tokenize
+
+
+def analyze_thread(
+    post: PostRecord, comments: list[CommentRecord], limit: int
+) -> tuple[list, list[list[str]] | None]:
+    """
+    Analysis stage, run in a worker process: keyword tagging, lexicon sentiment and,
+    if enabled, clean_text tokenization of a post and its comments.
+    Args:
+        post (PostRecord): The post.
+        comments (list[CommentRecord]): All its comments within the date window.
+        limit (int): Maximum number of comments kept.
+    Returns:
+        tuple: The post followed by its relevant comments (empty if the post is not
+            relevant), and the tokens of each of these items if tokenizing.
+    """
+    if _matcher:
+        post.Keywords = _matcher.find_all(post.Content, post.Thread_Title) or None
+        relevant = []
+        for comment in comments:
+            comment.Keywords = _matcher.find_all(comment.Content, post.Thread_Title) or None
+            if comment.Keywords:
+                relevant.append(comment)
+                if len(relevant) >= limit:
+                    break
+        if not post.Keywords and not relevant:
+            return [], None
+        comments = relevant
+    items = annotate_sentiment([post, *comments[:limit]])
+
+    tokens = None
+    if _tokenize:
+        # Imported here, gensim is only needed when tokenizing
+        from lda_analysis.corpus import clean_text
+
+        tokens = [clean_text(item.Content) for item in items]
+    return items, tokens
+
+
+class StageQueue(queue.Queue):
+    """
+    Bounded queue between two stages, recording how long each side waited on the
+    other and how full it was.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize)
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+        self.max_depth = 0
+        self._depth_total = 0
+        self._puts = 0
+
+    def put_unless(self, item, cancelled: threading.Event) -> bool:
+        """
+        Puts an item, blocking while the queue is full (backpressure) unless the
+        run is cancelled.
+        Returns:
+            bool: Whether the item was put.
+        """
+        start = time.perf_counter()
+        while not cancelled.is_set():
+            try:
+                self.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            self.put_wait += time.perf_counter() - start
+            depth = self.qsize()
+            self.max_depth = max(self.max_depth, depth)
+            self._depth_total += depth
+            self._puts += 1
+            return True
+        return False
+
+    def timed_get(self, producer: Future | None = None):
+        """
+        Gets the next item, blocking until there is one.
+        Args:
+            producer (Future | None): Task filling the queue. If it ends without
+                putting anything more, its exception is raised instead of waiting forever.
+        """
+        start = time.perf_counter()
+        while True:
+            try:
+                item = self.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if producer is None or not producer.done():
+                    continue
+            # The producer may have put its last item right before ending
+            try:
+                item = self.get_nowait()
+                break
+            except queue.Empty:
+                producer.result()
+                raise RuntimeError("The producer stopped without ending its queue") from None
+        self.get_wait += time.perf_counter() - start
+        return item
+
+    def stats(self) -> dict:
+        return {
+            "max_depth": self.max_depth,
+            "mean_depth": round(self._depth_total / self._puts, 2) if self._puts else 0,
+            "producer_wait_seconds": round(self.put_wait, 3),
+            "consumer_wait_seconds": round(self.get_wait, 3),
+        }
+
+
+def run_pipeline(
+    reddit: "Reddit",
+    subreddit_names: list[str],
+    output_path: str = "reddit_threads_1.xlsx",
+    limit: int = 5,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    key_words: list[str] | None = None,
+    listing: str | None = None,
+    max_depth: int | None = None,
+    min_score: int | None = None,
+    more_limit: int | None = 0,
+    fetch_workers: int = 2,
+    comment_workers: int = 1,
+    analysis_workers: int = 2,
+    queue_size: int = 32,
+    requests_per_minute: float = 100,
+    tokens_path: str | None = None,
+) -> dict[str, dict]:
+    """
+    Extracts subreddits into an export like save_subreddits_to_excel with sentiment,
+    overlapping network fetching with analysis:
+
+    - fetcher threads, one per subreddit being read, walk the listings and comment
+      trees (iter_post_data without keywords) and submit each post to the analysis pool;
+    - analysis worker processes tag keywords, score sentiment and tokenize;
+    - the calling thread writes the analysed posts to the sink, subreddit by subreddit,
+      numbering the kept posts like extract_post_data does.
+
+    Each subreddit has a bounded queue of pending posts: a fetcher blocks once it is
+    queue_size posts ahead of the writer, so memory stays bounded.
+    Args:
+        reddit (Reddit): The Reddit instance, cloned per fetcher when fetch_workers > 1.
+        subreddit_names (list[str]): Subreddits to extract, one sheet each, in order.
+        output_path (str): Path of the export, whose extension picks the format.
+        limit (int): Maximum number of posts, and of comments per post, per subreddit.
+        start_date, end_date, key_words, listing, max_depth, min_score, more_limit,
+        comment_workers: See extract_post_data.
+        fetch_workers (int): Number of subreddits fetched at the same time.
+        analysis_workers (int): Number of analysis processes, 0 to analyse in the
+            fetcher threads.
+        queue_size (int): Posts a fetcher may get ahead of the writer.
+        requests_per_minute (float): Request budget shared by the fetchers when
+            fetch_workers > 1.
+        tokens_path (str | None): JSON Lines file receiving the clean_text tokens of
+            every exported item, for topic modelling. No tokenization if None.
+    Returns:
+        dict[str, dict]: Queue statistics of each subreddit.
+    """
+    report = instrumentation.current()
+    limiter = RateLimiter(requests_per_minute)
+    cancelled = threading.Event()
+    queues = {name: StageQueue(queue_size) for name in subreddit_names}
+    # Set by the writer once a subreddit has enough posts
+    enough = {name: threading.Event() for name in subreddit_names}
+
+    if analysis_workers > 0:
+        analysis = ProcessPoolExecutor(
+            max_workers=analysis_workers,
+            initializer=_init_analysis,
+            initargs=(key_words, tokens_path is not None),
+        )
+    else:
+        _init_analysis(key_words, tokens_path is not None)
+        analysis = None
+
+    def fetch(name: str) -> None:
+        stage = queues[name]
+        posts = None
+        # Any failure, creating the client included, is passed on to the writer
+        try:
+            client = reddit if fetch_workers <= 1 else clone_reddit(reddit, limiter)
+            posts = iter_post_data(
+                client.subreddit(name),
+                # Keywords are checked by the analysis, which decides which posts count
+                limit=sys.maxsize if key_words else limit,
+                start_date=start_date,
+                end_date=end_date,
+                listing=listing,
+                max_depth=max_depth,
+                min_score=min_score,
+                more_limit=more_limit,
+                comment_workers=comment_workers,
+                limiter=limiter,
+            )
+            for items, _ in posts:
+                if enough[name].is_set():
+                    break
+                if not items:
+                    continue
+                post, comments = items[0], items[1:]
+                if analysis is not None:
+                    future = analysis.submit(analyze_thread, post, comments, limit)
+                else:
+                    future = Future()
+                    future.set_result(analyze_thread(post, comments, limit))
+                if not stage.put_unless(future, cancelled):
+                    break
+        except BaseException as exc:
+            stage.put_unless(exc, cancelled)
+            raise
+        finally:
+            if posts is not None:
+                posts.close()
+        stage.put_unless(_DONE, cancelled)
+
+    def analysed(name: str, tokens_file) -> Iterator:
+        stage = queues[name]
+        post_count = 0
+        while True:
+            pending = stage.timed_get(futures[name])
+            if pending is _DONE:
+                return
+            if isinstance(pending, BaseException):
+                raise pending
+            if post_count >= limit:
+                # Drained so that the fetcher is not left blocked on a full queue
+                continue
+            with report.timer("analysis_wait", f"r/{name}"):
+                items, tokens = pending.result()
+            if not items:
+                continue
+            post_count += 1
+            # Numbered after the keyword filter, as extract_post_data numbers them
+            post = items[0]
+            post.id = f"RD-01-{post_count:02d}"
+            for number, comment in enumerate(items[1:], start=1):
+                comment.id = f"{post.id}-{number:02d}"
+            if post_count >= limit:
+                enough[name].set()
+            if tokens_file is not None:
+                for item, item_tokens in zip(items, tokens):
+                    tokens_file.write(
+                        json.dumps({"id": item.id, "Subreddit": item.Subreddit, "tokens": item_tokens})
+                        + "\n"
+                    )
+            yield from items
+
+    sink = open_sink(output_path)
+    tokens_file = open(tokens_path, "w", encoding="utf-8") if tokens_path else None
+    fetchers = ThreadPoolExecutor(max_workers=max(fetch_workers, 1))
+    try:
+        futures = {name: fetchers.submit(fetch, name) for name in subreddit_names}
+        for name in subreddit_names:
+            with report.timer("write", f"r/{name}"):
+                written = sink.write_sheet(name, analysed(name, tokens_file))
+            report.count("items_written", written, f"r/{name}")
+        with report.timer("save"):
+            sink.save()
+        for future in futures.values():
+            future.result()
+    finally:
+        # On error, fetchers blocked on a full queue give up
+        cancelled.set()
+        fetchers.shutdown(wait=True, cancel_futures=True)
+        if analysis is not None:
+            analysis.shutdown(wait=True, cancel_futures=True)
+        if tokens_file is not None:
+            tokens_file.close()
+
+    stats = {name: stage.stats() for name, stage in queues.items()}
+    for name, stage_stats in stats.items():
+        print(f"r/{name} queue: {stage_stats}")
+    return stats
@@ -1,100 +1,117 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import praw
 from praw import Reddit
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font
-from openpyxl.utils import get_column_letter
 
 from config import key_words_1,key_words_2,key_words_3
+import instrumentation
+from dedup import DedupIndex
+from export import open_sink
+from journal import ExtractionJournal
+from model import Post
+from scheduler import InstrumentedRequestor, RateLimiter, clone_reddit
+from sentiment import annotate_sentiment
+from store import RedditStore
 from utils import extract_post_data, CLIENT_ID, CLIENT_SECRET
 
 
 def save_subreddits_to_excel(
     reddit: Reddit,
     subreddit_names: list[str],
+    output_path: str = "reddit_threads_1.xlsx",
     limit: int = 5,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     key_words: list[str] | None = None,
+    workers: int = 1,
+    comment_workers: int = 1,
+    requests_per_minute: float = 100,
+    store: RedditStore | None = None,
+    dedup: DedupIndex | None = None,
+    journal: str | None = None,
 ) -> None:
     """Saves extracted subreddit data to an Excel file.
     Args:
         reddit (Reddit): The Reddit instance.
         subreddit_names (list): List of subreddit names to extract data from.
-        output_path (str): Path to save the Excel file.
+        output_path (str): Path to save the file, whose extension picks the format
+            (.xlsx, .jsonl, .csv or .parquet).
         limit (int): Maximum number of posts and comments to extract per subreddit.
         start_date (datetime | None): Start date for filtering posts/comments.
         end_date (datetime | None): End date for filtering posts/comments.
         key_words (list[str] | None): List of keywords to filter posts/comments.
+        workers (int): Number of subreddits extracted in parallel, each with its own
+            Reddit instance. Sheets keep the order of subreddit_names.
+        comment_workers (int): Number of threads fetching comment trees within a subreddit.
+        requests_per_minute (float): Request budget shared by all workers, subreddit
+            and comment workers, when extracting in parallel.
+        store (RedditStore | None): Local store of fetched posts, synced incrementally.
+            Its first sync of a subreddit fetches every post of the date window with its
+            comments (up to the listing's ~1000 posts), whatever the limit.
+        dedup (DedupIndex | None): Index dropping crossposts and copy-pasted posts (with
+            their comments) and copy-pasted comments of items written in an earlier sheet (or an earlier run
+            sharing the index). The dropped keys are recorded in dedup.duplicates.
+        journal (str | None): Directory of a run journal, None for no journal. Posts
+            are appended to it as they are extracted and the output is written from it,
+            so a run restarted with the same journal resumes each subreddit where it
+            stopped. Subreddits the journal holds as done are not extracted again: use
+            a new directory for every run (see journal.run_directory).
     """
-    wb = Workbook()
-    default_sheet = wb.active
-    wb.remove(default_sheet)
+    def annotate(items: list[Post]) -> list[Post]:
+        with report.timer("sentiment"):
+            return annotate_sentiment(items)
 
-    columns = [
-        "id",
-        "Reddit_URL",
-        "Thread_Title",
-        "Subreddit",
-        "Content",
-        "Category",
-        "Author",
-        "Date_Posted",
-        "Number_of_comments",
-        "Upvotes",
-        "Keywords",
-        "Sentiment",
-        "Tag",
-        "Date_added",
-        "Who_added",
-    ]
-
-    for sub_name in subreddit_names:
-        subreddit = reddit.subreddit(sub_name)
-        all_data = extract_post_data(
-            subreddit,
+    def extract(sub_name: str) -> list[Post] | None:
+        client = reddit if workers <= 1 else clone_reddit(reddit, limiter)
+        options = dict(
             limit=limit,
             start_date=start_date,
             end_date=end_date,
             key_words=key_words,
+            comment_workers=comment_workers,
+            store=store,
+            limiter=limiter,
         )
+        if run_journal is not None:
+            run_journal.extract(client.subreddit(sub_name), process=annotate, **options)
+            return None
+        return annotate(extract_post_data(client.subreddit(sub_name), as_records=True, **options))
 
-        ws = wb.create_sheet(title=sub_name[:31])
-        # Headers
-        for col_idx, col_name in enumerate(columns, start=1):
-            cell = ws.cell(row=1, column=col_idx, value=col_name)
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal="center")
-
-        # columns data
-        current_row = 2
-        for item in all_data:
-            for col_idx, col_name in enumerate(columns, start=1):
-                ws.cell(row=current_row, column=col_idx, value=getattr(item,col_name, None))
-            current_row += 1
+    report = instrumentation.current()
+    limiter = RateLimiter(requests_per_minute)
+    run_journal = ExtractionJournal(journal) if journal else None
+    sink = open_sink(output_path)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        # map() yields results in submission order, whatever the completion order
+        extracted = zip(subreddit_names, pool.map(extract, subreddit_names))
 
-        # Size columns
-        for col_idx, col_name in enumerate(columns, start=1):
-            max_length = max(
-                (
-                    len(str(ws.cell(row=row, column=col_idx).value))
-                    for row in range(1, ws.max_row + 1)
-                    if ws.cell(row=row, column=col_idx).value
-                ),
-                default=0,
-            )
-            ws.column_dimensions[get_column_letter(col_idx)].width = min(
-                max_length + 2, 60
-            )
+        for sub_name, all_data in extracted:
+            # Deduplicated in sheet order, so the canonical item does not depend on timing
+            scope = f"r/{sub_name}"
+            if run_journal is not None:
+                # Streamed from the journal, deduplicating on the way
+                all_data = run_journal.items(sub_name)
+                if dedup is not None:
+                    all_data = dedup.filter(all_data)
+            elif dedup is not None:
+                with report.timer("dedup", scope):
+                    all_data = dedup.deduplicate(all_data)
+            with report.timer("write", scope):
+                sink.write_sheet(sub_name, all_data)
 
-    wb.save(f"reddit_threads_1.xlsx")
+    with report.timer("save"):
+        sink.save()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s %(message)s")
+    report = instrumentation.enable(progress_interval=30)
     reddit = praw.Reddit(
         client_id=CLIENT_ID,
         client_secret=CLIENT_SECRET,
         user_agent="u/sk00bew",
+        requestor_class=InstrumentedRequestor,
     )
 
     begin = datetime(2020, 1, 1)
@@ -109,5 +126,8 @@ if __name__ == "__main__":
         limit=10,
         start_date=begin,
         end_date=end,
-        key_words=key_words_2
+        key_words=key_words_2,
+        workers=len(threads),
+        dedup=DedupIndex(),
     )
+    report.save("run_report.json")
@@ -0,0 +1,231 @@
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from config import relevance_prefilter, relevance_queries
+from model import Post
+from store import content_hash
+from utils import get_keyword_matcher
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_DIR = Path(__file__).resolve().parent / "models" / "all-MiniLM-L6-v2"
+
+
+def download_model(name: str = MODEL_NAME, path: Path = MODEL_DIR) -> None:
+    """
+    Saves a sentence-transformers model locally, to be run once while online.
+    Args:
+        name (str): Name of the model on the Hugging Face hub.
+        path (Path): Directory to save it to.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    SentenceTransformer(name, device="cpu").save(str(path))
+
+
+@lru_cache(maxsize=None)
+def load_model(path: Path = MODEL_DIR):
+    """
+    Loads a locally saved sentence-transformers model on CPU, without network access.
+    Args:
+        path (Path): Directory of the model, see download_model.
+    Returns:
+        SentenceTransformer: The model.
+    """
+    if not Path(path).exists():
+        raise FileNotFoundError(
+            f"No model in {path}, run relevance.download_model() once while online"
+        )
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(str(path), device="cpu", local_files_only=True)
+
+
+class EmbeddingCache:
+    """
+    SQLite table of embeddings keyed by a hash of the model and the text, so a text
+    is only encoded once across runs.
+    """
+
+    def __init__(self, path: str = "embeddings.sqlite"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """
+        Reads the cached embeddings of some keys, missing ones being left out.
+        """
+        found = {}
+        # SQLite limits the number of parameters of a query
+        for offset in range(0, len(keys), 500):
+            batch = keys[offset : offset + 500]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            for key, vector in rows:
+                found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, embeddings: dict[str, np.ndarray]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                (
+                    (key, np.asarray(vector, dtype=np.float32).tobytes())
+                    for key, vector in embeddings.items()
+                ),
+            )
+
+
+class RelevanceScorer:
+    """
+    Scores texts by their cosine similarity to reference queries, with a local
+    sentence-transformers model encoding on CPU in batches.
+    """
+
+    def __init__(
+        self,
+        queries: list[str] = relevance_queries,
+        model=None,
+        cache: EmbeddingCache | None = None,
+        batch_size: int = 64,
+        model_path: Path = MODEL_DIR,
+    ):
+        """
+        Args:
+            queries (list[str]): Texts describing what is relevant.
+            model: Object with a sentence-transformers encode method, the model saved
+                in model_path by default.
+            cache (EmbeddingCache | None): Cache of embeddings, none by default.
+            batch_size (int): Number of texts encoded together.
+            model_path (Path): Directory of the local model, also part of the cache keys.
+        """
+        self.model = model if model is not None else load_model(model_path)
+        self.cache = cache
+        self.batch_size = batch_size
+        self.model_id = Path(model_path).name
+        self.encoded = 0
+        self.queries = self.embed(queries)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embeds texts, reading known ones from the cache and encoding each new text once.
+        Args:
+            texts (list[str]): The texts.
+        Returns:
+            np.ndarray: Normalized embeddings, one row per text.
+        """
+        keys = [content_hash(self.model_id, text) for text in texts]
+        vectors = self.cache.get_many(list(set(keys))) if self.cache else {}
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            encoded = self.model.encode(
+                list(missing.values()),
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ).astype(np.float32)
+            new_vectors = dict(zip(missing, encoded))
+            if self.cache:
+                self.cache.put_many(new_vectors)
+            vectors.update(new_vectors)
+            self.encoded += len(missing)
+
+        return np.array([vectors[key] for key in keys], dtype=np.float32)
+
+    def score(self, texts: list[str]) -> np.ndarray:
+        """
+        Similarity of each text to its closest reference query.
+        Args:
+            texts (list[str]): The texts.
+        Returns:
+            np.ndarray: One score per text, between -1 and 1.
+        """
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        return (self.embed(texts) @ self.queries.T).max(axis=1)
+
+
+def item_text(item: Post) -> str:
+    """
+    Text a post (title and content) or a comment (content) is judged on.
+    """
+    if item.Category == "comment":
+        return item.Content or ""
+    return " ".join(filter(None, (item.Thread_Title, item.Content)))
+
+
+def filter_relevant(
+    items: Iterable[Post],
+    key_words: list[str] | None = None,
+    scorer: RelevanceScorer | None = None,
+    threshold: float = 0.35,
+    prefilter: list[str] = relevance_prefilter,
+) -> list[Post]:
+    """
+    Keeps the items about the subject, even those without an exact keyword. Meant for
+    the output of extract_post_data called without key_words, so nothing is dropped
+    before this stage. Items with an exact keyword are kept without encoding, the
+    others are only encoded if they contain one of the prefilter words.
+    Posts and comments are grouped like extract_post_data groups them: a post is kept
+    if it or one of its comments is relevant, and only the relevant comments of a kept
+    post are kept.
+    Args:
+        items (Iterable[Post]): Posts, each followed by its comments (models or records).
+        key_words (list[str] | None): Exact keywords, added to the Keywords field like
+            extract_post_data fills it. Items already holding Keywords count as matches.
+        scorer (RelevanceScorer | None): Scorer to use, one with the local model, the
+            reference queries and the embeddings.sqlite cache by default.
+        threshold (float): Minimum similarity to a reference query.
+        prefilter (list[str]): Words an item must contain to be worth encoding.
+    Returns:
+        list[Post]: The relevant items, in their original order.
+    """
+    items = list(items)
+    if key_words:
+        keywords_matcher = get_keyword_matcher(key_words)
+        for item in items:
+            found = keywords_matcher.find_all(item.Content, item.Thread_Title)
+            if found:
+                item.Keywords = list(dict.fromkeys([*(item.Keywords or ()), *found]))
+    relevant = [bool(item.Keywords) for item in items]
+    exact = sum(relevant)
+
+    matcher = get_keyword_matcher(prefilter)
+    candidates = [
+        index
+        for index, item in enumerate(items)
+        if not relevant[index] and matcher.search(item_text(item))
+    ]
+    if candidates:
+        scorer = scorer or RelevanceScorer(cache=EmbeddingCache())
+        scores = scorer.score([item_text(items[index]) for index in candidates])
+        for index, score in zip(candidates, scores):
+            relevant[index] = bool(score >= threshold)
+
+    # A post is kept for itself or for one of the comments following it
+    keep = list(relevant)
+    post_index = None
+    for index, item in enumerate(items):
+        if item.Category != "comment":
+            post_index = index
+        elif relevant[index] and post_index is not None:
+            keep[post_index] = True
+
+    print(
+        f"Relevant items: {sum(keep)} / {len(items)} "
+        f"(exact keyword: {exact}, encoded: {len(candidates)})"
+    )
+    return [item for item, kept in zip(items, keep) if kept]
@@ -0,0 +1,283 @@
+from typing import Iterable
+
+import numpy as np
+from scipy import sparse
+
+from model import CommentRecord
+from store import RedditStore
+
+
+def _resolve_ancestors(parent: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Pointer jumping: every round, each item looks twice as far up, so chains of
+    # length d are resolved in log2(d) vectorised rounds
+    size = len(parent)
+    depth = (parent >= 0).astype(np.int32)
+    root = np.where(parent >= 0, parent, np.arange(size, dtype=np.int32))
+    ancestor = parent.copy()
+    active = np.flatnonzero(ancestor >= 0)
+    for _ in range(64):
+        if not len(active):
+            return depth, root
+        up = ancestor[active]
+        further = ancestor[up]
+        step = depth[up]
+        jumping = further >= 0
+        root[active[~jumping]] = up[~jumping]
+        active = active[jumping]
+        depth[active] += step[jumping]
+        ancestor[active] = further[jumping]
+    raise ValueError("The parent links contain a cycle")
+
+
+class ReplyGraph:
+    """
+    Reply structure of posts and comments, held in integer arrays.
+
+    Items and authors get integer ids (their index in fullnames and authors); each
+    item keeps the id of its parent and its author, and the children of every item
+    are stored CSR-style (children_indptr/children_indices), so nothing is allocated
+    per edge and queries are vectorised numpy operations.
+
+    A comment whose parent was not extracted (e.g. filtered out by keywords) is
+    attached to its post, and its link is not counted as a reply between authors.
+    Build it from an extraction without keywords, or from the store, to keep the
+    whole structure.
+    """
+
+    def __init__(self, nodes: Iterable[tuple[str, str | None, str | None, str | None]]):
+        """
+        Args:
+            nodes (Iterable[tuple]): For each item, its fullname, the fullname of its
+                parent and of its post (None for a post) and its author (None if deleted).
+        """
+        self.index: dict[str, int] = {}
+        author_ids: dict[str, int] = {}
+        fullnames, parent_names, post_names, authors = [], [], [], []
+        for fullname, parent_id, link_id, author in nodes:
+            if fullname in self.index:
+                continue
+            self.index[fullname] = len(fullnames)
+            fullnames.append(fullname)
+            parent_names.append(parent_id)
+            post_names.append(link_id)
+            authors.append(author_ids.setdefault(author, len(author_ids)) if author else -1)
+
+        index = self.index
+        parent = np.fromiter(
+            (index.get(name, -1) if name else -1 for name in parent_names), np.int32, len(fullnames)
+        )
+        post = np.fromiter(
+            (index.get(name, -1) if name else -1 for name in post_names), np.int32, len(fullnames)
+        )
+        # Whether the parent link is the real one, not an orphan attached to its post
+        self.direct = parent >= 0
+        orphans = (parent < 0) & (post >= 0)
+        parent[orphans] = post[orphans]
+
+        self.fullnames = np.array(fullnames, dtype=object)
+        self.authors = np.array(list(author_ids), dtype=object)
+        self.parent = parent
+        self.author = np.array(authors, dtype=np.int32)
+        self.depth, self.root = _resolve_ancestors(parent)
+
+        children = np.flatnonzero(parent >= 0)
+        order = np.argsort(parent[children], kind="stable")
+        self.children_indices = children[order].astype(np.int32)
+        self.children_indptr = np.zeros(len(fullnames) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(parent[children], minlength=len(fullnames)), out=self.children_indptr[1:])
+        self._subtree_sizes: np.ndarray | None = None
+        print(
+            f"Reply graph: {len(fullnames)} items, {len(self.authors)} authors, "
+            f"{int(orphans.sum())} orphan comments"
+        )
+
+    @classmethod
+    def from_records(cls, items: Iterable) -> "ReplyGraph":
+        """
+        Builds the graph of PostRecord/CommentRecord objects, as returned by
+        extract_post_data(as_records=True).
+        """
+        return cls(
+            (
+                item.fullname,
+                item.parent_id,
+                item.post.fullname if item.post else None,
+                item.Author,
+            )
+            if isinstance(item, CommentRecord)
+            else (item.fullname, None, None, item.Author)
+            for item in items
+        )
+
+    @classmethod
+    def from_store(
+        cls,
+        store: RedditStore,
+        subreddit_name: str,
+        start_ts: float | None = None,
+        end_ts: float | None = None,
+    ) -> "ReplyGraph":
+        """
+        Builds the graph of the stored posts of a subreddit and all their stored
+        comments, without any API call.
+        Args:
+            store (RedditStore): The store.
+            subreddit_name (str): Name of the subreddit.
+            start_ts (float | None): Oldest post timestamp allowed.
+            end_ts (float | None): Newest post timestamp allowed.
+        """
+
+        def nodes():
+            for submission in store.submissions(subreddit_name, start_ts, end_ts):
+                author = submission.author
+                yield submission.fullname, None, None, f"u/{author}" if author else None
+            for fullname, parent_id, link_id, author in store.comment_links(
+                subreddit_name, start_ts, end_ts
+            ):
+                yield fullname, parent_id, link_id, f"u/{author}" if author else None
+
+        return cls(nodes())
+
+    def __len__(self) -> int:
+        return len(self.fullnames)
+
+    def _id(self, item: str | int) -> int:
+        return self.index[item] if isinstance(item, str) else item
+
+    def children(self, item: str | int) -> np.ndarray:
+        """
+        Direct replies of an item.
+        Args:
+            item (str | int): Fullname or id of the item.
+        Returns:
+            np.ndarray: Ids of the replies.
+        """
+        item = self._id(item)
+        return self.children_indices[self.children_indptr[item] : self.children_indptr[item + 1]]
+
+    def subtree_sizes(self) -> np.ndarray:
+        """
+        Number of items in the subtree of every item, itself included (a post's is
+        its number of comments plus one). Computed level by level, deepest first.
+        """
+        if self._subtree_sizes is None:
+            sizes = np.ones(len(self), dtype=np.int64)
+            order = np.argsort(self.depth, kind="stable")
+            bounds = np.searchsorted(self.depth[order], np.arange(self.depth.max(initial=0) + 2))
+            for level in range(len(bounds) - 2, 0, -1):
+                items = order[bounds[level] : bounds[level + 1]]
+                np.add.at(sizes, self.parent[items], sizes[items])
+            self._subtree_sizes = sizes
+        return self._subtree_sizes
+
+    def thread_stats(self) -> list[dict]:
+        """
+        Size, depth and number of distinct authors of every thread.
+        Depth counts replies from the post: 1 for top-level comments only.
+        Returns:
+            list[dict]: One row per post (or root item), largest threads first.
+        """
+        roots = np.flatnonzero(self.parent < 0)
+        max_depth = np.zeros(len(self), dtype=np.int32)
+        np.maximum.at(max_depth, self.root, self.depth)
+        known = self.author >= 0
+        pairs = np.unique(self.root[known].astype(np.int64) * len(self.authors) + self.author[known])
+        distinct_authors = np.bincount(pairs // max(len(self.authors), 1), minlength=len(self))
+        sizes = self.subtree_sizes()
+        stats = [
+            {
+                "fullname": self.fullnames[root],
+                "comments": int(sizes[root] - 1),
+                "depth": int(max_depth[root]),
+                "authors": int(distinct_authors[root]),
+            }
+            for root in roots
+        ]
+        return sorted(stats, key=lambda row: row["comments"], reverse=True)
+
+    def author_network(self, include_self: bool = False) -> sparse.csr_matrix:
+        """
+        Who replies to whom: entry (i, j) is the number of replies of author i to
+        items of author j.
+        Args:
+            include_self (bool): Whether to count authors replying in their own threads
+                under their own items.
+        Returns:
+            sparse.csr_matrix: The weighted adjacency matrix of the authors.
+        """
+        replies = np.flatnonzero(self.direct)
+        source = self.author[replies]
+        target = self.author[self.parent[replies]]
+        keep = (source >= 0) & (target >= 0)
+        if not include_self:
+            keep &= source != target
+        return sparse.csr_matrix(
+            (np.ones(int(keep.sum()), dtype=np.int32), (source[keep], target[keep])),
+            shape=(len(self.authors), len(self.authors)),
+        )
+
+    def pagerank(
+        self,
+        network: sparse.csr_matrix | None = None,
+        damping: float = 0.85,
+        tolerance: float = 1e-10,
+        max_iterations: int = 100,
+    ) -> np.ndarray:
+        """
+        PageRank of the authors in the reply network: authors replied to by many,
+        themselves much replied to, rank highest.
+        Args:
+            network (sparse.csr_matrix | None): The author network, built if missing.
+            damping (float): Probability of following a reply rather than jumping.
+            tolerance (float): L1 change between iterations to stop at.
+            max_iterations (int): Maximum number of iterations.
+        Returns:
+            np.ndarray: The score of every author, summing to 1.
+        """
+        network = self.author_network() if network is None else network
+        count = network.shape[0]
+        if not count:
+            return np.zeros(0)
+        out_weight = np.asarray(network.sum(axis=1)).ravel().astype(float)
+        dangling = out_weight == 0
+        # Row-normalised transitions, transposed to spread each author's rank forward
+        transitions = sparse.diags(np.divide(1, out_weight, where=~dangling, out=np.zeros(count))) @ network
+        transitions = transitions.T.tocsr()
+        rank = np.full(count, 1 / count)
+        for _ in range(max_iterations):
+            new_rank = damping * (transitions @ rank + rank[dangling].sum() / count) + (1 - damping) / count
+            if np.abs(new_rank - rank).sum() < tolerance:
+                return new_rank
+            rank = new_rank
+        return rank
+
+    def author_stats(self, n: int | None = 20, include_self: bool = False) -> list[dict]:
+        """
+        Degree and centrality of the authors in the reply network.
+        Args:
+            n (int | None): Number of authors, all if None.
+            include_self (bool): See author_network.
+        Returns:
+            list[dict]: Items written, replies sent and received, distinct authors
+                replied to and replied by, and PageRank, highest PageRank first.
+        """
+        network = self.author_network(include_self)
+        rank = self.pagerank(network)
+        items = np.bincount(self.author[self.author >= 0], minlength=len(self.authors))
+        sent = np.asarray(network.sum(axis=1)).ravel()
+        received = np.asarray(network.sum(axis=0)).ravel()
+        replied_to = np.diff(network.indptr)
+        replied_by = np.diff(network.tocsc().indptr)
+        order = np.argsort(-rank, kind="stable")[:n]
+        return [
+            {
+                "author": self.authors[author],
+                "items": int(items[author]),
+                "replies_sent": int(sent[author]),
+                "replies_received": int(received[author]),
+                "replied_to": int(replied_to[author]),
+                "replied_by": int(replied_by[author]),
+                "pagerank": float(rank[author]),
+            }
+            for author in order
+        ]
@@ -0,0 +1,51 @@
+from functools import lru_cache
+
+# Name given to nltk.download -> path looked up by nltk.data.find
+NLTK_RESOURCES = {
+    "stopwords": "corpora/stopwords",
+    "wordnet": "corpora/wordnet",
+}
+
+
+@lru_cache(maxsize=None)
+def ensure_nltk_resource(name: str) -> None:
+    """
+    Downloads an NLTK resource if it is not installed yet, checking only once per process.
+    A failed download (e.g. offline) raises a LookupError and is not cached, so the
+    next call tries again.
+    Args:
+        name (str): Name of the resource, a key of NLTK_RESOURCES.
+    """
+    import nltk
+
+    try:
+        nltk.data.find(NLTK_RESOURCES[name])
+    except LookupError:
+        # nltk.download reports failures by returning False
+        if not nltk.download(name, quiet=True):
+            raise LookupError(
+                f"NLTK resource '{name}' is not installed and could not be downloaded; "
+                f"run nltk.download('{name}') with network access"
+            ) from None
+
+
+@lru_cache(maxsize=None)
+def english_stopwords() -> frozenset[str]:
+    """
+    NLTK's English stopwords, loaded on first use.
+    """
+    ensure_nltk_resource("stopwords")
+    from nltk.corpus import stopwords
+
+    return frozenset(stopwords.words("english"))
+
+
+@lru_cache(maxsize=None)
+def get_lemmatizer():
+    """
+    WordNet lemmatizer, built on first use.
+    """
+    ensure_nltk_resource("wordnet")
+    from nltk.stem import WordNetLemmatizer
+
+    return WordNetLemmatizer()
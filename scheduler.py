@@ -0,0 +1,132 @@
+import threading
+import time
+import weakref
+from typing import Any, Mapping
+
+import praw
+from praw import Reddit
+from prawcore import Requestor
+
+import instrumentation
+
+# Reddit instances built by clone_reddit -> the limiter they go through
+_limiters: "weakref.WeakKeyDictionary[Reddit, RateLimiter]" = weakref.WeakKeyDictionary()
+
+
+class RateLimiter:
+    """
+    Request scheduler shared by every thread and Reddit instance of a run.
+
+    Requests are spaced evenly to stay under `requests_per_minute` (Reddit allows
+    100 per minute for an OAuth client), and everyone pauses when a response says
+    the quota is exhausted. Workers still overlap their network latency, so the
+    throughput grows with the number of workers until the limit is reached.
+    """
+
+    def __init__(self, requests_per_minute: float = 100):
+        self.interval = 60 / requests_per_minute
+        self.requests = 0
+        self.waited = 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until the calling thread is allowed to send a request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            self.requests += 1
+            self.waited += slot - now
+        if slot > now:
+            instrumentation.current().add_time("rate_limit_wait", slot - now)
+            time.sleep(slot - now)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """
+        Reads Reddit's rate-limit headers and holds back every worker if the quota is spent.
+        Args:
+            headers (Mapping[str, str]): Headers of the last response.
+        """
+        if "x-ratelimit-remaining" not in headers:
+            return
+        if float(headers["x-ratelimit-remaining"]) <= 0:
+            instrumentation.current().count("rate_limit_exhausted")
+            reset = float(headers.get("x-ratelimit-reset", 1))
+            with self._lock:
+                self._next_slot = max(self._next_slot, time.monotonic() + max(reset, 1))
+
+
+class InstrumentedRequestor(Requestor):
+    """
+    prawcore requestor counting and timing API requests in the run report, to pass
+    as requestor_class to praw.Reddit.
+    """
+
+    def request(self, *args: Any, **kwargs: Any):
+        report = instrumentation.current()
+        with report.timer("api_request"):
+            response = super().request(*args, **kwargs)
+        report.count("api_requests")
+        if response.status_code == 429:
+            report.count("api_429")
+        return response
+
+
+class ThrottledRequestor(InstrumentedRequestor):
+    """
+    prawcore requestor sending every request through a shared RateLimiter.
+    """
+
+    def __init__(self, *args: Any, limiter: RateLimiter, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def request(self, *args: Any, **kwargs: Any):
+        self.limiter.acquire()
+        response = super().request(*args, **kwargs)
+        self.limiter.update(response.headers)
+        return response
+
+
+def clone_reddit(reddit: Reddit, limiter: RateLimiter) -> Reddit:
+    """
+    Builds a new Reddit instance with the same credentials, throttled by a shared limiter.
+    PRAW instances are not thread-safe, so each worker thread needs its own.
+    Args:
+        reddit (Reddit): The Reddit instance to copy the configuration from.
+        limiter (RateLimiter): The limiter shared by all workers.
+    Returns:
+        Reddit: The new instance.
+    """
+    config = reddit.config
+    credentials = {
+        key: getattr(config, key)
+        for key in ("client_id", "client_secret", "username", "password")
+        if getattr(config, key, None)
+    }
+    clone = praw.Reddit(
+        **credentials,
+        user_agent=config.user_agent,
+        oauth_url=config.oauth_url,
+        reddit_url=config.reddit_url,
+        requestor_class=ThrottledRequestor,
+        requestor_kwargs={"limiter": limiter},
+    )
+    _limiters[clone] = limiter
+    return clone
+
+
+def throttled(reddit: Reddit, limiter: RateLimiter) -> Reddit:
+    """
+    A Reddit instance whose requests go through a limiter: the instance itself if it
+    was cloned with this limiter, else a clone (see clone_reddit).
+    Args:
+        reddit (Reddit): The Reddit instance.
+        limiter (RateLimiter): The limiter shared by all workers.
+    Returns:
+        Reddit: The throttled instance.
+    """
+    return reddit if _limiters.get(reddit) is limiter else clone_reddit(reddit, limiter)
@@ -0,0 +1,128 @@
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from model import Post
+
+WORDS_LISTS_DIR = Path(__file__).resolve().parent / "words_lists"
+
+# Lexicon entries may contain digits, hyphens and censoring stars ("2-faced", "f**k")
+_TOKEN = re.compile(r"[\w*+'-]+")
+
+
+class SentimentScore(NamedTuple):
+    positive: int
+    negative: int
+    label: str
+
+
+class Lexicon:
+    """
+    Hu & Liu opinion lexicon held in hashed sets, scoring a text in one pass over its tokens.
+    """
+
+    def __init__(self, positive_words: Iterable[str], negative_words: Iterable[str]):
+        self.positive = frozenset(positive_words)
+        self.negative = frozenset(negative_words)
+
+    def tokenize(self, text: str | None) -> list[str]:
+        """
+        Splits a text into lowercased tokens. Hyphenated words missing from the
+        lexicon are also split into their parts ("heart-broken" -> "heart", "broken").
+        Args:
+            text (str | None): The text to tokenize.
+        Returns:
+            list[str]: The tokens.
+        """
+        if not text:
+            return []
+        tokens = []
+        for token in _TOKEN.findall(text.lower()):
+            if "-" in token and token not in self.positive and token not in self.negative:
+                tokens.extend(part for part in token.split("-") if part)
+            else:
+                tokens.append(token)
+        return tokens
+
+    def score(self, text: str | None) -> SentimentScore:
+        """
+        Counts positive and negative words in a text.
+        Args:
+            text (str | None): The text to score.
+        Returns:
+            SentimentScore: Positive/negative counts and the resulting label.
+        """
+        tokens = self.tokenize(text)
+        positive = sum(map(self.positive.__contains__, tokens))
+        negative = sum(map(self.negative.__contains__, tokens))
+        if positive > negative:
+            label = "positive"
+        elif negative > positive:
+            label = "negative"
+        else:
+            label = "neutral"
+        return SentimentScore(positive, negative, label)
+
+    def score_many(self, texts: Iterable[str | None]) -> list[SentimentScore]:
+        """
+        Scores a batch of texts.
+        Args:
+            texts (Iterable[str | None]): The texts to score.
+        Returns:
+            list[SentimentScore]: One score per text, in the same order.
+        """
+        return [self.score(text) for text in texts]
+
+
+def read_words_file(path: Path) -> list[str]:
+    """
+    Reads a Hu & Liu words file, skipping blank lines and ';' comments.
+    Args:
+        path (Path): Path to the words file.
+    Returns:
+        list[str]: The words, lowercased.
+    """
+    with open(path, "r", encoding="utf-8") as words_file:
+        return [
+            line.strip().lower()
+            for line in words_file
+            if line.strip() and not line.startswith(";")
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_lexicon(words_dir: Path = WORDS_LISTS_DIR) -> Lexicon:
+    """
+    Loads the positive and negative words lists once per directory.
+    Args:
+        words_dir (Path): Directory holding positive_words.txt and negative_words.txt.
+    Returns:
+        Lexicon: The loaded lexicon.
+    """
+    return Lexicon(
+        read_words_file(Path(words_dir) / "positive_words.txt"),
+        read_words_file(Path(words_dir) / "negative_words.txt"),
+    )
+
+
+def annotate_sentiment(items: list[Post], lexicon: Lexicon | None = None) -> list[Post]:
+    """
+    Fills the Sentiment field of posts and comments, as returned by extract_post_data.
+    Posts are scored on their title and content, comments on their content only.
+    Args:
+        items (list[Post]): Post and Comment objects.
+        lexicon (Lexicon | None): Lexicon to use, the Hu & Liu lists by default.
+    Returns:
+        list[Post]: The same objects, updated in place.
+    """
+    lexicon = lexicon or get_lexicon()
+    texts = [
+        item.Content
+        if item.Category == "comment"
+        else " ".join(filter(None, (item.Thread_Title, item.Content)))
+        for item in items
+    ]
+    for item, score in zip(items, lexicon.score_many(texts)):
+        item.Sentiment = score.label
+    return items
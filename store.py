@@ -0,0 +1,420 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from praw.models import Subreddit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    fullname TEXT PRIMARY KEY,
+    subreddit TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_by_date ON submissions (subreddit, created_utc);
+CREATE TABLE IF NOT EXISTS comments (
+    fullname TEXT PRIMARY KEY,
+    link_id TEXT NOT NULL,
+    parent_id TEXT,
+    created_utc REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comments_by_post ON comments (link_id, created_utc);
+CREATE TABLE IF NOT EXISTS sync (
+    subreddit TEXT PRIMARY KEY,
+    watermark REAL NOT NULL,
+    synced_at REAL NOT NULL,
+    oldest REAL
+);
+"""
+
+SUBMISSION_FIELDS = (
+    "id", "title", "selftext", "author", "permalink", "num_comments",
+    "score", "link_flair_text", "created_utc", "crosspost_parent",
+)
+COMMENT_FIELDS = (
+    "id", "body", "author", "permalink", "score", "created_utc",
+    "depth", "parent_id", "link_id",
+)
+
+
+def content_hash(*texts: str | None) -> str:
+    """
+    Hashes the text of an item, to know if it was edited since it was stored.
+    Args:
+        *texts (str | None): The texts of the item (title, body...).
+    Returns:
+        str: Hex digest of the texts.
+    """
+    digest = hashlib.sha1()
+    for text in texts:
+        digest.update((text or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _raw_fields(reddit_obj, fields: tuple[str, ...]) -> dict:
+    data = {field: getattr(reddit_obj, field, None) for field in fields}
+    # Redditor objects are stored by name
+    data["author"] = str(data["author"]) if data["author"] else None
+    return data
+
+
+class StoredComment:
+    """
+    Comment read back from the store, exposing the attributes of a praw Comment.
+    """
+
+    def __init__(self, data: dict):
+        self.__dict__.update(data)
+        self.fullname = f"t1_{self.id}"
+        self.replies: list[StoredComment] = []
+
+
+class StoredSubmission:
+    """
+    Submission read back from the store, exposing the attributes of a praw Submission.
+    Its comment tree is read from the store on first access.
+    """
+
+    def __init__(self, store: "RedditStore", data: dict):
+        self.__dict__.update(data)
+        self.fullname = f"t3_{self.id}"
+        self.treatment_tags = []
+        self._store = store
+        self._comments: list[StoredComment] | None = None
+
+    @property
+    def comments(self) -> list[StoredComment]:
+        if self._comments is None:
+            self._comments = self._store.comment_tree(self.fullname)
+        return self._comments
+
+
+class RedditStore:
+    """
+    Local SQLite copy of fetched submissions and comments, keyed by Reddit fullname.
+
+    Each subreddit keeps a sync watermark (created_utc of the newest stored post) and
+    the oldest timestamp its posts are complete from, so a sync only fetches the posts
+    published since the previous one, and older ones when asked for an earlier start.
+    """
+
+    def __init__(self, path: str = "reddit_store.sqlite"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sync)")}
+        if "oldest" not in columns:
+            # Stores created before the oldest column
+            with self._conn:
+                self._conn.execute("ALTER TABLE sync ADD COLUMN oldest REAL")
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def watermark(self, subreddit_name: str) -> float | None:
+        """
+        Returns the created_utc of the newest post synced for a subreddit.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark FROM sync WHERE subreddit = ?", (subreddit_name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def synced_range(self, subreddit_name: str) -> tuple[float, float] | None:
+        """
+        Returns the oldest and newest created_utc between which the posts of a
+        subreddit are all stored, None if it was never synced.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(oldest, (SELECT MIN(created_utc) FROM submissions "
+                "WHERE subreddit = sync.subreddit)), watermark FROM sync WHERE subreddit = ?",
+                (subreddit_name,),
+            ).fetchone()
+        return (row[0] if row[0] is not None else row[1], row[1]) if row else None
+
+    def save_submission(self, raw_post, subreddit_name: str, comments: Iterable = ()) -> None:
+        """
+        Inserts or updates a submission and its comments.
+        Args:
+            raw_post: The Reddit submission.
+            subreddit_name (str): Name of its subreddit.
+            comments (Iterable): The comments of the submission to store.
+        """
+        now = time.time()
+        post_data = _raw_fields(raw_post, SUBMISSION_FIELDS)
+        comment_rows = []
+        for raw_comment in comments:
+            data = _raw_fields(raw_comment, COMMENT_FIELDS)
+            data["link_id"] = data["link_id"] or f"t3_{post_data['id']}"
+            comment_rows.append(
+                (
+                    f"t1_{data['id']}",
+                    data["link_id"],
+                    data["parent_id"],
+                    data["created_utc"],
+                    content_hash(data["body"]),
+                    json.dumps(data),
+                    now,
+                )
+            )
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO submissions VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    f"t3_{post_data['id']}",
+                    subreddit_name,
+                    post_data["created_utc"],
+                    content_hash(post_data["title"], post_data["selftext"]),
+                    json.dumps(post_data),
+                    now,
+                ),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?, ?, ?)", comment_rows
+            )
+
+    def sync(
+        self,
+        subreddit: "Subreddit",
+        start_ts: float | None = None,
+        more_limit: int | None = 0,
+    ) -> int:
+        """
+        Fetches the posts published since the last sync, newest first, with their
+        comments. When start_ts is older than what was synced before, the posts below
+        the oldest stored one are fetched too, down to start_ts.
+        The whole window is fetched, whatever the number of posts later extracted, as
+        far as the listing goes (Reddit serves ~1000 posts per listing). When it ends
+        before start_ts, the store only counts as complete down to the oldest post reached.
+        Args:
+            subreddit (Subreddit): The subreddit to sync.
+            start_ts (float | None): Do not fetch posts older than this timestamp.
+            more_limit (int | None): Maximum number of "more comments" expansions per post.
+        Returns:
+            int: Number of new posts stored.
+        """
+        name = subreddit.display_name
+        synced = self.synced_range(name)
+        added, complete = self._fetch_new(
+            subreddit, subreddit.new(limit=None), synced[1] if synced else None, start_ts, more_limit
+        )
+        # Posts are complete down to start_ts (all of them without it) once a pass
+        # reached it
+        floor = start_ts if start_ts is not None else 0.0
+        if synced:
+            oldest = synced[0]
+        else:
+            oldest = floor if complete else self._oldest_stored(name, floor)
+        if floor < oldest:
+            # Backfill: the listing is read again from below the oldest stored post
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT fullname FROM submissions WHERE subreddit = ? "
+                    "ORDER BY created_utc LIMIT 1",
+                    (name,),
+                ).fetchone()
+            params = {"after": row[0]} if row else None
+            backfilled, complete = self._fetch_new(
+                subreddit, subreddit.new(limit=None, params=params), None, start_ts, more_limit
+            )
+            added += backfilled
+            oldest = floor if complete else self._oldest_stored(name, oldest)
+
+        with self._lock:
+            newest_stored = self._conn.execute(
+                "SELECT MAX(created_utc) FROM submissions WHERE subreddit = ?", (name,)
+            ).fetchone()[0]
+        if newest_stored is not None:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync VALUES (?, ?, ?, ?)",
+                    (name, newest_stored, time.time(), oldest),
+                )
+        print(f"Synced r/{name}: {added} new posts stored")
+        return added
+
+    def _fetch_new(
+        self,
+        subreddit: "Subreddit",
+        listing: Iterable,
+        stop_ts: float | None,
+        start_ts: float | None,
+        more_limit: int | None,
+    ) -> tuple[int, bool]:
+        # Stores the posts of a newest-first listing down to stop_ts (excluded) or
+        # start_ts. Returns the number of posts stored and whether one of these bounds
+        # was reached, rather than the end of the listing.
+        # Imported here, utils imports this module
+        from utils import iter_comments
+
+        added = 0
+        for raw_post in listing:
+            created_utc = raw_post.created_utc
+            if (stop_ts is not None and created_utc <= stop_ts) or (
+                start_ts is not None and created_utc < start_ts
+            ):
+                return added, True
+            self.save_submission(
+                raw_post, subreddit.display_name, iter_comments(raw_post, more_limit=more_limit)
+            )
+            added += 1
+        return added, False
+
+    def _oldest_stored(self, subreddit_name: str, default: float) -> float:
+        with self._lock:
+            oldest = self._conn.execute(
+                "SELECT MIN(created_utc) FROM submissions WHERE subreddit = ?", (subreddit_name,)
+            ).fetchone()[0]
+        return oldest if oldest is not None else default
+
+    def refresh(
+        self,
+        subreddit: "Subreddit",
+        start_ts: float | None = None,
+        end_ts: float | None = None,
+        more_limit: int | None = 0,
+    ) -> int:
+        """
+        Updates the score and comment count of stored posts, 100 posts per API request.
+        Posts with more comments than when they were stored, or whose title or text
+        changed (their content_hash), are stored again with their comments.
+        Args:
+            subreddit (Subreddit): The subreddit whose posts are refreshed.
+            start_ts (float | None): Only refresh posts created after this timestamp.
+            end_ts (float | None): Only refresh posts created before this timestamp.
+            more_limit (int | None): Maximum number of "more comments" expansions per
+                post whose comments are fetched again.
+        Returns:
+            int: Number of posts refreshed.
+        """
+        # Imported here, utils imports this module
+        from utils import iter_comments
+
+        name = subreddit.display_name
+        stored = {post.fullname: post for post in self.submissions(name, start_ts, end_ts)}
+        fullnames = list(stored)
+        updates = []
+        refetched = 0
+        for offset in range(0, len(fullnames), 100):
+            batch = fullnames[offset : offset + 100]
+            with self._lock:
+                hashes = dict(
+                    self._conn.execute(
+                        "SELECT fullname, content_hash FROM submissions "
+                        f"WHERE fullname IN ({','.join('?' * len(batch))})",
+                        batch,
+                    )
+                )
+            for raw_post in subreddit._reddit.info(fullnames=batch):
+                stored_post = stored[raw_post.fullname]
+                if raw_post.num_comments > (stored_post.num_comments or 0) or hashes.get(
+                    raw_post.fullname
+                ) != content_hash(raw_post.title, raw_post.selftext):
+                    self.save_submission(raw_post, name, iter_comments(raw_post, more_limit=more_limit))
+                    refetched += 1
+                    continue
+                data = _raw_fields(stored_post, SUBMISSION_FIELDS)
+                data["score"] = raw_post.score
+                data["num_comments"] = raw_post.num_comments
+                updates.append((json.dumps(data), time.time(), raw_post.fullname))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE submissions SET data = ?, fetched_at = ? WHERE fullname = ?", updates
+            )
+        if refetched:
+            print(f"Refreshed r/{name}: comments of {refetched} posts fetched again")
+        return len(updates) + refetched
+
+    def submissions(
+        self,
+        subreddit_name: str,
+        start_ts: float | None = None,
+        end_ts: float | None = None,
+    ) -> Iterator[StoredSubmission]:
+        """
+        Reads the stored posts of a subreddit, newest first, like the "new" listing.
+        Args:
+            subreddit_name (str): Name of the subreddit.
+            start_ts (float | None): Oldest timestamp allowed.
+            end_ts (float | None): Newest timestamp allowed.
+        Yields:
+            StoredSubmission: The stored posts.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM submissions WHERE subreddit = ? AND created_utc >= ? "
+                "AND created_utc <= ? ORDER BY created_utc DESC",
+                (
+                    subreddit_name,
+                    start_ts if start_ts is not None else float("-inf"),
+                    end_ts if end_ts is not None else float("inf"),
+                ),
+            ).fetchall()
+        for (data,) in rows:
+            yield StoredSubmission(self, json.loads(data))
+
+    def comment_links(
+        self,
+        subreddit_name: str,
+        start_ts: float | None = None,
+        end_ts: float | None = None,
+    ) -> Iterator[tuple[str, str | None, str, str | None]]:
+        """
+        Reads the reply links of the stored comments of a subreddit's posts, without
+        building comment objects.
+        Args:
+            subreddit_name (str): Name of the subreddit.
+            start_ts (float | None): Oldest post timestamp allowed.
+            end_ts (float | None): Newest post timestamp allowed.
+        Yields:
+            tuple: The fullname of each comment, of its parent and of its post, and its author.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT comments.fullname, comments.parent_id, comments.link_id, "
+                "json_extract(comments.data, '$.author') FROM comments "
+                "JOIN submissions ON submissions.fullname = comments.link_id "
+                "WHERE submissions.subreddit = ? AND submissions.created_utc >= ? "
+                "AND submissions.created_utc <= ?",
+                (
+                    subreddit_name,
+                    start_ts if start_ts is not None else float("-inf"),
+                    end_ts if end_ts is not None else float("inf"),
+                ),
+            ).fetchall()
+        yield from rows
+
+    def comment_tree(self, link_id: str) -> list[StoredComment]:
+        """
+        Rebuilds the comment forest of a stored post.
+        Args:
+            link_id (str): Fullname of the post.
+        Returns:
+            list[StoredComment]: The top-level comments, replies attached.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM comments WHERE link_id = ? ORDER BY created_utc", (link_id,)
+            ).fetchall()
+        comments = {}
+        for (data,) in rows:
+            comment = StoredComment(json.loads(data))
+            comments[comment.fullname] = comment
+        top_level = []
+        for comment in comments.values():
+            parent = comments.get(comment.parent_id)
+            (parent.replies if parent else top_level).append(comment)
+        return top_level
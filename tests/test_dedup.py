@@ -0,0 +1,58 @@
+from dedup import DedupIndex
+from model import Comment, Post
+
+TEXT = (
+    "My grandmother passed away last week and I keep writing messages to her old "
+    "phone number, does anyone else still talk to the people they lost every day"
+)
+
+
+def make_thread(subreddit: str, post_id: str, crosspost_parent: str | None = None) -> list[Post]:
+    post = Post(
+        id="RD-01-01",
+        Reddit_URL=f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/title/",
+        Thread_Title="Talking to the ones we lost",
+        Subreddit=f"r/{subreddit}",
+        Content=TEXT,
+        Author="u/someone",
+        crosspost_parent=crosspost_parent,
+    )
+    comment = Comment(
+        id="RD-01-01-01",
+        Reddit_URL=f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/title/c{post_id}/",
+        Thread_Title=post.Thread_Title,
+        Subreddit=post.Subreddit,
+        Content=f"Reply {post_id}",
+        Author="u/other",
+        Post=post,
+    )
+    return [post, comment]
+
+
+def test_copy_pasted_post_dropped_with_its_comments():
+    index = DedupIndex()
+    first = make_thread("GriefSupport", "aaa111")
+    copy = make_thread("grief", "bbb222")
+    assert len(index.deduplicate(first)) == 2
+    assert index.deduplicate(copy) == []
+    assert index.duplicates == {first[0].Reddit_URL: [copy[0].Reddit_URL]}
+
+
+def test_crosspost_model_matched_on_its_original():
+    index = DedupIndex()
+    original = make_thread("GriefSupport", "aaa111")
+    crosspost = make_thread("grief", "bbb222", crosspost_parent="t3_aaa111")
+    # A different text, only the crosspost link relates both posts
+    crosspost[0].Content = "Sharing this here"
+    crosspost[0].Thread_Title = "Crosspost"
+    assert len(index.deduplicate(original)) == 2
+    assert index.deduplicate(crosspost) == []
+
+
+def test_distinct_posts_kept():
+    index = DedupIndex()
+    first = make_thread("GriefSupport", "aaa111")
+    other = make_thread("grief", "bbb222")
+    other[0].Content = "A completely different story about learning to cook the recipes my father left"
+    assert len(index.deduplicate(first)) == 2
+    assert len(index.deduplicate(other)) == 2
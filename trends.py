@@ -0,0 +1,329 @@
+import calendar
+import json
+import sqlite3
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable
+
+from dedup import item_key
+from model import Post
+from sentiment import Lexicon, get_lexicon
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,
+    subreddit TEXT NOT NULL,
+    category TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    month TEXT NOT NULL,
+    upvotes INTEGER NOT NULL,
+    positive_words INTEGER NOT NULL,
+    negative_words INTEGER NOT NULL,
+    sentiment TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    topic INTEGER
+);
+CREATE INDEX IF NOT EXISTS items_by_date ON items (subreddit, created_utc);
+CREATE TABLE IF NOT EXISTS monthly (
+    subreddit TEXT NOT NULL,
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    upvotes INTEGER NOT NULL,
+    positive_words INTEGER NOT NULL,
+    negative_words INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    PRIMARY KEY (subreddit, month, category)
+);
+CREATE TABLE IF NOT EXISTS monthly_keywords (
+    subreddit TEXT NOT NULL,
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (subreddit, month, category, keyword)
+);
+CREATE TABLE IF NOT EXISTS monthly_topics (
+    subreddit TEXT NOT NULL,
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    topic INTEGER NOT NULL,
+    items INTEGER NOT NULL,
+    PRIMARY KEY (subreddit, month, category, topic)
+);
+"""
+
+_MONTHLY_FIELDS = (
+    "items", "upvotes", "positive_words", "negative_words", "positive", "negative", "neutral",
+)
+
+
+def created_utc(item: Post) -> float | None:
+    """
+    Creation timestamp of a post/comment: the raw created_utc of a record, or the
+    start of its Date_Posted day (UTC) for a Post model.
+    """
+    timestamp = getattr(item, "created_utc", None)
+    if timestamp is not None:
+        return float(timestamp)
+    if not item.Date_Posted:
+        return None
+    # Date_Posted is formatted "dd/mm/YYYY"
+    return float(calendar.timegm(datetime.strptime(item.Date_Posted, "%d/%m/%Y").timetuple()))
+
+
+def month_of(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m")
+
+
+def _month_bounds(start_date: datetime | None, end_date: datetime | None) -> tuple[str, str]:
+    return (
+        start_date.strftime("%Y-%m") if start_date else "",
+        end_date.strftime("%Y-%m") if end_date else "9999-12",
+    )
+
+
+class TrendRollups:
+    """
+    SQLite store of per-subreddit x per-month rollups (item counts, upvotes, lexicon
+    sentiment, keyword hits and dominant topics), for trend queries over years of
+    data without rescanning the items.
+
+    Rollups are updated incrementally as items are ingested. Each item also keeps a
+    row of what it added, keyed by its Reddit URL, so ingesting it again (an updated
+    score, a topic assigned later) replaces its contribution instead of counting it twice.
+    """
+
+    def __init__(self, path: str = "trends.sqlite"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def ingest(
+        self,
+        items: Iterable[Post],
+        topics: Iterable[int | None] | None = None,
+        lexicon: Lexicon | None = None,
+    ) -> int:
+        """
+        Adds posts/comments to the rollups.
+        Items are scored with the lexicon like annotate_sentiment scores them, and
+        their keyword hits are the Keywords found by the extraction.
+        Args:
+            items (Iterable[Post]): Post and Comment objects (or records).
+            topics (Iterable[int | None] | None): Dominant topic of each item, in the
+                same order, e.g. from lda_analysis.models.dominant_topics. None keeps
+                the topic an item was given by a previous ingest.
+            lexicon (Lexicon | None): Lexicon to use, the Hu & Liu lists by default.
+        Returns:
+            int: Number of items ingested, items without a date being skipped.
+        """
+        lexicon = lexicon or get_lexicon()
+        topics = iter(topics) if topics is not None else None
+        monthly: dict[tuple, Counter] = {}
+        keyword_hits: Counter = Counter()
+        topic_items: Counter = Counter()
+
+        def add(row: tuple, sign: int) -> None:
+            subreddit, category, month, upvotes, positive, negative, label, keywords, topic = row
+            group = (subreddit, month, category)
+            counts = monthly.setdefault(group, Counter())
+            counts["items"] += sign
+            counts["upvotes"] += sign * upvotes
+            counts["positive_words"] += sign * positive
+            counts["negative_words"] += sign * negative
+            counts[label] += sign
+            for keyword in keywords:
+                keyword_hits[(*group, keyword)] += sign
+            if topic is not None:
+                topic_items[(*group, topic)] += sign
+
+        ingested = 0
+        with self._conn:
+            for item in items:
+                topic = next(topics, None) if topics is not None else None
+                timestamp = created_utc(item)
+                if timestamp is None:
+                    continue
+                key = item_key(item)
+                old = self._conn.execute(
+                    "SELECT subreddit, category, month, upvotes, positive_words, negative_words, "
+                    "sentiment, keywords, topic FROM items WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if old is not None:
+                    old = (*old[:7], json.loads(old[7]), old[8])
+                    add(old, -1)
+                    if topic is None:
+                        topic = old[8]
+
+                text = (
+                    item.Content
+                    if item.Category == "comment"
+                    else " ".join(filter(None, (item.Thread_Title, item.Content)))
+                )
+                score = lexicon.score(text)
+                keywords = list(dict.fromkeys(item.Keywords or ()))
+                row = (
+                    item.Subreddit or "",
+                    item.Category,
+                    month_of(timestamp),
+                    item.Upvotes or 0,
+                    score.positive,
+                    score.negative,
+                    score.label,
+                    keywords,
+                    topic,
+                )
+                add(row, 1)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO items (key, subreddit, category, created_utc, month, "
+                    "upvotes, positive_words, negative_words, sentiment, keywords, topic) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, *row[:2], timestamp, *row[2:7], json.dumps(keywords), topic),
+                )
+                ingested += 1
+
+            self._conn.executemany(
+                f"INSERT INTO monthly (subreddit, month, category, {', '.join(_MONTHLY_FIELDS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(_MONTHLY_FIELDS))}) "
+                "ON CONFLICT (subreddit, month, category) DO UPDATE SET "
+                + ", ".join(f"{field} = {field} + excluded.{field}" for field in _MONTHLY_FIELDS),
+                [
+                    (*group, *(counts[field] for field in _MONTHLY_FIELDS))
+                    for group, counts in monthly.items()
+                ],
+            )
+            self._conn.executemany(
+                "INSERT INTO monthly_keywords (subreddit, month, category, keyword, hits) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (subreddit, month, category, keyword) "
+                "DO UPDATE SET hits = hits + excluded.hits",
+                [(*group, hits) for group, hits in keyword_hits.items() if hits],
+            )
+            self._conn.executemany(
+                "INSERT INTO monthly_topics (subreddit, month, category, topic, items) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (subreddit, month, category, topic) "
+                "DO UPDATE SET items = items + excluded.items",
+                [(*group, count) for group, count in topic_items.items() if count],
+            )
+            # Groups emptied by updates
+            self._conn.execute("DELETE FROM monthly WHERE items = 0")
+            self._conn.execute("DELETE FROM monthly_keywords WHERE hits = 0")
+            self._conn.execute("DELETE FROM monthly_topics WHERE items = 0")
+        print(f"Ingested {ingested} items into the trend rollups")
+        return ingested
+
+    def _where(
+        self,
+        subreddits: list[str] | None,
+        start_date: datetime | None,
+        end_date: datetime | None,
+        category: str | None,
+    ) -> tuple[str, tuple]:
+        clause = " WHERE month >= ? AND month <= ?"
+        params: tuple = _month_bounds(start_date, end_date)
+        if subreddits:
+            clause += f" AND subreddit IN ({', '.join('?' * len(subreddits))})"
+            params += tuple(subreddits)
+        if category:
+            clause += " AND category = ?"
+            params += (category,)
+        return clause, params
+
+    def monthly(
+        self,
+        subreddits: list[str] | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        category: str | None = None,
+    ) -> list[dict]:
+        """
+        Monthly series of item counts, upvotes and sentiment.
+        Args:
+            subreddits (list[str] | None): Subreddits, as in the Subreddit column
+                ("r/GriefSupport"), all by default.
+            start_date (datetime | None): First month of the series.
+            end_date (datetime | None): Last month of the series.
+            category (str | None): "post" or "comment", both by default.
+        Returns:
+            list[dict]: One row per subreddit and month, sorted by subreddit and month.
+        """
+        where, params = self._where(subreddits, start_date, end_date, category)
+        rows = self._conn.execute(
+            "SELECT subreddit, month, "
+            + ", ".join(f"SUM({field})" for field in _MONTHLY_FIELDS)
+            + f" FROM monthly{where} GROUP BY subreddit, month ORDER BY subreddit, month",
+            params,
+        )
+        series = []
+        for subreddit, month, *sums in rows:
+            row = {"subreddit": subreddit, "month": month, **dict(zip(_MONTHLY_FIELDS, sums))}
+            row["mean_upvotes"] = row["upvotes"] / row["items"] if row["items"] else 0
+            series.append(row)
+        return series
+
+    def keyword_trends(
+        self,
+        keywords: list[str] | None = None,
+        subreddits: list[str] | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        category: str | None = None,
+    ) -> dict[str, dict[str, int]]:
+        """
+        Number of items matching each keyword, per month.
+        Args:
+            keywords (list[str] | None): Keywords to report, as found by the
+                extraction, all by default.
+            subreddits, start_date, end_date, category: See monthly.
+        Returns:
+            dict[str, dict[str, int]]: Month -> keyword -> number of items, months sorted.
+        """
+        where, params = self._where(subreddits, start_date, end_date, category)
+        if keywords:
+            where += f" AND keyword IN ({', '.join('?' * len(keywords))})"
+            params += tuple(keywords)
+        trends: dict[str, dict[str, int]] = {}
+        for month, keyword, hits in self._conn.execute(
+            f"SELECT month, keyword, SUM(hits) FROM monthly_keywords{where} "
+            "GROUP BY month, keyword ORDER BY month, SUM(hits) DESC",
+            params,
+        ):
+            trends.setdefault(month, {})[keyword] = hits
+        return trends
+
+    def topic_shares(
+        self,
+        subreddits: list[str] | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        category: str | None = None,
+    ) -> dict[str, dict[int, float]]:
+        """
+        Share of the items of each month whose dominant topic is each topic, among the
+        items given a topic.
+        Args:
+            subreddits, start_date, end_date, category: See monthly.
+        Returns:
+            dict[str, dict[int, float]]: Month -> topic -> share, months sorted.
+        """
+        where, params = self._where(subreddits, start_date, end_date, category)
+        counts: dict[str, dict[int, int]] = {}
+        for month, topic, items in self._conn.execute(
+            f"SELECT month, topic, SUM(items) FROM monthly_topics{where} "
+            "GROUP BY month, topic ORDER BY month, topic",
+            params,
+        ):
+            counts.setdefault(month, {})[topic] = items
+        return {
+            month: {topic: items / sum(topics.values()) for topic, items in topics.items()}
+            for month, topics in counts.items()
+        }
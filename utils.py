@@ -1,37 +1,31 @@
 import os
+import queue
 import re
-from collections import Counter
-from datetime import datetime
-import nltk
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple
 from dotenv import load_dotenv
-from nltk.corpus import stopwords
-from praw.models import Subreddit
-from model import Post, Comment
+import instrumentation
+from model import CommentRecord, Post, PostRecord, date_added_today, to_models
+from resources import english_stopwords
+from sentiment import get_lexicon
+from store import RedditStore, StoredSubmission
+
+if TYPE_CHECKING:
+    from praw import Reddit
+    from praw.models import Subreddit
+
+    from scheduler import RateLimiter
 
 load_dotenv()
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 
 
-def get_words_lists_old() -> tuple[list[str], list[str]]:
-    positive_words = []
-    negative_words = []
-    with open("../words_lists/positive_words.txt", "r") as pos_file:
-        positive_words = [
-            line.strip()
-            for line in pos_file
-            if line.strip() and not line.startswith(";")
-        ]
-    with open("../words_lists/negative_words.txt", "r") as neg_file:
-        negative_words = [
-            line.strip()
-            for line in neg_file
-            if line.strip() and not line.startswith(";")
-        ]
-    return positive_words, negative_words
-
-
-def analyze_post_interactions(subreddit: Subreddit, type: str, limit: int) -> None:
+def analyze_post_interactions(subreddit: "Subreddit", type: str, limit: int) -> None:
     """Analyze interactions on the most popular posts in a subreddit.
     Args:
         subreddit (Subreddit): The subreddit to analyze.
@@ -56,11 +50,10 @@ def analyze_post_interactions(subreddit: Subreddit, type: str, limit: int) -> No
         reddit_iterator = subreddit.new(limit=limit)
 
     # Load positive and negative words
-    positive_words, negative_words = get_words_list()
+    lexicon = get_lexicon()
 
     # Getting common English stopwords
-    nltk.download("stopwords")
-    common_stopwords = set(stopwords.words("english"))
+    common_stopwords = english_stopwords()
 
     posts_stats = []
 
@@ -86,15 +79,10 @@ def analyze_post_interactions(subreddit: Subreddit, type: str, limit: int) -> No
             else 0
         )
 
-        # Sentiment analysis on comments
-        pos_count = sum(
-            any(w in comment.body.lower() for w in positive_words)
-            for comment in comments
-        )
-        neg_count = sum(
-            any(w in comment.body.lower() for w in negative_words)
-            for comment in comments
-        )
+        # Sentiment analysis on comments (number of comments with positive/negative words)
+        scores = lexicon.score_many(comment.body for comment in comments)
+        pos_count = sum(score.positive > 0 for score in scores)
+        neg_count = sum(score.negative > 0 for score in scores)
 
         # Most frequent words excluding short/common words on comments
         words = [
@@ -127,6 +115,127 @@ def analyze_post_interactions(subreddit: Subreddit, type: str, limit: int) -> No
     # return plot_sentiment_bars(posts_stats)
 
 
+def _trie_pattern(words: list[str]) -> str:
+    """
+    Builds a regex alternation factored on common prefixes (e.g. "gpt(?:3|4o?)").
+    Optional endings are greedy, so the longest keyword matching is captured first.
+    Args:
+        words (list[str]): The lowercased keywords.
+    Returns:
+        str: The regex source, without word boundaries.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """
+    Whole-word, case-insensitive matcher compiled once for a list of keywords.
+
+    All keywords are merged into a single alternation so a text is scanned once,
+    whatever the size of the keyword list. Matching follows the same rules as a
+    per-keyword ``\\b<keyword>\\b`` search.
+    """
+
+    def __init__(self, keywords: list[str]):
+        self.keywords = tuple(keywords)
+
+        # Lowercased keyword -> original spellings, in keyword-list order
+        self._spellings: dict[str, list[str]] = {}
+        for kw in self.keywords:
+            if kw:
+                self._spellings.setdefault(kw.lower(), []).append(kw)
+
+        alternatives = sorted(self._spellings, key=len, reverse=True)
+        body = _trie_pattern(alternatives)
+        self._any = re.compile(rf"\b(?:{body})\b", flags=re.IGNORECASE)
+        # Zero-width lookahead so overlapping occurrences are all reported
+        self._scan = re.compile(rf"(?=\b({body})\b)", flags=re.IGNORECASE)
+
+        # Shorter keywords that can match at the same position as a longer one
+        # (e.g. "artificial" inside "artificial intelligence")
+        self._prefixes: dict[str, list[tuple[str, re.Pattern]]] = {
+            kw: [
+                (other, re.compile(rf"\b{re.escape(other)}\b", flags=re.IGNORECASE))
+                for other in alternatives
+                if other != kw and kw.startswith(other)
+            ]
+            for kw in alternatives
+        }
+        self._order = {kw: idx for idx, kw in enumerate(self.keywords)}
+
+    def search(self, text: str | None) -> bool:
+        """
+        Checks if any of the keywords is present in the given text.
+        Args:
+            text (str | None): The text to search within.
+        Returns:
+            bool: True if any keyword is found, False otherwise.
+        """
+        if not text or not self._spellings:
+            return False
+        return self._any.search(text) is not None
+
+    def find_all(self, *texts: str | None) -> list[str]:
+        """
+        Lists the keywords found in the given texts, in a single pass over each text.
+        Args:
+            *texts (str | None): The texts to search within.
+        Returns:
+            list[str]: Matched keywords, in keyword-list order, without duplicates.
+        """
+        if not self._spellings:
+            return []
+        found: set[str] = set()
+        for text in texts:
+            if not text:
+                continue
+            for match in self._scan.finditer(text):
+                matched = match.group(1).lower()
+                found.add(matched)
+                for other, pattern in self._prefixes.get(matched, ()):
+                    if pattern.match(text, match.start()):
+                        found.add(other)
+        keywords = {
+            kw
+            for lowered in found
+            for kw in self._spellings.get(lowered, ())
+        }
+        return sorted(keywords, key=self._order.__getitem__)
+
+
+_matchers: dict[int, KeywordMatcher] = {}
+
+
+def get_keyword_matcher(keywords: list[str]) -> KeywordMatcher:
+    """
+    Returns the compiled matcher of a keyword list, building it on first use.
+    Matchers are cached by list identity and rebuilt if the list was modified.
+    Args:
+        keywords (list[str]): List of keywords to search for.
+    Returns:
+        KeywordMatcher: The matcher for this list.
+    """
+    matcher = _matchers.get(id(keywords))
+    if matcher is None or matcher.keywords != tuple(keywords):
+        matcher = KeywordMatcher(keywords)
+        _matchers[id(keywords)] = matcher
+    return matcher
+
+
 def contains_keyword(text: str, keywords: list[str]) -> bool:
     """
     Checks if any of the keywords are present in the given text (whole words only).
@@ -138,19 +247,431 @@ def contains_keyword(text: str, keywords: list[str]) -> bool:
     """
     if not text or not keywords:
         return False
-    for kw in keywords:
-        pattern = rf"\b{re.escape(kw)}\b"
-        if re.search(pattern, text, flags=re.IGNORECASE):
-            return True
-    return False
+    return get_keyword_matcher(keywords).search(text)
+
+
+LISTINGS = ("top", "new", "hot")
+
+
+def to_timestamp(date: datetime | None) -> float | None:
+    """
+    Converts a date to a POSIX timestamp comparable with Reddit's created_utc.
+    Naive datetimes are read as UTC, like datetime.utcfromtimestamp returns them.
+    Args:
+        date (datetime | None): The date to convert.
+    Returns:
+        float | None: The timestamp, or None if no date was given.
+    """
+    if date is None:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp()
+
+
+def iter_comments(
+    submission,
+    max_depth: int | None = None,
+    min_score: int | None = None,
+    created_before: float | None = None,
+    more_limit: int | None = None,
+) -> Iterator:
+    """
+    Walks the comment tree of a submission breadth-first, lazily.
+    "More comments" stubs are only expanded (one API request each) when the walk
+    reaches them, so stopping the iteration early avoids loading the rest of the
+    thread. Pruned comments are skipped along with their whole subtree.
+    Args:
+        submission: The Reddit submission.
+        max_depth (int | None): Deepest level to visit, 0 being top-level comments.
+        min_score (int | None): Comments scored below are pruned.
+        created_before (float | None): Comments created after this timestamp are pruned
+            (replies are always newer than their parent).
+        more_limit (int | None): Maximum number of "more comments" expansions, None for no limit.
+    Yields:
+        Comment: The comments, level by level.
+    """
+    if isinstance(submission, StoredSubmission):
+        # Stored trees hold no "more comments" stubs, and praw is not needed to read them
+        MoreComments = ()
+    else:
+        from praw.models import MoreComments
+
+    pending = deque((item, 0) for item in submission.comments)
+    pruned: set[str] = set()
+    expansions = 0
+
+    while pending:
+        item, depth = pending.popleft()
+        depth = getattr(item, "depth", depth)
+        if max_depth is not None and depth > max_depth:
+            continue
+        if getattr(item, "parent_id", None) in pruned:
+            # Expanded "more comments" come back flat, so pruning is checked on the parent
+            if not isinstance(item, MoreComments):
+                pruned.add(item.fullname)
+            continue
+
+        if isinstance(item, MoreComments):
+            if more_limit is not None and expansions >= more_limit:
+                continue
+            expansions += 1
+            instrumentation.current().count("more_comments_expansions")
+            pending.extend((child, depth) for child in item.comments())
+            continue
+
+        if (min_score is not None and item.score < min_score) or (
+            created_before is not None and item.created_utc > created_before
+        ):
+            pruned.add(item.fullname)
+            continue
+
+        yield item
+        if max_depth is None or depth < max_depth:
+            pending.extend((reply, depth + 1) for reply in item.replies)
+
+
+def posts_in_window(
+    posts: Iterable,
+    start_ts: float | None,
+    end_ts: float | None,
+    chronological: bool,
+    stats: Counter,
+) -> Iterator:
+    """
+    Filters a listing on the raw created_utc of its posts, before anything is built.
+    Args:
+        posts (Iterable): The listing of Reddit submissions.
+        start_ts (float | None): Oldest timestamp allowed.
+        end_ts (float | None): Newest timestamp allowed.
+        chronological (bool): Whether the listing is sorted newest first, in which
+            case it is left as soon as a post is older than start_ts.
+        stats (Counter): Counters updated with scrapped and skipped_by_date.
+    Yields:
+        Submission: The posts within the window.
+    """
+    for raw_post in posts:
+        stats["scrapped"] += 1
+        created_utc = raw_post.created_utc
+        if start_ts is not None and created_utc < start_ts:
+            stats["skipped_by_date"] += 1
+            if chronological:
+                print("Reached posts older than the start date, stopping listing.")
+                return
+            continue
+        if end_ts is not None and created_utc > end_ts:
+            stats["skipped_by_date"] += 1
+            continue
+        yield raw_post
+
+
+def _load_comments(raw_post) -> None:
+    # Accessing the forest fetches the submission with its first comments
+    with instrumentation.current().timer("comment_prefetch"):
+        len(raw_post.comments)
+
+
+def prefetch_comments(
+    posts: Iterable,
+    workers: int = 1,
+    reddit: "Reddit | None" = None,
+    limiter: "RateLimiter | None" = None,
+) -> Iterator:
+    """
+    Yields posts in order while their comment trees are fetched ahead in a thread pool.
+
+    PRAW instances are not thread-safe, so posts read from the API are fetched again
+    by id with a clone of the Reddit instance (clone_reddit). Loading more comments
+    goes through the instance a post was fetched with, so its clone stays with the
+    post until the caller asks for the next one: a clone is never used by two
+    threads at once.
+    Args:
+        posts (Iterable): The Reddit submissions.
+        workers (int): Number of fetching threads, 1 to fetch lazily in the caller.
+        reddit (Reddit | None): The instance the posts were read with, None for posts
+            that make no API call (store, fixtures), loaded as they are.
+        limiter (RateLimiter | None): Request budget shared by the clones, a new one
+            at Reddit's default rate if None.
+    Yields:
+        Submission: The posts, in their original order, with comments loaded.
+    """
+    if workers <= 1:
+        yield from posts
+        return
+    clients = None
+    if reddit is not None:
+        # Imported here, praw is not needed to read a local store
+        from scheduler import RateLimiter, clone_reddit
+
+        limiter = limiter or RateLimiter()
+        clients = queue.SimpleQueue()
+
+    def load(raw_post):
+        if clients is None:
+            _load_comments(raw_post)
+            return raw_post, None
+        try:
+            client = clients.get_nowait()
+        except queue.Empty:
+            client = clone_reddit(reddit, limiter)
+        submission = client.submission(id=raw_post.id)
+        _load_comments(submission)
+        return submission, client
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    # Fetching threads charge their requests to the caller's subreddit
+    load = instrumentation.current().bind(load)
+
+    def ready():
+        submission, client = pending.popleft().result()
+        try:
+            yield submission
+        finally:
+            # The caller is done with the post, its clone can fetch another one
+            if client is not None:
+                clients.put(client)
+
+    try:
+        for raw_post in posts:
+            pending.append(pool.submit(load, raw_post))
+            if len(pending) > workers:
+                yield from ready()
+        while pending:
+            yield from ready()
+    finally:
+        # Also reached when the caller stops early: drop the posts not started yet
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+class ListingCursor(NamedTuple):
+    """
+    Position of an extraction in a subreddit listing, to resume it in a later run.
+    """
+
+    # Fullname of the last post read from the listing
+    after: str | None = None
+    # Posts and items kept so far, the next post being numbered RD-01-{posts + 1}
+    posts: int = 0
+    items: int = 0
+    # Whether the listing was read to its end or the limit reached
+    done: bool = False
+
+
+def _posts_after(posts: Iterable, fullname: str) -> Iterator:
+    # Skips the posts up to and including the one with this fullname
+    posts = iter(posts)
+    for raw_post in posts:
+        if raw_post.fullname == fullname:
+            break
+    yield from posts
+
+
+def iter_post_data(
+    subreddit: "Subreddit",
+    limit: int,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    key_words: list[str] | None = None,
+    listing: str | None = None,
+    max_depth: int | None = None,
+    min_score: int | None = None,
+    more_limit: int | None = 0,
+    comment_workers: int = 1,
+    store: RedditStore | None = None,
+    sync: bool = True,
+    refresh: bool = False,
+    cursor: ListingCursor | None = None,
+    limiter: "RateLimiter | None" = None,
+) -> Iterator[tuple[list, ListingCursor]]:
+    """
+    Extracts posts and comments like extract_post_data, one post at a time, so the
+    caller can save each post as it comes and resume an interrupted run.
+    Args:
+        subreddit (Subreddit): The subreddit to extract data from.
+        limit (int): Maximum number of posts and comments to extract.
+        start_date, end_date, key_words, listing, max_depth, min_score, more_limit,
+        comment_workers, store, sync, refresh, limiter: See extract_post_data.
+        cursor (ListingCursor | None): Where a previous run stopped. The listing is
+            read from the post after cursor.after and posts are numbered from
+            cursor.posts + 1; nothing is extracted if cursor.done is set.
+    Yields:
+        tuple[list, ListingCursor]: For each post read within the date window, the post
+            record followed by its relevant comment records (empty if the post was
+            skipped) and the cursor after it. Then, once the listing is over or the
+            limit reached, an empty list and the cursor with done set.
+    """
+    report = instrumentation.current()
+    # The measures of the extraction are charged to the subreddit
+    with report.set_scope(f"r/{subreddit.display_name}"):
+        cursor = cursor or ListingCursor()
+        if cursor.done:
+            return
+
+        matcher = get_keyword_matcher(key_words) if key_words else None
+        start_ts = to_timestamp(start_date)
+        end_ts = to_timestamp(end_date)
+        reddit = getattr(subreddit, "_reddit", None)
+        if reddit is not None and (limiter is not None or comment_workers > 1):
+            # Listing and sync requests share the budget of the comment workers
+            # Imported here, praw is not needed to read a local store
+            from scheduler import RateLimiter, throttled
+
+            limiter = limiter or RateLimiter()
+            subreddit = throttled(reddit, limiter).subreddit(subreddit.display_name)
+        if store is not None:
+            if sync:
+                with report.timer("store_sync"):
+                    store.sync(subreddit, start_ts=start_ts, more_limit=more_limit)
+            if refresh:
+                with report.timer("store_refresh"):
+                    store.refresh(subreddit, start_ts=start_ts, end_ts=end_ts, more_limit=more_limit)
+            listing = "store"
+            source = store.submissions(subreddit.display_name, start_ts=start_ts, end_ts=end_ts)
+            if cursor.after:
+                source = _posts_after(source, cursor.after)
+        else:
+            if listing is None:
+                listing = "new" if start_date or end_date else "top"
+            if listing not in LISTINGS:
+                raise ValueError(f"Unknown listing '{listing}', expected one of {LISTINGS}")
+            # Reddit serves the listing from the post after cursor.after
+            params = {"params": {"after": cursor.after}} if cursor.after else {}
+            source = getattr(subreddit, listing)(limit=None, **params)
+        stats = Counter()
+        posts = posts_in_window(
+            report.timed(source, "listing"),
+            start_ts=start_ts,
+            end_ts=end_ts,
+            chronological=listing in ("new", "store"),
+            stats=stats,
+        )
+        resumed = cursor
+        post_count = cursor.posts
+        item_count = cursor.items
+        date_added = date_added_today()
+
+        try:
+            if post_count >= limit:
+                yield [], cursor._replace(done=True)
+                return
+            api = None if listing == "store" else getattr(subreddit, "_reddit", None)
+            # Created once and entered for every post and comment; with instrumentation off,
+            # both are the shared no-op context
+            keywords_timer = report.timer("keywords")
+            build_timer = report.timer("build")
+            for raw_post in prefetch_comments(posts, comment_workers, reddit=api, limiter=limiter):
+                # Build post data
+                with build_timer:
+                    post = PostRecord.from_reddit(
+                        reddit_obj=raw_post,
+                        subreddit=subreddit,
+                        id_number=post_count + 1,
+                        date_added=date_added,
+                    )
+                stats["built"] += 1
+
+                # Check post keywords
+                if matcher:
+                    with keywords_timer:
+                        post.Keywords = matcher.find_all(post.Content, post.Thread_Title) or None
+                post_has_keyword = bool(post.Keywords) if matcher else True
+
+                # Load comments lazily, until the comment budget is spent
+                comments = report.timed(
+                    iter_comments(
+                        raw_post,
+                        max_depth=max_depth,
+                        min_score=min_score,
+                        created_before=end_ts,
+                        more_limit=more_limit,
+                    ),
+                    "comments",
+                )
+                comment_count = 0
+                relevant_comments = []
+
+                for raw_comment in comments:
+                    stats["scrapped"] += 1
+
+                    # Filter comment by date, on the raw timestamp
+                    comment_utc = raw_comment.created_utc
+                    if (start_ts is not None and comment_utc < start_ts) or (
+                        end_ts is not None and comment_utc > end_ts
+                    ):
+                        stats["skipped_by_date"] += 1
+                        continue
+
+                    # Check comment for keywords, on the raw text
+                    keywords = None
+                    if matcher:
+                        with keywords_timer:
+                            keywords = matcher.find_all(raw_comment.body, post.Thread_Title) or None
+                        if not keywords:
+                            stats["skipped_by_keyword"] += 1
+                            continue
+
+                    # Build comment data
+                    with build_timer:
+                        comment = CommentRecord.from_reddit(
+                            reddit_obj=raw_comment,
+                            subreddit=subreddit,
+                            id_number=comment_count + 1,
+                            parent_post=post,
+                            date_added=date_added,
+                        )
+                    comment.Keywords = keywords
+                    stats["built"] += 1
+
+                    relevant_comments.append(comment)
+                    comment_count += 1
+                    if comment_count >= limit:
+                        break
+
+                # Keep post and its relevant comments if criteria met
+                items = []
+                if post_has_keyword or relevant_comments:
+                    items = [post, *relevant_comments]
+                    post_count += 1
+                    item_count += len(items)
+                    print(f"Added post {post.id} ({len(relevant_comments)} comments)")
+                else:
+                    stats["posts_skipped_by_keyword"] += 1
+
+                cursor = ListingCursor(raw_post.fullname, post_count, item_count)
+                yield items, cursor
+                if post_count >= limit:
+                    break
+            yield [], cursor._replace(done=True)
+        finally:
+            # Also reached when the caller stops early
+            print(
+                f"Total relevant items: {item_count - resumed.items} / Scrapped: {stats['scrapped']} "
+                f"(built: {stats['built']}, skipped by date: {stats['skipped_by_date']}, "
+                f"listing: {listing})"
+            )
+            for name, value in stats.items():
+                report.count(name, value)
+            report.count("posts_kept", post_count - resumed.posts)
+            report.count("items_kept", item_count - resumed.items)
 
 
 def extract_post_data(
-    subreddit: Subreddit,
+    subreddit: "Subreddit",
     limit: int,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     key_words: list[str] | None = None,
+    listing: str | None = None,
+    max_depth: int | None = None,
+    min_score: int | None = None,
+    more_limit: int | None = 0,
+    comment_workers: int = 1,
+    store: RedditStore | None = None,
+    sync: bool = True,
+    refresh: bool = False,
+    as_records: bool = False,
+    limiter: "RateLimiter | None" = None,
 ) -> list[Post]:
     """
     Extracts posts and comments containing given keywords or within a date range.
@@ -160,90 +681,72 @@ def extract_post_data(
         start_date (datetime | None): Start date for filtering posts/comments.
         end_date (datetime | None): End date for filtering posts/comments.
         key_words (list[str] | None): List of keywords to filter posts/comments.
+        listing (str | None): Listing to scan ("top", "new" or "hot"). Defaults to
+            "new" when a date window is given, "top" otherwise. With "new", the scan
+            stops at the first post older than start_date. Note that Reddit serves
+            at most ~1000 items per listing.
+        max_depth (int | None): Deepest comment level to load, 0 being top-level comments.
+        min_score (int | None): Comments scored below are skipped with their replies.
+        more_limit (int | None): Maximum number of "more comments" expansions per post,
+            each costing one API request. None for no limit, 0 (default) to keep only
+            the comments returned with the post.
+        comment_workers (int): Number of threads loading the comment trees of the next
+            posts while the current one is processed, each with its own Reddit
+            instance. Output order is unchanged.
+        store (RedditStore | None): Local store to read posts and comments from. Only
+            posts newer than its last sync are fetched from Reddit, then everything is
+            served from the store, newest first (the listing argument is ignored).
+        sync (bool): Whether to fetch new posts into the store first. Without sync,
+            the run makes no API call at all.
+        refresh (bool): Whether to update the score and comment count of stored posts,
+            fetching again the comments of posts that got new ones.
+        as_records (bool): Whether to return the compact PostRecord/CommentRecord objects
+            used during extraction instead of pydantic models.
+        limiter (RateLimiter | None): Request budget of the run. Listing, sync and
+            comment requests all go through it, with a throttled clone of the caller's
+            Reddit instance (see scheduler.throttled). With comment workers, a new one
+            at Reddit's default rate if None.
     Returns:
         list[Post]: List of Post and Comment objects matching the criteria.
     """
-    all_data = []
-    posts = subreddit.top(limit=None)
-    post_count = 0
-    scrapped = 0
-
-    for raw_post in posts:
-        scrapped += 1
-        if post_count >= limit:
-            break
-
-        # Filter post by date
-        post_datetime = datetime.utcfromtimestamp(raw_post.created_utc)
-        if start_date and post_datetime < start_date:
-            continue
-        if end_date and post_datetime > end_date:
-            continue
+    report = instrumentation.current()
+    started = time.perf_counter()
 
-        # Build post data
-        post = Post.from_reddit(reddit_obj=raw_post, subreddit=subreddit, id_number=post_count + 1)
-
-        # Check post keywords
-        post_has_keyword = (
-            (contains_keyword(post.Content, key_words) if key_words else True) or
-            (contains_keyword(post.Thread_Title, key_words) if key_words else True)
-    )
-
-        # Load comments
-        raw_post.comments.replace_more(limit=0)
-        comments = raw_post.comments.list()
-        comment_count = 0
-        relevant_comments = []
-
-        for raw_comment in comments:
-            scrapped += 1
-            if comment_count >= limit:
-                break
-
-            # Filter comment by date
-            comment_datetime = datetime.utcfromtimestamp(raw_comment.created_utc)
-            if start_date and comment_datetime < start_date:
-                continue
-            if end_date and comment_datetime > end_date:
-                continue
-
-            # Build comment data
-            comment = Comment.from_reddit(reddit_obj=raw_comment,
-                                               subreddit= subreddit,
-                                               id_number=comment_count + 1,
-                                               parent_post=post)
-
-            # Check comment for keywords
-            comment_has_keyword = (
-                (contains_keyword(comment.Content, key_words) if key_words else True) or
-                (contains_keyword(comment.Thread_Title, key_words) if key_words else True)
-            )
-
-            if not comment_has_keyword:
-                continue
-
-            relevant_comments.append(comment)
-            comment_count += 1
-
-        # Add post and its relevant comments if criteria met
-        if post_has_keyword or relevant_comments:
-            all_data.append(post)
-            all_data.extend(relevant_comments)
-            post_count += 1
-            print(f"Added post {post.id} ({len(relevant_comments)} comments)")
-
-    print(f"Total relevant items: {len(all_data)} / Scrapped: {scrapped}")
+    all_data = []
+    with report.set_scope(f"r/{subreddit.display_name}"):
+        for items, _ in iter_post_data(
+            subreddit,
+            limit,
+            start_date=start_date,
+            end_date=end_date,
+            key_words=key_words,
+            listing=listing,
+            max_depth=max_depth,
+            min_score=min_score,
+            more_limit=more_limit,
+            comment_workers=comment_workers,
+            store=store,
+            sync=sync,
+            refresh=refresh,
+            limiter=limiter,
+        ):
+            all_data.extend(items)
+
+        if as_records:
+            report.add_time("extract", time.perf_counter() - started)
+            return all_data
+        with report.timer("to_models"):
+            all_data = to_models(all_data)
+        report.add_time("extract", time.perf_counter() - started)
     return all_data
 
-def get_words_list() -> list[str]:
+
+@lru_cache(maxsize=None)
+def get_words_list() -> frozenset[str]:
     """
-    Get a list of common English stopwords with some additions.
+    Get the common English stopwords with some additions, built once.
     """
 
-    nltk.download("stopwords")
-    common_stopwords = stopwords.words("english")
-    common_stopwords += ["still","even","would","also","could","might","must","need","thing","really","something","anything","everything"]
+    common_stopwords = english_stopwords() | {"still","even","would","also","could","might","must","need","thing","really","something","anything","everything"}
 
     return common_stopwords
-
-